@@ -1,5 +1,7 @@
 from pathlib import Path
+import hashlib
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -29,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -64,6 +67,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Wait for locks held by generation workers instead of failing
+            'timeout': 20,
+        },
     }
 }
 
@@ -103,4 +110,142 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY') 
 
 # WordPress API URL
-WORDPRESS_API_URL = os.getenv('WORDPRESS_API_URL') 
+WORDPRESS_API_URL = os.getenv('WORDPRESS_API_URL')
+
+# WordPress HTTP client: request timeout (seconds), retries for transient
+# failures, and how many pages a sync fetches in parallel
+WORDPRESS_TIMEOUT = float(os.getenv('WORDPRESS_TIMEOUT', 15))
+WORDPRESS_MAX_RETRIES = int(os.getenv('WORDPRESS_MAX_RETRIES', 3))
+WORDPRESS_MAX_WORKERS = int(os.getenv('WORDPRESS_MAX_WORKERS', 8))
+
+# Connection pool size of the async WordPress client used by async views;
+# requests beyond it wait for a free connection
+WORDPRESS_MAX_CONNECTIONS = int(os.getenv('WORDPRESS_MAX_CONNECTIONS', 20))
+
+# Seconds subtracted from the sync watermark so that delta syncs also catch
+# posts whose local modification time lags the GMT watermark
+WORDPRESS_SYNC_OVERLAP = int(os.getenv('WORDPRESS_SYNC_OVERLAP', 24 * 60 * 60))
+
+# Rows written per INSERT ... ON CONFLICT statement during a sync
+WORDPRESS_SYNC_BATCH_SIZE = int(os.getenv('WORDPRESS_SYNC_BATCH_SIZE', 500))
+
+# Upper bound (bytes) on response bodies kept for ETag/Last-Modified revalidation
+WORDPRESS_HTTP_CACHE_MAX_BYTES = int(os.getenv('WORDPRESS_HTTP_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+
+# Codec for stored article and post bodies: 'zlib', or 'zstd' when the
+# zstandard package is installed (falls back to zlib otherwise)
+CONTENT_COMPRESSION = os.getenv('CONTENT_COMPRESSION', 'zlib')
+
+# Prompt context for topic generation from WordPress: estimated token budget
+# and maximum number of synced posts to include
+WORDPRESS_CONTEXT_TOKEN_BUDGET = int(os.getenv('WORDPRESS_CONTEXT_TOKEN_BUDGET', 1500))
+WORDPRESS_CONTEXT_MAX_POSTS = int(os.getenv('WORDPRESS_CONTEXT_MAX_POSTS', 20))
+
+# Full-text search backend; use core.services.search_service.DatabaseSearchBackend
+# on databases without SQLite FTS5
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'core.services.search_service.SQLiteFTSBackend')
+
+# Estimated title similarity (0-1) above which a generated topic is flagged
+# as a likely duplicate of an existing topic or WordPress post
+TOPIC_DUPLICATE_THRESHOLD = float(os.getenv('TOPIC_DUPLICATE_THRESHOLD', 0.5))
+
+# Topics inserted per bulk INSERT (and per slug lookup) when importing
+TOPIC_IMPORT_BATCH_SIZE = int(os.getenv('TOPIC_IMPORT_BATCH_SIZE', 1000))
+
+# Seconds without a sign of life from its worker after which a running
+# generation job is considered abandoned and put back on the queue
+GENERATION_JOB_TIMEOUT = int(os.getenv('GENERATION_JOB_TIMEOUT', 600))
+
+# Gemini response cache: entries kept in process memory, entries kept in the
+# database, and how long (seconds) a cached response stays valid
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 256))
+AI_CACHE_DB_MAX_ENTRIES = int(os.getenv('AI_CACHE_DB_MAX_ENTRIES', 10000))
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 7 * 24 * 60 * 60))
+
+# Directory for the lock files (a fixed set, picked by prompt hash) that stop
+# several processes from sending the same Gemini request at once
+AI_LOCK_DIR = os.getenv('AI_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'blog-content-manager-locks'))
+
+# Estimated token budget for the variable context in a single prompt
+# (post summaries, topic descriptions); longer context is truncated
+AI_PROMPT_CONTEXT_TOKENS = int(os.getenv('AI_PROMPT_CONTEXT_TOKENS', 2000))
+
+# Cache for rendered read views and template fragments: 'file' shares entries
+# between processes on one host (the web server and the generation worker,
+# whose saves must invalidate pages); 'locmem' keeps them per process. The
+# default directory is named after the database, so that checkouts and
+# databases on the same host never serve each other's pages
+PAGE_CACHE_BACKEND = os.getenv('PAGE_CACHE_BACKEND', 'file')
+PAGE_CACHE_DIR = os.getenv('PAGE_CACHE_DIR', os.path.join(
+    tempfile.gettempdir(),
+    'blog-content-manager-cache-' + hashlib.sha256(str(DATABASES['default']['NAME']).encode()).hexdigest()[:12],
+))
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 10 * 60))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blog-content-manager',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    } if PAGE_CACHE_BACKEND == 'locmem' else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': PAGE_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Gemini requests in flight at once when generating topic ideas for many
+# categories (batch view and generate_topics command)
+AI_BATCH_CONCURRENCY = int(os.getenv('AI_BATCH_CONCURRENCY', 8))
+
+# Gemini quota: requests and tokens per minute, the ceiling for the adaptive
+# number of calls in flight, and retries of throttled or failed calls.
+# Set AI_RATE_LIMIT_DB to a SQLite file path to share the quota between
+# processes (web server and worker); otherwise each process has its own
+AI_REQUESTS_PER_MINUTE = float(os.getenv('AI_REQUESTS_PER_MINUTE', 15))
+AI_TOKENS_PER_MINUTE = float(os.getenv('AI_TOKENS_PER_MINUTE', 1000000))
+AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 16))
+AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', 4))
+AI_RATE_LIMIT_DB = os.getenv('AI_RATE_LIMIT_DB', '')
+
+# Response tokens reserved per call before the actual usage is known
+AI_RESPONSE_TOKEN_ESTIMATE = int(os.getenv('AI_RESPONSE_TOKEN_ESTIMATE', 1000))
+
+# Ask Gemini for JSON matching a response schema when generating topic ideas;
+# set to 0 to fall back to free-form answers parsed leniently
+AI_STRUCTURED_OUTPUT = os.getenv('AI_STRUCTURED_OUTPUT', '1') == '1'
+
+# Build the Gemini and WordPress clients when the web server starts instead
+# of on the first request that needs them (the generation worker always does)
+SERVICE_WARM_UP = os.getenv('SERVICE_WARM_UP', '0') == '1'
+
+# Time (milliseconds) a management command may spend importing modules, and
+# SDKs that must only be imported on first use; see the import_budget command
+IMPORT_BUDGET_MS = int(os.getenv('IMPORT_BUDGET_MS', 400))
+LAZY_IMPORTS = ['google.generativeai', 'google.api_core']
+
+# Serve request, query, Gemini and WordPress metrics at /metrics in the
+# Prometheus text format
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+
+# 'record' stores every WordPress and Gemini answer under CASSETTE_DIR;
+# 'replay' serves them from there without network access or an API key
+CASSETTE_MODE = os.getenv('CASSETTE_MODE', 'off')
+CASSETTE_DIR = os.getenv('CASSETTE_DIR', os.path.join(BASE_DIR, 'cassettes'))
+# Replayed answers wait this multiple of their recorded latency; 0 answers at once
+CASSETTE_LATENCY_SCALE = float(os.getenv('CASSETTE_LATENCY_SCALE', 1))
+
+# Log to the console; LOG_LEVEL=DEBUG also logs the generated topic ideas
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'INFO')},
+    },
+}
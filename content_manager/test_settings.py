@@ -0,0 +1,12 @@
+from .settings import *  # noqa: F401,F403
+
+# DJANGO_SECRET_KEY usually isn't set where the tests run
+SECRET_KEY = SECRET_KEY or 'tests'  # noqa: F405
+
+# Nothing below reaches a real service or the shared cache and lock files
+WORDPRESS_API_URL = 'https://wordpress.example'
+GEMINI_API_KEY = 'tests'
+CASSETTE_MODE = 'off'
+AI_RATE_LIMIT_DB = ''
+AI_LOCK_DIR = os.path.join(tempfile.mkdtemp(), 'locks')  # noqa: F405
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
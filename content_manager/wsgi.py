@@ -2,4 +2,11 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'content_manager.settings')
-application = get_wsgi_application() 
\ No newline at end of file
+application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.SERVICE_WARM_UP:
+    from core.services import registry, retrieval_service
+    registry.warm_up()
+    retrieval_service.warm_up()
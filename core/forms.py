@@ -128,6 +128,11 @@ class ArticleGenerationForm(forms.Form):
         help_text="Give these parameters a name to save them for future use"
     )
     
+    refresh = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Create a custom Select widget with data attributes
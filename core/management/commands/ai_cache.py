@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import AIResponseCache
+from core.services.ai_cache import response_cache
+
+
+class Command(BaseCommand):
+    help = 'Inspect or clear the persistent Gemini response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Delete every cached response')
+        parser.add_argument('--purge-expired', action='store_true', help='Delete expired responses only')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            response_cache.clear()
+            self.stdout.write(self.style.SUCCESS('Cleared the AI response cache'))
+        elif options['purge_expired']:
+            deleted, _ = AIResponseCache.objects.filter(expires_at__lte=timezone.now()).delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired responses'))
+
+        total = AIResponseCache.objects.count()
+        live = AIResponseCache.objects.filter(expires_at__gt=timezone.now()).count()
+        self.stdout.write(f'{total} cached responses ({live} live, {total - live} expired)')
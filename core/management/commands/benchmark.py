@@ -0,0 +1,142 @@
+import json
+import logging
+import platform
+import subprocess
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.services.benchmark import SCENARIOS, Benchmark, parse_size
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark syncing, seeding, saving topics, article generation and list views '
+        'against fake Gemini and WordPress backends, in a throwaway database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1k',
+            help='Comma-separated dataset sizes: 1k, 100k, 1M or a number of rows (default: 1k)'
+        )
+        parser.add_argument(
+            '--scenarios', default=','.join(SCENARIOS),
+            help=f'Comma-separated scenarios to report (default: {",".join(SCENARIOS)})'
+        )
+        parser.add_argument('--requests', type=int, default=50, help='Samples per request-level scenario (default: 50)')
+        parser.add_argument('--ai-latency-ms', type=float, default=50, help='Fake Gemini latency (default: 50)')
+        parser.add_argument('--ai-response-bytes', type=int, default=4000, help='Fake Gemini answer size (default: 4000)')
+        parser.add_argument('--wp-latency-ms', type=float, default=20, help='Fake WordPress latency (default: 20)')
+        parser.add_argument('--wp-post-bytes', type=int, default=3000, help='Fake WordPress post size (default: 3000)')
+        parser.add_argument(
+            '--db-file',
+            help='SQLite file for the benchmark database; by default it is kept in memory'
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Results JSON of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [parse_size(size.strip()) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError(f"Invalid --sizes: {options['sizes']}")
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        if options['verbosity'] < 2:
+            # One log line per Gemini call would bury the progress output
+            logging.getLogger('core').setLevel(logging.WARNING)
+
+        results = []
+        for size in sizes:
+            results.extend(self.run_size(size, scenarios, options))
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'commit': self.commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'options': {
+                key: options[key] for key in (
+                    'requests', 'ai_latency_ms', 'ai_response_bytes', 'wp_latency_ms', 'wp_post_bytes'
+                )
+            },
+            'results': results,
+        }
+        self.print_results(results, self.load(options['compare']) if options['compare'] else None)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def run_size(self, size: int, scenarios, options):
+        """Run every scenario for one dataset size in a fresh database."""
+        if options['db_file']:
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = options['db_file']
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as lock_dir, override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                AI_LOCK_DIR=lock_dir,
+                WORDPRESS_API_URL='https://wordpress.example',
+                # Keep benchmark pages out of the shared page cache
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'benchmark',
+                    'OPTIONS': {'MAX_ENTRIES': 5000},
+                }},
+            ):
+                benchmark = Benchmark(
+                    size,
+                    requests=options['requests'],
+                    ai_latency=options['ai_latency_ms'] / 1000,
+                    ai_response_bytes=options['ai_response_bytes'],
+                    wp_latency=options['wp_latency_ms'] / 1000,
+                    wp_post_bytes=options['wp_post_bytes'],
+                )
+                return benchmark.run(scenarios, progress=lambda step: self.stderr.write(f'Running {step}...'))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    @staticmethod
+    def commit() -> str:
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
+
+    @staticmethod
+    def load(path: str):
+        try:
+            with open(path, encoding='utf-8') as baseline:
+                return {(r['size'], r['scenario']): r for r in json.load(baseline)['results']}
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    def print_results(self, results, baseline=None):
+        self.stdout.write(
+            f"{'size':>8}  {'scenario':<44} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}"
+            + ('  vs baseline' if baseline else '')
+        )
+        for result in results:
+            line = (
+                f"{result['size']:>8}  {result['scenario']:<44} {result['throughput'] or 0:>10.1f} "
+                f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f}"
+            )
+            before = (baseline or {}).get((result['size'], result['scenario']))
+            if before and before.get('throughput'):
+                change = result['throughput'] / before['throughput'] - 1
+                line += f"  {change:+.1%} ops/s, p99 {before['p99_ms']:.2f} -> {result['p99_ms']:.2f} ms"
+            self.stdout.write(line)
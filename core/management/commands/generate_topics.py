@@ -0,0 +1,62 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Category
+from core.services import dedup_service, topic_batch
+from core.services.topic_import import TopicImportService
+
+
+class Command(BaseCommand):
+    help = 'Generate topic ideas for many categories concurrently, optionally saving them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'categories', nargs='*',
+            help='Category slugs (default: every category)'
+        )
+        parser.add_argument('--count', type=int, default=3, help='Ideas per category')
+        parser.add_argument(
+            '--concurrency', type=int,
+            help='Gemini requests in flight at once (default: AI_BATCH_CONCURRENCY)'
+        )
+        parser.add_argument('--refresh', action='store_true', help="Don't reuse cached responses")
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Save the ideas that are not likely duplicates, in one bulk import'
+        )
+
+    def handle(self, *args, **options):
+        categories = Category.objects.order_by('name')
+        if options['categories']:
+            categories = categories.filter(slug__in=options['categories'])
+        categories = list(categories)
+        missing = set(options['categories']) - {category.slug for category in categories}
+        if missing:
+            raise CommandError(f"Unknown categories: {', '.join(sorted(missing))}")
+
+        results = asyncio.run(topic_batch.generate_for_categories(
+            categories,
+            options['count'],
+            use_cache=not options['refresh'],
+            concurrency=options['concurrency'],
+        ))
+        for result in results:
+            if result.error:
+                self.stderr.write(f'{result.category.name}: failed ({result.error})')
+                continue
+            self.stdout.write(f'{result.category.name}:')
+            for idea in result.ideas:
+                self.stdout.write(f"  - {idea.get('title', '')}")
+
+        ideas = topic_batch.combined_ideas(results)
+        if not options['save']:
+            self.stdout.write(f'Generated {len(ideas)} ideas; use --save to store them')
+            return
+
+        matches = dedup_service.find_duplicates(ideas)
+        fresh = [idea for idea, match in zip(ideas, matches) if match is None]
+        saved = TopicImportService().import_records(('topic', idea) for idea in fresh)['topics']
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved {saved} topics ({len(ideas) - len(fresh)} likely duplicates skipped)'
+        ))
@@ -0,0 +1,69 @@
+import os
+import re
+import shlex
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = 'Measure the time a management command spends importing modules, and fail over budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'target', nargs='?', default='check',
+            help='Command line to measure, quoted (default: "check")'
+        )
+        parser.add_argument('--runs', type=int, default=3, help='Runs to take the fastest of (default: 3)')
+        parser.add_argument('--budget', type=int, help='Milliseconds allowed (default: IMPORT_BUDGET_MS)')
+        parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list (default: 10)')
+
+    def measure(self, target: str):
+        """
+        Run `manage.py <target>` with -X importtime.
+
+        Returns:
+            Tuple[float, Dict[str, int], Set[str]]: Total milliseconds spent
+            importing, cumulative microseconds per top-level import, and
+            every module imported
+        """
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', str(settings.BASE_DIR / 'manage.py'), *shlex.split(target)],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        if result.returncode:
+            raise CommandError(f'"{target}" failed:\n{result.stderr[-2000:]}')
+
+        top_level, modules = {}, set()
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if not match:
+                continue
+            _, cumulative, indent, name = match.groups()
+            modules.add(name)
+            if not indent:
+                top_level[name] = int(cumulative)
+        return sum(top_level.values()) / 1000, top_level, modules
+
+    def handle(self, *args, **options):
+        target = options['target']
+        budget = options['budget'] or settings.IMPORT_BUDGET_MS
+        total, top_level, modules = min(
+            (self.measure(target) for _ in range(max(1, options['runs']))),
+            key=lambda run: run[0],
+        )
+
+        self.stdout.write(f'Imports for "manage.py {target}": {total:.0f} ms (budget {budget} ms)')
+        for name, micros in sorted(top_level.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {micros / 1000:8.1f} ms  {name}')
+
+        eager = [name for name in settings.LAZY_IMPORTS if name in modules]
+        if eager:
+            raise CommandError(f'Imported at startup but expected to load lazily: {", ".join(eager)}')
+        if total > budget:
+            raise CommandError(f'Import time {total:.0f} ms is over the {budget} ms budget')
+        self.stdout.write(self.style.SUCCESS('Within budget'))
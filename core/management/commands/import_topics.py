@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Category
+from core.services.topic_import import TopicImportError, TopicImportService
+
+
+class Command(BaseCommand):
+    help = 'Import categories and topics from a JSON or JSON Lines file, streaming it in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import (.json, .jsonl or .ndjson)')
+        parser.add_argument(
+            '--jsonl', action='store_true',
+            help='Read the file as JSON Lines regardless of its extension'
+        )
+        parser.add_argument(
+            '--category',
+            help='Slug of the category for topics that do not name one'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Topics inserted per batch (default: TOPIC_IMPORT_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--no-index', action='store_true',
+            help='Skip search/duplicate indexing; run rebuild_search_index and '
+                 'rebuild_similarity_index afterwards'
+        )
+
+    def handle(self, *args, **options):
+        default_category = None
+        if options['category']:
+            default_category = Category.objects.filter(slug=options['category']).first()
+            if default_category is None:
+                raise CommandError(f"Unknown category '{options['category']}'")
+
+        service = TopicImportService(
+            batch_size=options['batch_size'],
+            send_signals=not options['no_index'],
+        )
+        try:
+            result = service.import_file(
+                options['path'],
+                jsonl=True if options['jsonl'] else None,
+                default_category=default_category,
+            )
+        except (OSError, TopicImportError) as e:
+            raise CommandError(f'Error importing topics: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['topics']} topics and {result['categories']} new categories"
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Article, Topic, WordPressPost
+from core.services.search_service import get_search_backend, index_instances
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from articles, topics and WordPress posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows indexed per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            get_search_backend().clear()
+            for model in (Article, Topic, WordPressPost):
+                batch = []
+                indexed = 0
+                for instance in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+                    batch.append(instance)
+                    if len(batch) >= batch_size:
+                        index_instances(batch)
+                        indexed += len(batch)
+                        batch = []
+                index_instances(batch)
+                indexed += len(batch)
+                self.stdout.write(f'Indexed {indexed} {model._meta.verbose_name_plural}')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
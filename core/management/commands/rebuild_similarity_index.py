@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SimilaritySignature, Topic, WordPressPost
+from core.services.dedup_service import index_instances
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the duplicate-detection signatures for topics and WordPress posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows indexed per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        SimilaritySignature.objects.all().delete()
+        for model, fields in ((Topic, ['title']), (WordPressPost, ['title', 'wp_id'])):
+            batch = []
+            indexed = 0
+            queryset = model.objects.order_by('pk').only(*fields)
+            for instance in queryset.iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    index_instances(batch)
+                    indexed += len(batch)
+                    batch = []
+            index_instances(batch)
+            indexed += len(batch)
+            self.stdout.write(f'Indexed {indexed} {model._meta.verbose_name_plural}')
+        self.stdout.write(self.style.SUCCESS('Similarity index rebuilt'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.services import counters
+
+
+class Command(BaseCommand):
+    help = 'Recount topics, articles and WordPress posts and correct the dashboard counters'
+
+    def handle(self, *args, **options):
+        changes = counters.reconcile()
+        for name, (stored, actual) in sorted(changes.items()):
+            self.stdout.write(f'{name}: {stored} -> {actual}')
+        if changes:
+            self.stdout.write(self.style.WARNING(f'Corrected {len(changes)} counters'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All counters are correct'))
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from core.services.ai_service import AIService
+from core.services import registry
+from core.services.generation_queue import claim_next_job, requeue_stale_jobs, run_job, touch_running_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers that process queued article generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=2,
+            help='Number of jobs to process in parallel (default: 2)'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait before polling an empty queue again (default: 2)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+        stop = threading.Event()
+        # Ids of the jobs this process is working on
+        running = set()
+        running_lock = threading.Lock()
+
+        # Import the Gemini SDK and build its client before taking jobs
+        registry.warm_up()
+        self.requeue_stale_jobs([])
+
+        def work():
+            ai_service = AIService()
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    job = claim_next_job()
+                    if job is None:
+                        if once:
+                            return
+                        stop.wait(poll_interval)
+                        continue
+
+                    self.stdout.write(f'Generating article for "{job.topic.title}" (job {job.id})')
+                    with running_lock:
+                        running.add(job.id)
+                    try:
+                        run_job(job, ai_service)
+                    finally:
+                        with running_lock:
+                            running.discard(job.id)
+                    if job.status == 'failed':
+                        self.stderr.write(f'Job {job.id} failed: {job.error}')
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f'Job {job.id} finished'))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=work, name=f'generation-worker-{i}', daemon=True)
+            for i in range(concurrency)
+        ]
+        self.stdout.write(f'Starting {concurrency} generation workers')
+        for thread in threads:
+            thread.start()
+
+        try:
+            # Once per poll interval, mark this process's jobs as alive and
+            # put jobs of workers that crashed meanwhile back on the queue
+            next_requeue = time.monotonic() + poll_interval
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.5)
+                if time.monotonic() >= next_requeue:
+                    with running_lock:
+                        job_ids = list(running)
+                    self.requeue_stale_jobs(job_ids)
+                    next_requeue = time.monotonic() + poll_interval
+        except KeyboardInterrupt:
+            self.stdout.write('Shutting down, waiting for running jobs to finish...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def requeue_stale_jobs(self, own_job_ids):
+        try:
+            touch_running_jobs(own_job_ids)
+            requeued = requeue_stale_jobs()
+        except DatabaseError as e:
+            self.stderr.write(f'Could not requeue stale jobs: {e}')
+            return
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
@@ -0,0 +1,25 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.sync_service import WordPressSyncService
+
+
+class Command(BaseCommand):
+    help = 'Sync published WordPress posts, fetching only posts modified since the last sync'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Ignore the sync watermark and re-read every post'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = WordPressSyncService().sync(full=options['full'])
+        except requests.RequestException as e:
+            raise CommandError(f'Error syncing WordPress posts: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fetched {result['fetched']} posts: {result['created']} new, "
+            f"{result['updated']} updated, {result['unchanged']} unchanged"
+        ))
@@ -0,0 +1,195 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+# Seconds; suits both database queries and upstream API calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_metrics: List['Metric'] = []
+_metrics_lock = threading.Lock()
+
+# [queries, seconds] of the request being handled, see query_timer()
+_request_queries: ContextVar = ContextVar('request_queries', default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    A named metric with optional labels, kept in process memory.
+
+    Instances register themselves when created; render() writes every
+    registered metric in the Prometheus text format.
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+        with _metrics_lock:
+            _metrics.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. requests or bytes received."""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{_labels(self.labelnames, key)} {_number(value)}'
+
+
+class Histogram(Metric):
+    """Counts observations (e.g. durations) into buckets, plus their sum."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block took, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, float('inf')), counts):
+                cumulative += bucket
+                le = f'le="{_number(bound)}"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, key)} {count}'
+
+
+class Collected(Metric):
+    """
+    A metric read at scrape time from state kept elsewhere, e.g. the
+    hit counters of a cache.
+
+    read() returns a number, or a dict mapping a label value (or a tuple
+    of label values) to a number.
+    """
+
+    def __init__(self, name: str, documentation: str, read: Callable, labelnames: Iterable[str] = (),
+                 metric_type: str = 'gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.read = read
+        self.type = metric_type
+
+    def samples(self) -> Iterator[str]:
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            yield f'{self.name}{_labels(self.labelnames, key)} {_number(value)}'
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    with _metrics_lock:
+        metrics = list(_metrics)
+    return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+db_query_duration = Histogram('db_query_duration_seconds', 'Database queries run by the app')
+
+
+def query_timer(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing every query.
+
+    Queries are also added to the tally of the request being handled, if
+    any. The tally lives in a context variable, so queries an async view
+    runs through sync_to_async are counted too.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        db_query_duration.observe(elapsed)
+        tally = _request_queries.get()
+        if tally is not None:
+            tally[0] += 1
+            tally[1] += elapsed
+
+
+@contextmanager
+def counting_queries():
+    """Tally the queries run in the block; yields [queries, seconds]."""
+    tally = [0, 0.0]
+    token = _request_queries.set(tally)
+    try:
+        yield tally
+    finally:
+        _request_queries.reset(token)
@@ -0,0 +1,64 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+request_count = metrics.Counter(
+    'http_requests_total', 'Requests handled, by view, method and status', ['view', 'method', 'status']
+)
+request_duration = metrics.Histogram(
+    'http_request_duration_seconds', 'Time to build the response, by view', ['view']
+)
+request_queries = metrics.Histogram(
+    'http_request_db_queries', 'Database queries per request, by view', ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500),
+)
+request_query_duration = metrics.Histogram(
+    'http_request_db_duration_seconds', 'Time spent in database queries per request, by view', ['view']
+)
+
+
+class MetricsMiddleware:
+    """
+    Time every request and count the database queries it runs.
+
+    Works for sync and async views; queries an async view runs through
+    sync_to_async are included. Streaming responses are timed until the
+    response object is returned, not until the last chunk is sent.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with metrics.counting_queries() as tally:
+            response = self.get_response(request)
+        self.record(request, response, started, tally)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with metrics.counting_queries() as tally:
+            response = await self.get_response(request)
+        self.record(request, response, started, tally)
+        return response
+
+    @staticmethod
+    def record(request, response, started: float, tally):
+        match = getattr(request, 'resolver_match', None)
+        # Unmatched URLs share one label so that 404 probes cannot add series
+        view = match.view_name if match is not None else 'unmatched'
+        request_count.inc(view=view, method=request.method, status=response.status_code)
+        request_duration.observe(time.perf_counter() - started, view=view)
+        request_queries.observe(tally[0], view=view)
+        request_query_duration.observe(tally[1], view=view)
@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-18 07:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band_key', models.CharField(db_index=True, max_length=24)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilaritySignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.PositiveSmallIntegerField()),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('signature', models.BinaryField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='similaritysignature',
+            constraint=models.UniqueConstraint(fields=('doc_type', 'object_id'), name='unique_similarity_signature'),
+        ),
+        migrations.AddField(
+            model_name='similarityband',
+            name='signature',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='core.similaritysignature'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_similarity_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['created_at', 'id'], name='article_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['created_at', 'id'], name='topic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='topic_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='topic_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wordpresspost',
+            index=models.Index(fields=['published_date', 'id'], name='wppost_published_idx'),
+        ),
+    ]
@@ -0,0 +1,120 @@
+import html
+import re
+import zlib
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+BATCH_SIZE = 500
+
+# (ContentBody.kind, model name, key field)
+BODY_SOURCES = [
+    (1, 'Article', 'pk'),
+    (2, 'WordPressPost', 'wp_id'),
+]
+
+
+def plain_text(value):
+    text = strip_tags(re.sub(r'<', ' <', value or ''))
+    return ' '.join(html.unescape(text).split())
+
+
+def move_bodies_out(apps, schema_editor):
+    ContentBody = apps.get_model('core', 'ContentBody')
+    Article = apps.get_model('core', 'Article')
+
+    for kind, model_name, key in BODY_SOURCES:
+        model = apps.get_model('core', model_name)
+        bodies = []
+        excerpts = []
+        rows = model.objects.order_by('pk').values_list('pk', key, 'content').iterator(chunk_size=BATCH_SIZE)
+        for pk, object_id, content in rows:
+            raw = (content or '').encode('utf-8')
+            data = zlib.compress(raw)
+            codec = 'zlib'
+            if len(data) >= len(raw):
+                codec, data = 'raw', raw
+            bodies.append(ContentBody(kind=kind, object_id=object_id, codec=codec, data=data, raw_size=len(raw)))
+            if model_name == 'Article':
+                excerpts.append(Article(pk=pk, excerpt=Truncator(plain_text(content)).words(60)))
+            if len(bodies) >= BATCH_SIZE:
+                ContentBody.objects.bulk_create(bodies)
+                Article.objects.bulk_update(excerpts, ['excerpt'])
+                bodies, excerpts = [], []
+        ContentBody.objects.bulk_create(bodies)
+        Article.objects.bulk_update(excerpts, ['excerpt'])
+
+
+def move_bodies_back(apps, schema_editor):
+    ContentBody = apps.get_model('core', 'ContentBody')
+
+    for kind, model_name, key in BODY_SOURCES:
+        model = apps.get_model('core', model_name)
+        keys = dict(model.objects.values_list(key, 'pk'))
+        updates = []
+        for object_id, codec, data in ContentBody.objects.filter(kind=kind).values_list(
+                'object_id', 'codec', 'data').iterator(chunk_size=BATCH_SIZE):
+            if object_id not in keys:
+                continue
+            data = bytes(data)
+            if codec == 'zlib':
+                data = zlib.decompress(data)
+            elif codec != 'raw':
+                raise RuntimeError(f"Cannot restore {codec}-compressed bodies in this migration")
+            updates.append(model(pk=keys[object_id], content=data.decode('utf-8')))
+            if len(updates) >= BATCH_SIZE:
+                model.objects.bulk_update(updates, ['content'])
+                updates = []
+        model.objects.bulk_update(updates, ['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentBody',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField()),
+                ('object_id', models.BigIntegerField()),
+                ('codec', models.CharField(max_length=8)),
+                ('data', models.BinaryField()),
+                ('raw_size', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='contentbody',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_content_body'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(move_bodies_out, move_bodies_back),
+        # blank=True gives the columns an empty default, so that unapplying
+        # this migration can re-add them to populated tables
+        migrations.AlterField(
+            model_name='article',
+            name='content',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='wordpresspost',
+            name='content',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RemoveField(
+            model_name='article',
+            name='content',
+        ),
+        migrations.RemoveField(
+            model_name='wordpresspost',
+            name='content',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-18 07:46
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_rows(apps, schema_editor):
+    Counter = apps.get_model('core', 'Counter')
+    Topic = apps.get_model('core', 'Topic')
+    counts = {
+        'topics': Topic.objects.count(),
+        'articles': apps.get_model('core', 'Article').objects.count(),
+        'wordpress_posts': apps.get_model('core', 'WordPressPost').objects.count(),
+    }
+    for status, total in Topic.objects.values_list('status').annotate(total=Count('id')).order_by():
+        counts[f'topics.status.{status}'] = total
+    for category_id, total in Topic.objects.values_list('category_id').annotate(total=Count('id')).order_by():
+        counts[f'topics.category.{category_id}'] = total
+    Counter.objects.bulk_create([Counter(name=name, value=value) for name, value in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_content_bodies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_rows, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
-from django.utils.text import slugify
+from django.db import models, transaction
 from django.utils import timezone
+from django.utils.text import Truncator
+
+from .services.content_store import CompressedBody, save_bodies
+from .services.search_service import html_to_text
+from .services.slugs import allocate_slugs
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -10,7 +14,7 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            self.slug = allocate_slugs(Category, [self.name], fallback='category')[0]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -34,30 +38,66 @@ class Topic(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Values the counters were last adjusted for, so that a status or
+        # category change can move them (None when a field was deferred)
+        status, category_id = instance.__dict__.get('status'), instance.__dict__.get('category_id')
+        instance._counted = (status, category_id) if status and category_id else None
+        # Title of the stored duplicate-index signature (see core.signals)
+        instance._indexed_title = instance.__dict__.get('title')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+            self.slug = allocate_slugs(Topic, [self.title], fallback='topic')[0]
+        # Row and counter updates (see core.signals) commit together
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
+    class Meta:
+        # Keyset pagination on (created_at, id), optionally filtered
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='topic_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='topic_status_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='topic_category_created_idx'),
+        ]
+
 class Article(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
-    content = models.TextField()
+    # Stored compressed in ContentBody and loaded on first access
+    content = CompressedBody('article')
+    # Plain-text start of the content, for list pages
+    excerpt = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Words of plain text kept in excerpt
+    EXCERPT_WORDS = 60
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+            self.slug = allocate_slugs(Article, [self.title], fallback='article')[0]
+        if self.__dict__.get('_body_dirty'):
+            self.excerpt = Truncator(html_to_text(self.content)).words(self.EXCERPT_WORDS)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            save_bodies([self])
 
     def __str__(self):
         return self.title
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='article_created_idx'),
+        ]
+
 class ArticleParameters(models.Model):
     name = models.CharField(max_length=100)
     purpose = models.TextField()
@@ -84,15 +124,131 @@ class WordPressPost(models.Model):
     wp_id = models.IntegerField(unique=True)
     title = models.CharField(max_length=200)
     excerpt = models.TextField(blank=True)
-    content = models.TextField()
+    # Stored compressed in ContentBody, keyed by wp_id like the other indexes
+    content = CompressedBody('wordpress_post', key='wp_id')
     wp_url = models.URLField()
     published_date = models.DateTimeField()
+    modified_date = models.DateTimeField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
     last_synced = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Title of the stored duplicate-index signature (see core.signals)
+        instance._indexed_title = instance.__dict__.get('title')
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            save_bodies([self])
+
     def __str__(self):
         return self.title
 
     class Meta:
-        ordering = ['-published_date'] 
\ No newline at end of file
+        ordering = ['-published_date']
+        indexes = [
+            models.Index(fields=['published_date', 'id'], name='wppost_published_idx'),
+        ]
+
+class SyncCursor(models.Model):
+    """Watermark of the newest upstream modification seen by a sync."""
+    name = models.CharField(max_length=100, unique=True)
+    modified_gmt = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.modified_gmt}"
+
+class SimilaritySignature(models.Model):
+    """MinHash signature of a topic or WordPress post title for duplicate detection."""
+    doc_type = models.PositiveSmallIntegerField()
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=200)
+    signature = models.BinaryField()
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doc_type', 'object_id'], name='unique_similarity_signature'),
+        ]
+
+class SimilarityBand(models.Model):
+    """LSH bucket membership: one row per band of each signature."""
+    band_key = models.CharField(max_length=24, db_index=True)
+    signature = models.ForeignKey(SimilaritySignature, on_delete=models.CASCADE, related_name='bands')
+
+    def __str__(self):
+        return self.band_key
+
+class GenerationJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='generation_jobs')
+    parameters = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    article = models.ForeignKey(Article, on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def __str__(self):
+        return f"{self.topic} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at', 'id']
+
+class AIResponseCache(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    response = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model_name}:{self.key[:12]}"
+
+    class Meta:
+        verbose_name = "AI response cache entry"
+        verbose_name_plural = "AI response cache entries"
+
+class ContentBody(models.Model):
+    """Compressed body text of an Article or WordPressPost."""
+    kind = models.PositiveSmallIntegerField()
+    object_id = models.BigIntegerField()
+    codec = models.CharField(max_length=8)
+    data = models.BinaryField()
+    raw_size = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_content_body'),
+        ]
+
+class Counter(models.Model):
+    """Running row count kept up to date by signals (see services.counters)."""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
@@ -0,0 +1,101 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+
+_version_lock = threading.Lock()
+_last_version = 0
+
+
+def _version_key(namespace: str) -> str:
+    return f'page-ns:{namespace}'
+
+
+def _fresh_version() -> int:
+    # Time-based, so a version key that was evicted never comes back with
+    # a value an older cached page was stored under; strictly increasing
+    # within the process, so two bumps in the same microsecond still differ
+    global _last_version
+    with _version_lock:
+        _last_version = max(time.time_ns() // 1000, _last_version + 1)
+        return _last_version
+
+
+def versions(namespaces: Iterable[str]) -> str:
+    """
+    Return the current versions of the given namespaces as one string.
+
+    Cached pages and fragments include this string in their keys, so
+    bumping any of the namespaces makes every entry built on it unreachable
+    without having to find and delete those entries.
+    """
+    keys = [_version_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    parts = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), timeout=None)
+            found[key] = cache.get(key)
+        parts.append(str(found[key]))
+    return '.'.join(parts)
+
+
+def invalidate(*namespaces: str):
+    """Bump namespace versions once the current transaction (if any) commits."""
+    def bump():
+        # A fresh time-based version rather than incr(): incr is a
+        # get-then-set on the file cache, so concurrent commits in two
+        # processes could both write the same version
+        cache.set_many({_version_key(namespace): _fresh_version() for namespace in namespaces}, timeout=None)
+
+    # Bumping before commit would let a concurrent request cache the old
+    # rows under the new version
+    transaction.on_commit(bump)
+
+
+def cached_view(*namespaces: str):
+    """
+    Serve a read view from the cache until one of its namespaces changes.
+
+    Entries are keyed by view, full path (including the query string) and
+    the versions of the namespaces the page is built from. Namespaces may
+    use the view's keyword arguments, e.g. 'topic:{slug}'. A cache hit
+    returns the stored page without running the view, so it makes no
+    database queries.
+
+    Pages are rendered uncached when flash messages are waiting to be
+    shown, and not stored when they carry a CSRF token or set cookies.
+
+    Args:
+        namespaces (str): Namespaces invalidated by the signal receivers
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            current = versions(namespace.format(**kwargs) for namespace in namespaces)
+            digest = hashlib.md5(f'{request.get_full_path()}|{current}'.encode()).hexdigest()
+            key = f'page:{view.__module__}.{view.__qualname__}:{digest}'
+            entry = cache.get(key)
+            if entry is not None:
+                status, content_type, content = entry
+                return HttpResponse(content, status=status, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if (response.status_code == 200 and not response.streaming and not response.cookies
+                    and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')):
+                cache.set(key, (response.status_code, response['Content-Type'], response.content),
+                          timeout=settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class KeysetPage(NamedTuple):
+    object_list: List
+    next_cursor: Optional[str]
+    previous_cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+
+def encode_cursor(values: Tuple) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple]:
+    """Decode a cursor from a query string; returns None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        first, last = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        first = parse_datetime(first) if isinstance(first, str) else None
+        if first is None or not isinstance(last, int):
+            return None
+        return first, last
+    except (ValueError, TypeError):
+        return None
+
+
+def paginate_keyset(queryset, ordering: Tuple[str, str] = ('-created_at', '-id'),
+                    after: str = None, before: str = None, per_page: int = 20) -> KeysetPage:
+    """
+    Fetch one page of a queryset by keyset (cursor) pagination.
+
+    Rows are ordered by a (datetime, id) pair and each page continues from
+    the last row of the previous one with a WHERE on those columns instead
+    of an OFFSET, so with a matching index every page costs the same no
+    matter how deep it is. No COUNT query is made.
+
+    Args:
+        queryset: Rows to page through
+        ordering (Tuple[str, str]): Datetime field then unique id field,
+            both descending ('-') or both ascending
+        after (str): Cursor of the last row of the previous page
+        before (str): Cursor of the first row of the next page (paging back)
+        per_page (int): Rows per page
+
+    Returns:
+        KeysetPage: The rows and the cursors of the neighbouring pages
+    """
+    fields = [name.lstrip('-') for name in ordering]
+    descending = ordering[0].startswith('-')
+    backwards = before is not None and after is None
+    cursor = decode_cursor(before if backwards else after) if (after or before) else None
+
+    if cursor is not None:
+        # (a, b) < (x, y) written so the leading column can use a range scan
+        forward_op = 'lt' if descending else 'gt'
+        op = {'lt': 'gt', 'gt': 'lt'}[forward_op] if backwards else forward_op
+        queryset = queryset.filter(
+            Q(**{f'{fields[0]}__{op}e': cursor[0]}),
+            Q(**{f'{fields[0]}__{op}': cursor[0]}) | Q(**{f'{fields[1]}__{op}': cursor[1]}),
+        )
+
+    order = list(ordering)
+    if backwards:
+        order = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+    rows = list(queryset.order_by(*order)[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def key(row):
+        return encode_cursor((getattr(row, fields[0]), getattr(row, fields[1])))
+
+    if not rows:
+        return KeysetPage([], None, None)
+    if backwards:
+        return KeysetPage(rows, key(rows[-1]), key(rows[0]) if more else None)
+    return KeysetPage(rows, key(rows[-1]) if more else None, key(rows[0]) if cursor is not None else None)
+
+
+def page_links(request, page: KeysetPage) -> Tuple[Optional[str], Optional[str]]:
+    """Build the next/previous URLs for a page, keeping other GET parameters."""
+    links = []
+    for name, cursor in (('after', page.next_cursor), ('before', page.previous_cursor)):
+        if cursor is None:
+            links.append(None)
+            continue
+        params = request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[name] = cursor
+        links.append(f'{request.path}?{params.urlencode()}')
+    return links[0], links[1]
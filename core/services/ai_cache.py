@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for Gemini responses keyed on a hash of model name + prompt.
+
+    The first tier is an in-process LRU dict; the second is the
+    AIResponseCache table, which survives restarts and is shared between
+    worker processes. Both tiers expire entries after a TTL and are bounded
+    in size.
+    """
+
+    # Check the DB tier size once every this many writes
+    DB_EVICT_EVERY = 50
+
+    def __init__(self, max_entries: int = None, ttl: int = None, db_max_entries: int = None):
+        self.max_entries = max_entries if max_entries is not None else settings.AI_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else settings.AI_CACHE_TTL
+        self.db_max_entries = db_max_entries if db_max_entries is not None else settings.AI_CACHE_DB_MAX_ENTRIES
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        """Return the content address for a prompt sent to a model."""
+        digest = hashlib.sha256()
+        digest.update(model_name.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(prompt.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response, checking memory first and then the database.
+
+        Args:
+            key (str): Key from make_key
+
+        Returns:
+            Optional[str]: The cached response text, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._entries[key]
+
+        from ..models import AIResponseCache
+        try:
+            row = AIResponseCache.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+        except DatabaseError as e:
+            logger.error("Error reading AI response cache: %s", e)
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.db_hits += 1
+            self._remember(key, row.response, row.expires_at.timestamp())
+        return row.response
+
+    def set(self, key: str, model_name: str, value: str):
+        """Store a response in both tiers."""
+        expires_at = timezone.now() + timedelta(seconds=self.ttl)
+        with self._lock:
+            self._remember(key, value, expires_at.timestamp())
+            self._writes += 1
+            evict_db = self._writes % self.DB_EVICT_EVERY == 0
+
+        from ..models import AIResponseCache
+        try:
+            AIResponseCache.objects.update_or_create(
+                key=key,
+                defaults={
+                    'model_name': model_name,
+                    'response': value,
+                    'expires_at': expires_at,
+                }
+            )
+            if evict_db:
+                self._evict_db()
+        except DatabaseError as e:
+            logger.error("Error writing AI response cache: %s", e)
+
+    def delete(self, key: str):
+        """Drop a single entry from both tiers."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+        from ..models import AIResponseCache
+        AIResponseCache.objects.filter(key=key).delete()
+
+    def clear(self):
+        """Empty both tiers."""
+        with self._lock:
+            self._entries.clear()
+
+        from ..models import AIResponseCache
+        AIResponseCache.objects.all().delete()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'memory_entries': len(self._entries),
+            }
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        # Caller holds the lock
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_db(self):
+        from ..models import AIResponseCache
+        AIResponseCache.objects.filter(expires_at__lte=timezone.now()).delete()
+        overflow = AIResponseCache.objects.count() - self.db_max_entries
+        if overflow > 0:
+            oldest = AIResponseCache.objects.order_by('created_at').values_list('id', flat=True)[:overflow]
+            deleted, _ = AIResponseCache.objects.filter(id__in=list(oldest)).delete()
+            with self._lock:
+                self.evictions += deleted
+
+
+# Shared by every AIService instance in the process
+response_cache = ResponseCache()
+
+
+def _lookups() -> Dict[str, int]:
+    stats = response_cache.stats()
+    return {'memory_hit': stats['memory_hits'], 'db_hit': stats['db_hits'], 'miss': stats['misses']}
+
+
+metrics.Collected(
+    'gemini_cache_lookups_total', 'Gemini response cache lookups, by result', _lookups, ['result'], 'counter'
+)
+metrics.Collected(
+    'gemini_cache_memory_entries', 'Gemini responses held in process memory',
+    lambda: response_cache.stats()['memory_entries'],
+)
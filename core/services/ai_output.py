@@ -0,0 +1,131 @@
+import json
+import re
+import threading
+from typing import Dict, List
+
+from .. import metrics
+
+# JSON schema sent with structured-output requests for topic ideas
+TOPIC_IDEAS_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'title': {'type': 'string'},
+            'description': {'type': 'string'},
+        },
+        'required': ['title', 'description'],
+    },
+}
+
+_FENCE = re.compile(r'^\s*```[a-zA-Z]*\s*|\s*```\s*$')
+_decoder = json.JSONDecoder()
+
+
+class AIResponseError(ValueError):
+    """Raised when a model response contains nothing usable."""
+
+
+class ParseStats:
+    """Process-wide counts of how model responses were parsed."""
+
+    OUTCOMES = ('parsed', 'salvaged', 'failed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.OUTCOMES, 0)
+
+    def record(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+parse_stats = ParseStats()
+
+metrics.Collected(
+    'gemini_responses_parsed_total', 'Topic idea responses, by how they were parsed', parse_stats.stats,
+    ['outcome'], 'counter'
+)
+
+
+def _loads_prefix(text: str):
+    """Decode the first JSON array or object in text, ignoring what follows."""
+    start = min((i for i in (text.find('['), text.find('{')) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError('no JSON value')
+    value, _ = _decoder.raw_decode(text, start)
+    return value
+
+
+def _salvage_objects(text: str) -> List:
+    """Decode every complete top-level-looking object, e.g. from a truncated array."""
+    objects = []
+    pos = text.find('{')
+    while pos >= 0:
+        try:
+            value, end = _decoder.raw_decode(text, pos)
+        except ValueError:
+            pos = text.find('{', pos + 1)
+            continue
+        objects.append(value)
+        pos = text.find('{', end)
+    return objects
+
+
+def _topic_items(value) -> List:
+    if isinstance(value, dict):
+        # {"topics": [...]} and similar wrappers, or a single idea
+        for item in value.values():
+            if isinstance(item, list):
+                return item
+        return [value]
+    return value if isinstance(value, list) else []
+
+
+def parse_topic_ideas(text: str) -> List[Dict]:
+    """
+    Parse topic ideas from a model response, tolerating common deviations.
+
+    Accepts a bare JSON array, one wrapped in ``` fences or surrounded by
+    prose, and wrapper objects. If the JSON is broken (e.g. the response
+    was cut off), every complete idea object in it is salvaged. Ideas
+    without a title are dropped. The outcome is counted in parse_stats.
+
+    Args:
+        text (str): The response text
+
+    Returns:
+        List[Dict]: Ideas with string 'title' and 'description'
+
+    Raises:
+        AIResponseError: If the response holds no usable idea
+    """
+    text = (text or '').strip()
+    salvaged = False
+    try:
+        value = json.loads(text)
+    except ValueError:
+        try:
+            value = _loads_prefix(_FENCE.sub('', text))
+        except ValueError:
+            value = _salvage_objects(text)
+            salvaged = True
+
+    items = _topic_items(value)
+    ideas = [
+        {
+            'title': str(item['title']).strip(),
+            'description': str(item.get('description') or '').strip(),
+        }
+        for item in items
+        if isinstance(item, dict) and str(item.get('title') or '').strip()
+    ]
+    if not ideas:
+        parse_stats.record('failed')
+        raise AIResponseError(f'No topic ideas could be read from the response ({len(text)} characters)')
+    parse_stats.record('salvaged' if salvaged or len(ideas) < len(items) else 'parsed')
+    return ideas
@@ -1,17 +1,245 @@
+import asyncio
+import logging
 import os
-import json
-from typing import Dict, List
-import google.generativeai as genai
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
+from .. import metrics
+from . import prompts, registry
+from .ai_cache import response_cache
+from .ai_output import TOPIC_IDEAS_SCHEMA, AIResponseError, parse_topic_ideas
+from .rate_limit import RateLimitExceeded, ai_rate_limiter, backoff, retry_after
+from .single_flight import ai_single_flight, async_ai_single_flight, async_process_lock, process_lock
+
+
+@lru_cache(maxsize=None)
+def gemini_errors() -> Tuple[tuple, tuple]:
+    """
+    Return (throttling, retryable) Gemini exception classes.
+
+    Throttling errors mean "slow down" and shrink the concurrency limit;
+    retryable errors are worth another attempt. Imported on first use
+    because google.api_core is slow to import.
+    """
+    from google.api_core import exceptions
+    throttling = (
+        exceptions.ResourceExhausted,
+        exceptions.TooManyRequests,
+        exceptions.ServiceUnavailable,
+    )
+    return throttling, throttling + (
+        exceptions.InternalServerError,
+        exceptions.DeadlineExceeded,
+    )
+
+
+logger = logging.getLogger(__name__)
+
+gemini_call_duration = metrics.Histogram(
+    'gemini_request_duration_seconds', 'Gemini API calls including failed attempts; streams until the last chunk',
+    ['operation'],
+)
+gemini_call_errors = metrics.Counter('gemini_errors_total', 'Failed Gemini API calls, by exception', ['operation', 'error'])
+gemini_tokens = metrics.Counter(
+    'gemini_tokens_total', 'Tokens of Gemini calls (estimated when Gemini does not report them)', ['kind']
+)
+gemini_response_bytes = metrics.Counter('gemini_response_bytes_total', 'Bytes of text received from Gemini')
+gemini_results = metrics.Counter(
+    'gemini_results_total', 'Results returned to callers, by whether Gemini was called or the answer reused',
+    ['source'],
+)
+
+
+@contextmanager
+def observed_call(operation: str):
+    """Time a Gemini API call and count it if it fails."""
+    with gemini_call_duration.time(operation=operation):
+        try:
+            yield
+        except Exception as e:
+            gemini_call_errors.inc(operation=operation, error=e.__class__.__name__)
+            raise
+
 class AIService:
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    model_name = 'gemini-2.0-flash-exp'
+
+    def __init__(self, cache=None, limiter=None, model=None):
+        # The configured SDK and model are shared by the process; see registry
+        self._model = model
+        self.cache = cache if cache is not None else response_cache
+        self.limiter = limiter if limiter is not None else ai_rate_limiter
+        # Token counts of the most recent call; see _record_usage
+        self.last_usage = None
+        self._last_response = None
 
-    def generate_article(self, topic, parameters=None) -> str:
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._shared_model()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _shared_model(self):
+        return registry.gemini_model(self.model_name)
+
+    def _generate(self, prompt: str, use_cache: bool = True, schema: Dict = None) -> str:
         """
-        Generate article content for a given topic using specified parameters.
+        Send a prompt to Gemini, serving byte-identical prompts from the cache.
+        
+        Identical prompts that are already in flight are not sent twice:
+        threads in this process wait for the running call, and other
+        processes wait on a per-prompt file lock and then read the result
+        from the shared cache.
+        
+        Args:
+            prompt (str): The final prompt text
+            use_cache (bool): Set to False to skip the cache for this call
+            schema (Dict): Ask for JSON matching this schema (structured output)
+            
+        Returns:
+            str: The response text
+        """
+        key = self._cache_key(prompt, schema)
+        self._last_response = None
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._record_usage(prompt, cached)
+                return cached
+        
+        def fetch():
+            if not use_cache:
+                return self._call_model(prompt, schema)
+            
+            with process_lock(key, settings.AI_LOCK_DIR):
+                # Another process may have finished this prompt while we waited
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+                text = self._call_model(prompt, schema)
+                self.cache.set(key, self.model_name, text)
+                return text
+        
+        text = ai_single_flight.do(key, fetch)
+        # Callers that shared another thread's request report it as not sent
+        self._record_usage(prompt, text, self._last_response)
+        return text
+
+    def _cache_key(self, prompt: str, schema: Dict = None) -> str:
+        # Structured and free-form answers to the same prompt differ
+        if self._generation_config(schema) is not None:
+            return self.cache.make_key(f'{self.model_name}+json', prompt)
+        return self.cache.make_key(self.model_name, prompt)
+
+    @staticmethod
+    def _generation_config(schema: Dict = None):
+        if schema is None or not settings.AI_STRUCTURED_OUTPUT:
+            return None
+        return {'response_mime_type': 'application/json', 'response_schema': schema}
+
+    def _call_model(self, prompt: str, schema: Dict = None) -> str:
+        """
+        Send a prompt through the rate limiter, retrying throttled and
+        transient failures.
+        
+        Raises:
+            RateLimitExceeded: If Gemini still throttles after AI_MAX_RETRIES retries
+        """
+        estimate = self._token_estimate(prompt)
+        config = self._generation_config(schema)
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            with self.limiter.slot(estimate) as slot:
+                try:
+                    with observed_call('generate'):
+                        response = self.model.generate_content(prompt, generation_config=config)
+                        text = response.text
+                except gemini_errors()[1] as e:
+                    delay = self._retry_delay(slot, e, attempt)
+                else:
+                    slot.done(self._total_tokens(response))
+                    self._last_response = response
+                    return text
+            time.sleep(delay)
+
+    @staticmethod
+    def _token_estimate(prompt: str) -> int:
+        return prompts.estimate_tokens(prompt) + settings.AI_RESPONSE_TOKEN_ESTIMATE
+
+    @staticmethod
+    def _total_tokens(response):
+        return getattr(getattr(response, 'usage_metadata', None), 'total_token_count', None)
+
+    @staticmethod
+    def _retry_delay(slot, error: Exception, attempt: int) -> float:
+        """
+        Report a failed call to the limiter and return how long to wait
+        before retrying it, or raise if it should not be retried.
+        """
+        wait = retry_after(error)
+        if isinstance(error, gemini_errors()[0]):
+            slot.throttled(wait)
+        else:
+            slot.failed()
+        if attempt >= settings.AI_MAX_RETRIES:
+            if isinstance(error, gemini_errors()[0]):
+                raise RateLimitExceeded(
+                    f"Gemini is still rate limiting after {attempt + 1} attempts: {error}"
+                ) from error
+            raise error
+        delay = wait if wait is not None else backoff(attempt)
+        logger.warning("Gemini call failed (%s), retrying in %.1fs", error.__class__.__name__, delay)
+        return delay
+
+    def _record_usage(self, prompt: str, text: str, response=None) -> Dict:
+        """
+        Store the token counts of a call in self.last_usage.
+        
+        Counts come from Gemini's usage metadata when the call reached the
+        API; otherwise (cache hits, shared calls) they are local estimates
+        and 'sent' is False.
+        
+        Args:
+            prompt (str): The prompt that was sent or looked up
+            text (str): The response text
+            response: The Gemini response, or None if nothing was sent
+            
+        Returns:
+            Dict: prompt_tokens, response_tokens, estimated and sent
+        """
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None)
+        response_tokens = getattr(usage, 'candidates_token_count', None)
+        self.last_usage = {
+            'prompt_tokens': prompt_tokens or prompts.estimate_tokens(prompt),
+            'response_tokens': response_tokens or prompts.estimate_tokens(text),
+            'estimated': not (prompt_tokens and response_tokens),
+            'sent': response is not None,
+        }
+        if response is None:
+            gemini_results.inc(source='reused')
+            return self.last_usage
+
+        gemini_results.inc(source='api')
+        gemini_tokens.inc(self.last_usage['prompt_tokens'], kind='prompt')
+        gemini_tokens.inc(self.last_usage['response_tokens'], kind='response')
+        gemini_response_bytes.inc(len(text.encode()))
+        logger.info(
+            "Gemini call: %d prompt tokens, %d response tokens%s",
+            self.last_usage['prompt_tokens'], self.last_usage['response_tokens'],
+            ' (estimated)' if self.last_usage['estimated'] else '',
+        )
+        return self.last_usage
+
+    def _build_article_prompt(self, topic, parameters=None) -> str:
+        """
+        Build the article generation prompt for a topic and its parameters.
         
         Args:
             topic: The Topic object
@@ -41,139 +269,237 @@ class AIService:
                 'word_count': parameters.word_count
             }
 
-        prompt = f"""Write a comprehensive article about: {topic.title}
-
-Context and Requirements:
-1. Topic Information:
-   - Title: {topic.title}
-   - Description: {topic.description}
-   - Category: {topic.category.name}
+        return prompts.article_prompt(topic, parameters, settings.AI_PROMPT_CONTEXT_TOKENS)
 
-2. Article Parameters:
-   - Purpose: {parameters['purpose']}
-   - Target Audience: {parameters['target_audience']}
-   - Tone of Voice: {parameters['tone_of_voice']}
-   - Target Length: {parameters['word_count']} words
-
-3. Structure:
-   - Start with an engaging introduction that hooks the {parameters['target_audience']}
-   - Include 3-4 main sections with clear subheadings
-   - End with a strong conclusion that reinforces the {parameters['purpose']}
-
-4. Content Guidelines:
-   - Write in a {parameters['tone_of_voice']} tone
-   - Include specific examples and explanations suitable for the target audience
-   - Make it engaging and informative
-   - Focus on achieving the stated purpose
-   - Use simple HTML tags for structure (<h2> for headings, <p> for paragraphs)
-
-5. Format:
-   - Use <h2> tags for main section headings
-   - Use <p> tags for paragraphs
-   - Keep formatting minimal and clean
-   - No complex HTML or styling
-
-Write the complete article now, using only basic HTML tags (<h2> and <p>)."""
+    def generate_article(self, topic, parameters=None, use_cache: bool = True) -> str:
+        """
+        Generate article content for a given topic using specified parameters.
         
-        response = self.model.generate_content(prompt)
-        return response.text
+        Args:
+            topic: The Topic object
+            parameters: Either an ArticleParameters object or a dict with custom parameters
+            use_cache (bool): Set to False to always call Gemini
+        """
+        prompt = self._build_article_prompt(topic, parameters)
+        return self._generate(prompt, use_cache=use_cache)
 
-    def generate_topic_ideas(self, category_name: str, count: int = 3) -> List[Dict]:
-        prompt = f"""Generate {count} blog topic ideas for the category '{category_name}'.
-        For each topic, provide:
-        1. An engaging title
-        2. A brief description (2-3 sentences)
+    def generate_article_stream(self, topic, parameters=None, use_cache: bool = True) -> Iterator[str]:
+        """
+        Generate article content as a stream of HTML chunks.
+        
+        Chunks are yielded as soon as Gemini produces them, so callers can
+        forward them to the browser. Closing the generator early stops
+        consuming the upstream stream.
         
-        Format the response as a JSON array with 'title' and 'description' fields."""
+        Args:
+            topic: The Topic object
+            parameters: Either an ArticleParameters object or a dict with custom parameters
+            use_cache (bool): Set to False to always call Gemini
+            
+        Yields:
+            str: Consecutive pieces of the article HTML
+        """
+        prompt = self._build_article_prompt(topic, parameters)
+        key = self._cache_key(prompt)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._record_usage(prompt, cached)
+                yield cached
+                return
+        
+        chunks = []
+        self.last_usage = None
+        estimate = self._token_estimate(prompt)
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            # The slot is held until the stream ends or the caller stops reading
+            with self.limiter.slot(estimate) as slot:
+                try:
+                    with observed_call('stream'):
+                        response = self.model.generate_content(prompt, stream=True)
+                        for chunk in response:
+                            try:
+                                text = chunk.text
+                            except ValueError:
+                                # Chunks without text parts, e.g. a trailing finish_reason chunk
+                                continue
+                            if text:
+                                chunks.append(text)
+                                yield text
+                except gemini_errors()[1] as e:
+                    if chunks:
+                        # Part of the article was already sent to the client
+                        slot.failed()
+                        raise
+                    delay = self._retry_delay(slot, e, attempt)
+                else:
+                    slot.done(self._total_tokens(response))
+                    break
+            time.sleep(delay)
         
-        response = self.model.generate_content(prompt)
+        # Only complete responses are cached; a cancelled stream never gets here
+        self._record_usage(prompt, ''.join(chunks), response)
+        if use_cache:
+            self.cache.set(key, self.model_name, ''.join(chunks))
+
+    def _generate_ideas(self, prompt: str, use_cache: bool = True) -> List[Dict]:
+        """
+        Request topic ideas as structured JSON and parse them.
+        
+        Raises:
+            AIResponseError: If the response holds no usable idea; it is
+                dropped from the cache so that it is not served again
+        """
+        text = self._generate(prompt, use_cache=use_cache, schema=TOPIC_IDEAS_SCHEMA)
         try:
-            return json.loads(response.text)
-        except json.JSONDecodeError:
-            return []
+            return parse_topic_ideas(text)
+        except AIResponseError:
+            self.cache.delete(self._cache_key(prompt, TOPIC_IDEAS_SCHEMA))
+            raise
+
+    def generate_topic_ideas(self, category_name: str, count: int = 3, use_cache: bool = True) -> List[Dict]:
+        prompt = prompts.topic_ideas_prompt(category_name, count)
+        return self._generate_ideas(prompt, use_cache=use_cache)
 
-    def generate_topics_from_posts(self, posts: List[Dict], count: int = 3) -> List[Dict]:
+    def generate_topics_from_posts(self, posts: List[Dict], count: int = 3, use_cache: bool = True) -> List[Dict]:
         """
         Generate new topic ideas based on existing WordPress posts
         
+        Posts are summarized in the order given until AI_PROMPT_CONTEXT_TOKENS
+        is reached, so pass the most useful posts first
+        (see retrieval_service.select_context_posts).
+        
         Args:
-            posts (List[Dict]): List of WordPress posts
+            posts (List[Dict]): Posts with plain 'title' and 'excerpt' strings,
+                or WordPress REST API posts with rendered fields
             count (int): Number of topics to generate
+            use_cache (bool): Set to False to always call Gemini
             
         Returns:
             List[Dict]: List of generated topics
+            
+        Raises:
+            AIResponseError: If no topic could be read from the response
         """
-        # Create a summary of existing posts
-        post_summaries = "\n".join([
-            f"- {post['title']['rendered']}: {post['excerpt']['rendered']}"
-            for post in posts[:5]  # Use up to 5 posts for context
-        ])
-        
-        prompt = f"""Based on these existing blog posts:
-
-{post_summaries}
-
-Generate {count} new blog topic ideas that would complement the existing content.
-Each topic must have:
-1. A clear, engaging title
-2. A 2-3 sentence description explaining the topic
-
-Return the response in this exact JSON format:
-[
-    {{
-        "title": "Topic Title",
-        "description": "Topic description here"
-    }},
-    ...
-]
-
-Make sure:
-1. The topics are related but not duplicates of existing content
-2. Fill gaps in the current content
-3. Provide fresh perspectives or deeper dives
-4. The response is valid JSON with exactly {count} topics
-5. Each topic has both title and description fields"""
-        
-        response = self.model.generate_content(prompt)
-        try:
-            topics = self._parse_topic_ideas(response.text)
-            if not topics:  # If parsing failed, try direct JSON parsing
-                topics = json.loads(response.text)
-            return topics
-        except json.JSONDecodeError:
-            print(f"Error parsing response: {response.text}")
-            return []
-
-    def _parse_topic_ideas(self, text: str) -> List[Dict]:
-        """Parse the generated topic ideas from JSON format."""
+        # Plain-text summaries, dropped from the end once over the context budget
+        prompt = prompts.topics_from_posts_prompt(posts, count, settings.AI_PROMPT_CONTEXT_TOKENS)
+        return self._generate_ideas(prompt, use_cache=use_cache)
+
+
+class AsyncAIService(AIService):
+    """
+    AIService for async views, built on Gemini's async API.
+
+    The methods have the same names and arguments as in AIService but are
+    coroutines, so a waiting call holds no thread and one process can keep
+    many generations in flight. Each event loop has its own Gemini client
+    (see registry). Cache reads and writes, which may hit the database,
+    run in Django's sync thread.
+    """
+
+    def _shared_model(self):
+        return registry.async_gemini_model(self.model_name)
+
+    async def _generate(self, prompt: str, use_cache: bool = True, schema: Dict = None) -> str:
+        key = self._cache_key(prompt, schema)
+        self._last_response = None
+        if use_cache:
+            cached = await sync_to_async(self.cache.get)(key)
+            if cached is not None:
+                self._record_usage(prompt, cached)
+                return cached
+
+        async def fetch():
+            if not use_cache:
+                return await self._call_model(prompt, schema)
+
+            async with async_process_lock(key, settings.AI_LOCK_DIR):
+                cached = await sync_to_async(self.cache.get)(key)
+                if cached is not None:
+                    return cached
+                text = await self._call_model(prompt, schema)
+                await sync_to_async(self.cache.set)(key, self.model_name, text)
+                return text
+
+        text = await async_ai_single_flight.do(key, fetch)
+        self._record_usage(prompt, text, self._last_response)
+        return text
+
+    async def _call_model(self, prompt: str, schema: Dict = None) -> str:
+        estimate = self._token_estimate(prompt)
+        config = self._generation_config(schema)
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            async with self.limiter.aslot(estimate) as slot:
+                try:
+                    with observed_call('generate'):
+                        response = await self.model.generate_content_async(prompt, generation_config=config)
+                        text = response.text
+                except gemini_errors()[1] as e:
+                    delay = self._retry_delay(slot, e, attempt)
+                else:
+                    slot.done(self._total_tokens(response))
+                    self._last_response = response
+                    return text
+            await asyncio.sleep(delay)
+
+    async def generate_article(self, topic, parameters=None, use_cache: bool = True) -> str:
+        # Prompt building may read default parameters and the topic's category
+        prompt = await sync_to_async(self._build_article_prompt)(topic, parameters)
+        return await self._generate(prompt, use_cache=use_cache)
+
+    async def generate_article_stream(self, topic, parameters=None, use_cache: bool = True) -> AsyncIterator[str]:
+        prompt = await sync_to_async(self._build_article_prompt)(topic, parameters)
+        key = self._cache_key(prompt)
+        if use_cache:
+            cached = await sync_to_async(self.cache.get)(key)
+            if cached is not None:
+                self._record_usage(prompt, cached)
+                yield cached
+                return
+
+        chunks = []
+        self.last_usage = None
+        estimate = self._token_estimate(prompt)
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            async with self.limiter.aslot(estimate) as slot:
+                try:
+                    with observed_call('stream'):
+                        response = await self.model.generate_content_async(prompt, stream=True)
+                        async for chunk in response:
+                            try:
+                                text = chunk.text
+                            except ValueError:
+                                continue
+                            if text:
+                                chunks.append(text)
+                                yield text
+                except gemini_errors()[1] as e:
+                    if chunks:
+                        slot.failed()
+                        raise
+                    delay = self._retry_delay(slot, e, attempt)
+                else:
+                    slot.done(self._total_tokens(response))
+                    break
+            await asyncio.sleep(delay)
+
+        self._record_usage(prompt, ''.join(chunks), response)
+        if use_cache:
+            await sync_to_async(self.cache.set)(key, self.model_name, ''.join(chunks))
+
+    async def _generate_ideas(self, prompt: str, use_cache: bool = True) -> List[Dict]:
+        text = await self._generate(prompt, use_cache=use_cache, schema=TOPIC_IDEAS_SCHEMA)
         try:
-            # Clean the text to ensure it only contains the JSON part
-            text = text.strip()
-            if text.startswith('```json'):
-                text = text[7:]
-            if text.endswith('```'):
-                text = text[:-3]
-            text = text.strip()
-            
-            # Parse the JSON
-            topics = json.loads(text)
-            
-            # Validate the structure
-            if not isinstance(topics, list):
-                raise ValueError("Response is not a list of topics")
-            
-            for topic in topics:
-                if not isinstance(topic, dict):
-                    raise ValueError("Topic is not a dictionary")
-                if 'title' not in topic or 'description' not in topic:
-                    raise ValueError("Topic missing required fields")
-            
-            return topics
-            
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            print(f"Raw text: {text}")
-            return []
-        except Exception as e:
-            print(f"Error parsing topic ideas: {e}")
-            return [] 
\ No newline at end of file
+            return parse_topic_ideas(text)
+        except AIResponseError:
+            await sync_to_async(self.cache.delete)(self._cache_key(prompt, TOPIC_IDEAS_SCHEMA))
+            raise
+
+    async def generate_topic_ideas(self, category_name: str, count: int = 3, use_cache: bool = True) -> List[Dict]:
+        prompt = prompts.topic_ideas_prompt(category_name, count)
+        return await self._generate_ideas(prompt, use_cache=use_cache)
+
+    async def generate_topics_from_posts(self, posts: List[Dict], count: int = 3,
+                                         use_cache: bool = True) -> List[Dict]:
+        prompt = prompts.topics_from_posts_prompt(posts, count, settings.AI_PROMPT_CONTEXT_TOKENS)
+        return await self._generate_ideas(prompt, use_cache=use_cache)
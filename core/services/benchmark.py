@@ -0,0 +1,218 @@
+import json
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.test import Client
+
+from .. import page_cache
+from ..models import ArticleParameters, Category, Topic
+from .ai_service import AIService
+from .fakes import FakeGeminiModel, FakeWordPress, sentence
+from .generation_queue import enqueue_article_generation, run_job
+from .rate_limit import MemoryBucketStore, RateLimiter
+from .sync_service import WordPressSyncService
+from .topic_import import TopicImportService
+from .wordpress_service import WordPressService
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1M': 1_000_000}
+
+# In run order; seed and sync always run because they build the dataset
+SCENARIOS = ('seed', 'sync', 'topic_save', 'article_generation', 'list_views')
+
+LIST_URLS = (
+    '/',
+    '/topics/',
+    '/topics/?status=draft',
+    '/topics/?category={category}',
+    '/topics/?format=json',
+    '/articles/',
+    '/wordpress/posts/',
+    '/search/?q={word}',
+)
+
+
+def parse_size(value: str) -> int:
+    """'1k', '100k', '1M' or a plain number of rows."""
+    return SIZES.get(value) or int(value)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of unsorted samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered), max(1, math.ceil(fraction * len(ordered)))) - 1]
+
+
+class Timings:
+    """Latency samples of one scenario plus its wall-clock time."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def sample(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.append(time.perf_counter() - started)
+
+    def timed(self, fn: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            with self.sample():
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def result(self, scenario: str, ops: int, unit: str) -> Dict:
+        seconds = time.perf_counter() - self.started
+        samples = self.samples or [seconds]
+        return {
+            'scenario': scenario,
+            'unit': unit,
+            'ops': ops,
+            'seconds': round(seconds, 4),
+            'throughput': round(ops / seconds, 2) if seconds else None,
+            'samples': len(samples),
+            'p50_ms': round(percentile(samples, 0.50) * 1000, 3),
+            'p99_ms': round(percentile(samples, 0.99) * 1000, 3),
+            'max_ms': round(max(samples) * 1000, 3),
+        }
+
+
+class Benchmark:
+    """
+    Run the benchmark scenarios against a synthetic dataset of `size` rows.
+
+    Gemini and WordPress are replaced by FakeGeminiModel and FakeWordPress,
+    so results depend only on this code and the database. The database
+    must be a throwaway one: scenarios create `size` topics and WordPress
+    posts and never clean up.
+
+    Args:
+        size (int): Topics seeded and WordPress posts synced
+        requests (int): Samples taken by the request-level scenarios
+        ai_latency (float): Seconds each fake Gemini call takes
+        ai_response_bytes (int): Size of fake Gemini answers
+        wp_latency (float): Seconds each fake WordPress request takes
+        wp_post_bytes (int): Size of fake WordPress post bodies
+        categories (int): Categories the topics are spread over
+    """
+
+    def __init__(self, size: int, requests: int = 50, ai_latency: float = 0.05,
+                 ai_response_bytes: int = 4000, wp_latency: float = 0.02,
+                 wp_post_bytes: int = 3000, categories: int = 20):
+        self.size = size
+        self.requests = requests
+        self.categories = categories
+        self.gemini = FakeGeminiModel(latency=ai_latency, response_bytes=ai_response_bytes)
+        self.wordpress = FakeWordPress(total_posts=size, latency=wp_latency, post_bytes=wp_post_bytes)
+        self.client = Client()
+
+    def run(self, scenarios=SCENARIOS, progress: Callable[[str], None] = None) -> List[Dict]:
+        results = []
+        for name in SCENARIOS:
+            if name in ('seed', 'sync') or name in scenarios:
+                if progress:
+                    progress(f'{name} ({self.size} rows)')
+                scenario_results = getattr(self, name)()
+                if name in scenarios:
+                    results.extend(dict(result, size=self.size) for result in scenario_results)
+        return results
+
+    def seed(self) -> List[Dict]:
+        """Import `size` topics through TopicImportService, one batch per sample."""
+        category_ids = [
+            Category.objects.create(name=f'Category {n}').pk
+            for n in range(self.categories)
+        ]
+        service = TopicImportService()
+        timings = Timings()
+        for start in range(0, self.size, service.batch_size):
+            records = [
+                ('topic', {
+                    'title': sentence(f'topic:{n}', 7),
+                    'description': sentence(f'topic:{n}:description', 25),
+                    'category_id': category_ids[n % len(category_ids)],
+                })
+                for n in range(start, min(start + service.batch_size, self.size))
+            ]
+            with timings.sample():
+                service.import_records(records)
+        return [timings.result('seed', self.size, 'topics')]
+
+    def sync(self) -> List[Dict]:
+        """Full sync of `size` posts from the fake site; one sample per stored batch."""
+        service = WordPressSyncService(WordPressService(session=self.wordpress.session()))
+        timings = Timings()
+        service.store_posts = timings.timed(service.store_posts)
+        counts = service.sync(full=True)
+        return [timings.result('sync', counts['fetched'], 'posts')]
+
+    def topic_save(self) -> List[Dict]:
+        """POST batches of 10 new ideas to the save view."""
+        category = Category.objects.order_by('pk').first()
+        timings = Timings()
+        for n in range(self.requests):
+            ideas = [
+                {'title': sentence(f'saved:{n}:{i}', 7), 'description': sentence(f'saved:{n}:{i}:d', 25)}
+                for i in range(10)
+            ]
+            with timings.sample():
+                response = self.client.post('/topics/save/', {
+                    'topics_data': json.dumps(ideas),
+                    'category_id': category.pk,
+                    'selected_topics': [str(i) for i in range(len(ideas))],
+                })
+            # Failures redirect back to the generation form
+            if response.status_code != 302 or response.url != '/topics/':
+                raise RuntimeError(f'Saving topics returned {response.status_code} {response.get("Location")}')
+        return [timings.result('topic_save', self.requests, 'requests')]
+
+    def article_generation(self) -> List[Dict]:
+        """Queue and run one generation job per topic, as the worker does."""
+        # Unlimited quota: the fake model's latency is the only wait
+        limiter = RateLimiter(
+            requests_per_minute=1e9, tokens_per_minute=1e12,
+            max_concurrency=settings.AI_MAX_CONCURRENCY, store=MemoryBucketStore(),
+        )
+        service = AIService(model=self.gemini, limiter=limiter)
+        parameters = {
+            'purpose': 'Explain the topic to newcomers',
+            'target_audience': 'Beginners',
+            'tone_of_voice': 'Friendly',
+            'word_count': 800,
+        }
+        ArticleParameters.objects.get_or_create(name='Benchmark', defaults={**parameters, 'is_default': True})
+        timings = Timings()
+        for topic in Topic.objects.order_by('pk')[:self.requests]:
+            with timings.sample():
+                # Fresh drafts: a cached answer would time the cache, not generation
+                job = run_job(enqueue_article_generation(topic, parameters, use_cache=False), service)
+            if job.status != 'succeeded':
+                raise RuntimeError(f'Generation job {job.id} failed: {job.error}')
+        return [timings.result('article_generation', len(timings.samples), 'articles')]
+
+    def list_views(self) -> List[Dict]:
+        """GET each list page, with the page cache invalidated before every request and then warm."""
+        values = {
+            'category': Category.objects.order_by('pk').values_list('slug', flat=True).first(),
+            'word': sentence('topic:0', 7).split()[0].lower(),
+        }
+        results = []
+        for url in LIST_URLS:
+            url = url.format(**values)
+            for cached in (False, True):
+                timings = Timings()
+                for _ in range(self.requests):
+                    if not cached:
+                        page_cache.invalidate('topics', 'articles', 'categories', 'wordpress_posts')
+                    with timings.sample():
+                        response = self.client.get(url)
+                    if response.status_code != 200:
+                        raise RuntimeError(f'GET {url} returned {response.status_code}')
+                name = f'list_views {url}' + (' (cached)' if cached else '')
+                results.append(timings.result(name, self.requests, 'requests'))
+        return results
@@ -0,0 +1,392 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'record', 'replay')
+
+# Describe the recorded body, not the stored one; bodies are stored decoded
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+# Statuses that would be wrong to replay: revalidations, throttling and outages
+UNRECORDED_STATUSES = (304, 429)
+
+cassette_calls = metrics.Counter(
+    'cassette_calls_total', 'Upstream calls recorded, replayed or missing from the cassettes',
+    ['service', 'result'],
+)
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a Gemini call that was never recorded."""
+
+
+def mode() -> str:
+    value = settings.CASSETTE_MODE
+    if value not in MODES:
+        raise ImproperlyConfigured(f"CASSETTE_MODE must be one of {', '.join(MODES)}, not {value!r}")
+    return value
+
+
+class CassetteStore:
+    """
+    Recorded upstream calls, one zlib-compressed file per request.
+
+    Files are named after the SHA-256 of the request, so recording the
+    same request again replaces its answer, and re-recording never grows
+    the store. Each file holds a JSON header line (the request, status,
+    headers, latency and token usage) followed by the raw body.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = str(directory if directory is not None else settings.CASSETTE_DIR)
+
+    @staticmethod
+    def make_key(service: str, request: Dict) -> str:
+        canonical = json.dumps(request, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f'{service}\0{canonical}'.encode('utf-8')).hexdigest()
+
+    def path(self, service: str, key: str) -> str:
+        return os.path.join(self.directory, service, key[:2], f'{key}.z')
+
+    def get(self, service: str, key: str) -> Optional[Tuple[Dict, bytes]]:
+        """Return the (header, body) recorded for key, or None."""
+        try:
+            with open(self.path(service, key), 'rb') as recording:
+                data = zlib.decompress(recording.read())
+        except FileNotFoundError:
+            return None
+        header, _, body = data.partition(b'\n')
+        return json.loads(header), body
+
+    def put(self, service: str, key: str, header: Dict, body: bytes):
+        path = self.path(service, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n' + body, 9)
+        # Write then rename, so concurrent recorders and readers never see half a file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as recording:
+                recording.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def replay_delay(header: Dict) -> float:
+    return header.get('latency', 0) * settings.CASSETTE_LATENCY_SCALE
+
+
+def _http_request(method: str, url: str) -> Dict:
+    # Query parameters in any order address the same recording
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return {'method': method, 'url': urlunsplit(parts._replace(query=query))}
+
+
+def _kept_headers(headers) -> Dict[str, str]:
+    return {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS}
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    requests transport adapter that records or replays WordPress responses.
+
+    When recording, requests go through `adapter` (with its retries) and
+    the final response is stored; when replaying, `adapter` is never used
+    and unrecorded requests raise requests.ConnectionError.
+    """
+
+    service = 'wordpress'
+
+    def __init__(self, adapter: BaseAdapter = None, store: CassetteStore = None, replay: bool = None):
+        super().__init__()
+        self.adapter = adapter
+        self.store = store if store is not None else CassetteStore()
+        self.replay = replay if replay is not None else mode() == 'replay'
+
+    def send(self, request, **kwargs):
+        described = _http_request(request.method, request.url)
+        key = self.store.make_key(self.service, described)
+        if self.replay:
+            return self._replay(request, key)
+
+        started = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        if response.status_code not in UNRECORDED_STATUSES and response.status_code < 500:
+            # Reading content here keeps it available to the caller
+            self.store.put(self.service, key, {
+                'request': described,
+                'status': response.status_code,
+                'reason': response.reason,
+                'headers': _kept_headers(response.headers),
+                'latency': round(time.perf_counter() - started, 4),
+            }, response.content)
+            cassette_calls.inc(service=self.service, result='recorded')
+        return response
+
+    def _replay(self, request, key: str) -> requests.Response:
+        recording = self.store.get(self.service, key)
+        if recording is None:
+            cassette_calls.inc(service=self.service, result='missed')
+            raise requests.ConnectionError(f'No recording for {request.method} {request.url}', request=request)
+        header, body = recording
+        time.sleep(replay_delay(header))
+        cassette_calls.inc(service=self.service, result='replayed')
+
+        response = requests.Response()
+        response.status_code = header['status']
+        response.reason = header.get('reason')
+        response.headers = CaseInsensitiveDict(header['headers'])
+        response._content = body
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        if self.adapter is not None:
+            self.adapter.close()
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """httpx counterpart of CassetteAdapter for AsyncWordPressService."""
+
+    service = 'wordpress'
+
+    def __init__(self, transport: httpx.AsyncBaseTransport = None, store: CassetteStore = None,
+                 replay: bool = None):
+        self.transport = transport
+        self.store = store if store is not None else CassetteStore()
+        self.replay = replay if replay is not None else mode() == 'replay'
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        described = _http_request(request.method, str(request.url))
+        key = self.store.make_key(self.service, described)
+        if self.replay:
+            recording = self.store.get(self.service, key)
+            if recording is None:
+                cassette_calls.inc(service=self.service, result='missed')
+                raise httpx.ConnectError(f'No recording for {request.method} {request.url}', request=request)
+            header, body = recording
+            await asyncio.sleep(replay_delay(header))
+            cassette_calls.inc(service=self.service, result='replayed')
+            return httpx.Response(header['status'], headers=header['headers'], content=body, request=request)
+
+        started = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        headers = _kept_headers(response.headers)
+        if response.status_code not in UNRECORDED_STATUSES and response.status_code < 500:
+            self.store.put(self.service, key, {
+                'request': described,
+                'status': response.status_code,
+                'reason': response.reason_phrase,
+                'headers': headers,
+                'latency': round(time.perf_counter() - started, 4),
+            }, body)
+            cassette_calls.inc(service=self.service, result='recorded')
+        # The body was decoded by aread(), so hand it on without its encoding headers
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        if self.transport is not None:
+            await self.transport.aclose()
+
+
+class ResponseStream:
+    """
+    A streamed Gemini answer: iterable chunks, plus the usage_metadata of
+    `source`, which a real stream only knows once it has been read.
+    """
+
+    def __init__(self, chunks, source=None):
+        self._chunks = chunks
+        self._source = source
+
+    @property
+    def usage_metadata(self):
+        return getattr(self._source, 'usage_metadata', None)
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+    def __aiter__(self):
+        return self._chunks.__aiter__()
+
+
+def _usage(response) -> Optional[Dict]:
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None
+    return {
+        name: getattr(usage, name, None)
+        for name in ('prompt_token_count', 'candidates_token_count', 'total_token_count')
+    }
+
+
+class CassetteModel:
+    """
+    Wraps a GenerativeModel to record its answers, or replays them
+    without one.
+
+    Recordings are keyed on the model name, prompt, generation config and
+    whether the answer was streamed; sync and async calls share them.
+    Streams are stored once fully read and replayed in their original
+    chunks. Failed calls are not recorded.
+    """
+
+    service = 'gemini'
+
+    def __init__(self, model, model_name: str, store: CassetteStore = None):
+        self.model = model
+        self.model_name = model_name
+        self.store = store if store is not None else CassetteStore()
+
+    def _key(self, prompt: str, generation_config, stream: bool) -> Tuple[str, Dict]:
+        request = {
+            'model': self.model_name,
+            'prompt': prompt,
+            'generation_config': generation_config,
+            'stream': stream,
+        }
+        return self.store.make_key(self.service, request), request
+
+    def _save(self, key: str, request: Dict, chunks: List[str], response, started: float):
+        self.store.put(self.service, key, {
+            'request': request,
+            'chunks': [len(chunk) for chunk in chunks],
+            'usage': _usage(response),
+            'latency': round(time.perf_counter() - started, 4),
+        }, ''.join(chunks).encode('utf-8'))
+        cassette_calls.inc(service=self.service, result='recorded')
+
+    def _load(self, key: str, prompt: str) -> Tuple[Dict, List[str], SimpleNamespace]:
+        recording = self.store.get(self.service, key)
+        if recording is None:
+            cassette_calls.inc(service=self.service, result='missed')
+            raise CassetteMiss(f'No Gemini recording for prompt {prompt[:80]!r}')
+        cassette_calls.inc(service=self.service, result='replayed')
+        header, body = recording
+        text, chunks, offset = body.decode('utf-8'), [], 0
+        for length in header['chunks']:
+            chunks.append(text[offset:offset + length])
+            offset += length
+        usage = SimpleNamespace(**header['usage']) if header.get('usage') else None
+        return header, chunks, usage
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False):
+        key, request = self._key(prompt, generation_config, stream)
+        if self.model is None:
+            header, chunks, usage = self._load(key, prompt)
+            if not stream:
+                time.sleep(replay_delay(header))
+                return SimpleNamespace(text=''.join(chunks), usage_metadata=usage)
+
+            def replay():
+                for chunk in chunks:
+                    time.sleep(replay_delay(header) / len(chunks))
+                    yield SimpleNamespace(text=chunk)
+            return ResponseStream(replay(), SimpleNamespace(usage_metadata=usage))
+
+        started = time.perf_counter()
+        response = self.model.generate_content(prompt, generation_config=generation_config, stream=stream)
+        if not stream:
+            text = _chunk_text(response)
+            if text:
+                self._save(key, request, [text], response, started)
+            return response
+
+        def record():
+            chunks = []
+            for chunk in response:
+                yield chunk
+                chunks.append(_chunk_text(chunk))
+            self._save(key, request, chunks, response, started)
+        return ResponseStream(record(), response)
+
+    async def generate_content_async(self, prompt: str, generation_config=None, stream: bool = False):
+        key, request = self._key(prompt, generation_config, stream)
+        if self.model is None:
+            header, chunks, usage = self._load(key, prompt)
+            if not stream:
+                await asyncio.sleep(replay_delay(header))
+                return SimpleNamespace(text=''.join(chunks), usage_metadata=usage)
+
+            async def replay():
+                for chunk in chunks:
+                    await asyncio.sleep(replay_delay(header) / len(chunks))
+                    yield SimpleNamespace(text=chunk)
+            return ResponseStream(replay(), SimpleNamespace(usage_metadata=usage))
+
+        started = time.perf_counter()
+        response = await self.model.generate_content_async(
+            prompt, generation_config=generation_config, stream=stream
+        )
+        if not stream:
+            text = _chunk_text(response)
+            if text:
+                self._save(key, request, [text], response, started)
+            return response
+
+        async def record():
+            chunks = []
+            async for chunk in response:
+                yield chunk
+                chunks.append(_chunk_text(chunk))
+            self._save(key, request, chunks, response, started)
+        return ResponseStream(record(), response)
+
+
+def _chunk_text(chunk) -> str:
+    try:
+        return chunk.text or ''
+    except ValueError:
+        # Chunks without text parts, e.g. a trailing finish_reason chunk
+        return ''
+
+
+def wrap_adapter(adapter: BaseAdapter) -> BaseAdapter:
+    """Route a requests adapter through the cassettes unless CASSETTE_MODE is off."""
+    return adapter if mode() == 'off' else CassetteAdapter(adapter)
+
+
+def wrap_transport(transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    """Route an httpx transport through the cassettes unless CASSETTE_MODE is off."""
+    return transport if mode() == 'off' else AsyncCassetteTransport(transport)
+
+
+def gemini_model(model_name: str, build: Callable):
+    """
+    The model returned by build(), recording through the cassettes if
+    CASSETTE_MODE is 'record'. In replay mode build() is not called, so
+    neither the SDK nor an API key is needed.
+    """
+    current = mode()
+    if current == 'off':
+        return build()
+    if current == 'replay':
+        logger.info("Replaying Gemini answers from %s", settings.CASSETTE_DIR)
+        return CassetteModel(None, model_name)
+    return CassetteModel(build(), model_name)
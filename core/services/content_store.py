@@ -0,0 +1,171 @@
+import zlib
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+# Stable codes stored with each body; never renumber them
+KINDS = {
+    'article': 1,
+    'wordpress_post': 2,
+}
+
+
+def compress(text: str) -> Tuple[str, bytes, int]:
+    """
+    Encode a body with the configured CONTENT_COMPRESSION codec.
+
+    Returns:
+        Tuple[str, bytes, int]: The codec actually used, the stored bytes
+            and the uncompressed size; bodies that do not shrink are stored raw
+    """
+    raw = (text or '').encode('utf-8')
+    codec = settings.CONTENT_COMPRESSION
+    if codec == 'zstd' and zstandard is not None:
+        data = zstandard.ZstdCompressor(level=10).compress(raw)
+    else:
+        codec = 'zlib'
+        data = zlib.compress(raw)
+    if len(data) >= len(raw):
+        return 'raw', raw, len(raw)
+    return codec, data, len(raw)
+
+
+def decompress(codec: str, data: bytes) -> str:
+    data = bytes(data)
+    if codec == 'zlib':
+        data = zlib.decompress(data)
+    elif codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('Install the zstandard package to read zstd-compressed bodies')
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode('utf-8')
+
+
+class CompressedBody(property):
+    """
+    Model attribute whose text lives compressed in the ContentBody table.
+
+    Reading it loads and decompresses the body on first access and caches
+    it on the instance; assigning it marks the body for saving with
+    save_bodies(). Because the column is gone from the model's own table,
+    list and count queries never read bodies.
+
+    It subclasses property so that Django accepts it as a keyword to the
+    model constructor, e.g. Article(content=...).
+    """
+
+    def __init__(self, kind: str, key: str = 'pk'):
+        super().__init__(self._get, self._set)
+        self.kind = kind
+        self.key = key
+
+    def object_id(self, instance):
+        return getattr(instance, self.key)
+
+    def _get(self, instance) -> str:
+        if '_body' not in instance.__dict__:
+            from ..models import ContentBody
+
+            text = ''
+            object_id = self.object_id(instance)
+            if object_id is not None:
+                row = ContentBody.objects.filter(
+                    kind=KINDS[self.kind], object_id=object_id
+                ).values_list('codec', 'data').first()
+                if row is not None:
+                    text = decompress(*row)
+            instance.__dict__['_body'] = text
+        return instance.__dict__['_body']
+
+    def _set(self, instance, value: str):
+        instance.__dict__['_body'] = value or ''
+        instance.__dict__['_body_dirty'] = True
+
+
+def _descriptor(model) -> CompressedBody:
+    for klass in model.__mro__:
+        for attr in vars(klass).values():
+            if isinstance(attr, CompressedBody):
+                return attr
+    raise TypeError(f"{model.__name__} has no compressed body")
+
+
+def has_body(model) -> bool:
+    try:
+        _descriptor(model)
+    except TypeError:
+        return False
+    return True
+
+
+def load_bodies(instances: Iterable) -> List:
+    """Fill the body cache of many instances of one model with a single query."""
+    from ..models import ContentBody
+
+    instances = list(instances)
+    if not instances:
+        return instances
+    descriptor = _descriptor(type(instances[0]))
+    pending = {
+        descriptor.object_id(instance): instance
+        for instance in instances if '_body' not in instance.__dict__
+    }
+    for instance in pending.values():
+        instance.__dict__['_body'] = ''
+    rows = ContentBody.objects.filter(
+        kind=KINDS[descriptor.kind], object_id__in=list(pending)
+    ).values_list('object_id', 'codec', 'data')
+    for object_id, codec, data in rows:
+        pending[object_id].__dict__['_body'] = decompress(codec, data)
+    return instances
+
+
+def save_bodies(instances: Iterable, batch_size: int = 500):
+    """Compress and upsert the bodies assigned since the instances were loaded."""
+    from ..models import ContentBody
+
+    rows = []
+    for instance in instances:
+        if not instance.__dict__.get('_body_dirty'):
+            continue
+        descriptor = _descriptor(type(instance))
+        codec, data, raw_size = compress(instance.__dict__['_body'])
+        rows.append(ContentBody(
+            kind=KINDS[descriptor.kind],
+            object_id=descriptor.object_id(instance),
+            codec=codec,
+            data=data,
+            raw_size=raw_size,
+        ))
+        instance.__dict__['_body_dirty'] = False
+    if rows:
+        ContentBody.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['codec', 'data', 'raw_size'],
+        )
+
+
+def body_key(instance) -> Tuple[int, int]:
+    """The (kind, object_id) an instance's body is stored under."""
+    descriptor = _descriptor(type(instance))
+    return KINDS[descriptor.kind], descriptor.object_id(instance)
+
+
+def delete_bodies(keys: Iterable[Tuple[int, int]], batch_size: int = 500):
+    """Delete the bodies stored under body_key()s, one query per kind and batch."""
+    from ..models import ContentBody
+
+    object_ids = {}
+    for kind, object_id in keys:
+        object_ids.setdefault(kind, []).append(object_id)
+    for kind, ids in object_ids.items():
+        for start in range(0, len(ids), batch_size):
+            ContentBody.objects.filter(kind=kind, object_id__in=ids[start:start + batch_size]).delete()
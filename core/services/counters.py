@@ -0,0 +1,184 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from ..models import Article, Category, Counter, Topic, WordPressPost
+
+_state = threading.local()
+
+
+def topic_deltas(status: str, category_id: int, sign: int = 1) -> Dict[str, int]:
+    return {
+        'topics': sign,
+        f'topics.status.{status}': sign,
+        f'topics.category.{category_id}': sign,
+    }
+
+
+def adjust(deltas: Dict[str, int]):
+    """
+    Add deltas to counters, creating missing ones.
+
+    Inside deferred() the deltas are only collected; otherwise they are
+    written at once, in the caller's transaction when there is one.
+    """
+    pending = getattr(_state, 'pending', None)
+    if pending is not None:
+        for name, delta in deltas.items():
+            pending[name] += delta
+        return
+    _apply(deltas, ())
+
+
+def forget(*names: str):
+    """Delete counters that no longer describe anything, e.g. of a deleted category."""
+    dropped = getattr(_state, 'dropped', None)
+    if dropped is not None:
+        for name in names:
+            _state.pending.pop(name, None)
+            dropped.add(name)
+        return
+    Counter.objects.filter(name__in=names).delete()
+
+
+@contextmanager
+def deferred():
+    """
+    Collect counter changes and write them once, when the block exits.
+
+    Use it around bulk deletes and imports, whose per-row signals would
+    otherwise update the same few counters once per row. Nothing is
+    written if the block raises. Nested blocks join the outermost one.
+    """
+    if getattr(_state, 'pending', None) is not None:
+        yield
+        return
+    _state.pending, _state.dropped = defaultdict(int), set()
+    try:
+        yield
+        pending, dropped = _state.pending, _state.dropped
+    finally:
+        _state.pending = _state.dropped = None
+    _apply(pending, dropped)
+
+
+def _apply(deltas: Dict[str, int], dropped: Iterable[str]):
+    with transaction.atomic():
+        for name, delta in deltas.items():
+            if not delta or Counter.objects.filter(name=name).update(value=F('value') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    Counter.objects.create(name=name, value=delta)
+            except IntegrityError:
+                # Created concurrently since the update above
+                Counter.objects.filter(name=name).update(value=F('value') + delta)
+        if dropped:
+            Counter.objects.filter(name__in=list(dropped)).delete()
+
+
+def topic_saving(topic: Topic):
+    """Read the stored status and category of a topic not loaded with both."""
+    if topic.pk is not None and getattr(topic, '_counted', None) is None:
+        topic._counted = Topic.objects.filter(pk=topic.pk).values_list('status', 'category_id').first()
+
+
+def topic_saved(topic: Topic, created: bool):
+    current = (topic.status, topic.category_id)
+    if created:
+        adjust(topic_deltas(*current))
+    else:
+        previous = getattr(topic, '_counted', None) or current
+        if previous != current:
+            deltas = defaultdict(int)
+            for name, delta in topic_deltas(*previous, sign=-1).items():
+                deltas[name] += delta
+            for name, delta in topic_deltas(*current).items():
+                deltas[name] += delta
+            adjust(deltas)
+    topic._counted = current
+
+
+def topic_deleted(topic: Topic):
+    adjust(topic_deltas(*(getattr(topic, '_counted', None) or (topic.status, topic.category_id)), sign=-1))
+
+
+def topics_created(topics: Iterable[Topic]):
+    deltas = defaultdict(int)
+    for topic in topics:
+        for name, delta in topic_deltas(topic.status, topic.category_id).items():
+            deltas[name] += delta
+        topic._counted = (topic.status, topic.category_id)
+    adjust(deltas)
+
+
+def snapshot() -> Dict[str, int]:
+    """Return every counter with a single query."""
+    return dict(Counter.objects.values_list('name', 'value'))
+
+
+def actual_counts() -> Dict[str, int]:
+    """Count the rows the counters describe (full table scans)."""
+    counts = {
+        'topics': Topic.objects.count(),
+        'articles': Article.objects.count(),
+        'wordpress_posts': WordPressPost.objects.count(),
+    }
+    for status, total in Topic.objects.values_list('status').annotate(total=Count('id')).order_by():
+        counts[f'topics.status.{status}'] = total
+    for category_id, total in Topic.objects.values_list('category_id').annotate(total=Count('id')).order_by():
+        counts[f'topics.category.{category_id}'] = total
+    return counts
+
+
+def reconcile() -> Dict[str, Tuple[int, int]]:
+    """
+    Rewrite the counters from actual row counts.
+
+    Returns:
+        Dict[str, Tuple[int, int]]: (stored, actual) for each counter that was wrong
+    """
+    with transaction.atomic():
+        actual = actual_counts()
+        stored = snapshot()
+        changes = {
+            name: (stored.get(name, 0), actual.get(name, 0))
+            for name in set(stored) | set(actual)
+            if stored.get(name, 0) != actual.get(name, 0)
+        }
+        Counter.objects.exclude(name__in=list(actual)).delete()
+        Counter.objects.bulk_create(
+            [Counter(name=name, value=value) for name, value in actual.items()],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['value'],
+        )
+    return changes
+
+
+def dashboard_stats() -> Dict:
+    """
+    Totals for the home page, read from the counters.
+
+    Costs one query on the counters and one on categories, independent of
+    how many topics, articles or posts there are.
+    """
+    values = snapshot()
+    return {
+        'topics_count': values.get('topics', 0),
+        'articles_count': values.get('articles', 0),
+        'wordpress_posts_count': values.get('wordpress_posts', 0),
+        'status_counts': [
+            (label, values.get(f'topics.status.{status}', 0))
+            for status, label in Topic.STATUS_CHOICES
+        ],
+        'category_counts': [
+            (name, values[f'topics.category.{pk}'])
+            for pk, name in Category.objects.order_by('name').values_list('id', 'name')
+            if values.get(f'topics.category.{pk}')
+        ],
+    }
@@ -0,0 +1,217 @@
+import hashlib
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .search_service import STOPWORDS, html_to_text
+
+# MinHash signature length and its LSH banding. 32 bands of 4 rows put the
+# candidate threshold at roughly (1/32) ** (1/4) ~= 0.42 Jaccard similarity,
+# so pairs at 0.6 and above collide in at least one band >99% of the time.
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Each salted 64-byte BLAKE2b digest yields 8 independent 64-bit hash values
+_SALTS = [index.to_bytes(16, 'little') for index in range(NUM_PERM // 8)]
+
+# Stable codes stored with each signature; never renumber them
+DOC_TYPES = {
+    'topic': 1,
+    'wordpress_post': 2,
+}
+
+
+def stem(token: str) -> str:
+    """Strip common English inflections so word forms compare equal."""
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def tokens(text: str) -> Set[str]:
+    """Normalize a title into a set of stemmed, non-stopword terms."""
+    words = re.findall(r'\w+', html_to_text(text).lower())
+    return {stem(word) for word in words if word not in STOPWORDS}
+
+
+def signature(terms: Set[str]) -> Optional[List[int]]:
+    """
+    Compute the MinHash signature of a term set.
+
+    Returns:
+        Optional[List[int]]: NUM_PERM minimum hash values, or None for an empty set
+    """
+    if not terms:
+        return None
+    hashes = []
+    for term in terms:
+        encoded = term.encode('utf-8')
+        values = array('Q')
+        for salt in _SALTS:
+            values.frombytes(hashlib.blake2b(encoded, digest_size=64, salt=salt).digest())
+        hashes.append(values)
+    return [min(column) for column in zip(*hashes)]
+
+
+def band_keys(sig: List[int]) -> List[str]:
+    """Hash each band of a signature into an LSH bucket key."""
+    keys = []
+    for band in range(BANDS):
+        rows = array('Q', sig[band * ROWS:(band + 1) * ROWS]).tobytes()
+        keys.append(f"{band}:{hashlib.blake2b(rows, digest_size=8).hexdigest()}")
+    return keys
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def pack(sig: List[int]) -> bytes:
+    return array('Q', sig).tobytes()
+
+
+def unpack(data: bytes) -> List[int]:
+    sig = array('Q')
+    sig.frombytes(bytes(data))
+    return list(sig)
+
+
+def _source(instance):
+    from ..models import Topic, WordPressPost
+
+    if isinstance(instance, Topic):
+        return 'topic', instance.pk, instance.title
+    if isinstance(instance, WordPressPost):
+        return 'wordpress_post', instance.wp_id, html_to_text(instance.title)
+    raise TypeError(f"{type(instance).__name__} is not indexed for duplicates")
+
+
+def index_instances(instances: Iterable):
+    """
+    Add or refresh the signatures of Topics and WordPressPosts.
+
+    Titles are compared rather than descriptions: generated descriptions
+    paraphrase too freely for term overlap to mean anything, while two
+    titles sharing most of their terms is a strong duplicate signal.
+    WordPress posts are keyed by wp_id, matching the bulk sync path.
+    """
+    from ..models import SimilarityBand, SimilaritySignature
+
+    rows = {}
+    for instance in instances:
+        doc_type, object_id, title = _source(instance)
+        rows[(doc_type, object_id)] = title
+    if not rows:
+        return
+
+    signatures = []
+    for (doc_type, object_id), title in rows.items():
+        sig = signature(tokens(title))
+        if sig is not None:
+            signatures.append((SimilaritySignature(
+                doc_type=DOC_TYPES[doc_type],
+                object_id=object_id,
+                title=title[:200],
+                signature=pack(sig),
+            ), sig))
+
+    with transaction.atomic():
+        for doc_type in DOC_TYPES:
+            object_ids = [object_id for (kind, object_id) in rows if kind == doc_type]
+            if object_ids:
+                SimilaritySignature.objects.filter(
+                    doc_type=DOC_TYPES[doc_type], object_id__in=object_ids
+                ).delete()
+        created = SimilaritySignature.objects.bulk_create([row for row, _ in signatures])
+        # Plain executemany: building 32 model instances per signature would
+        # cost more than computing the signatures themselves
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SimilarityBand._meta.db_table} (band_key, signature_id) VALUES (%s, %s)",
+                [(key, row.pk) for row, (_, sig) in zip(created, signatures) for key in band_keys(sig)]
+            )
+
+
+def signature_key(instance) -> Tuple[int, int]:
+    """The (doc_type code, object_id) a Topic or WordPressPost is indexed under."""
+    from ..models import Topic, WordPressPost
+
+    if isinstance(instance, Topic):
+        return DOC_TYPES['topic'], instance.pk
+    if isinstance(instance, WordPressPost):
+        return DOC_TYPES['wordpress_post'], instance.wp_id
+    raise TypeError(f"{type(instance).__name__} is not indexed for duplicates")
+
+
+def remove_signatures(keys: Iterable[Tuple[int, int]], batch_size: int = 500):
+    """Drop the signatures (and their bands) stored under signature_key()s."""
+    from ..models import SimilaritySignature
+
+    object_ids = {}
+    for doc_type, object_id in keys:
+        object_ids.setdefault(doc_type, []).append(object_id)
+    for doc_type, ids in object_ids.items():
+        for start in range(0, len(ids), batch_size):
+            SimilaritySignature.objects.filter(
+                doc_type=doc_type, object_id__in=ids[start:start + batch_size]
+            ).delete()
+
+
+def find_duplicates(ideas: List[Dict], threshold: float = None) -> List[Optional[Dict]]:
+    """
+    Find the closest existing topic or post for each generated idea.
+
+    Candidates come from the LSH buckets, so each lookup touches only
+    items sharing a band with the idea rather than the whole corpus.
+    Ideas are also compared with the ideas before them in the same batch.
+
+    Args:
+        ideas (List[Dict]): Generated ideas with a 'title' key
+        threshold (float): Minimum estimated similarity to report
+
+    Returns:
+        List[Optional[Dict]]: For each idea, None or a dict with the
+            matching 'title', its 'source' and the 'similarity'
+    """
+    from ..models import SimilarityBand, SimilaritySignature
+
+    threshold = threshold if threshold is not None else settings.TOPIC_DUPLICATE_THRESHOLD
+    sources = {code: name for name, code in DOC_TYPES.items()}
+    sigs = [signature(tokens(idea.get('title', ''))) for idea in ideas]
+    keys = {key for sig in sigs if sig for key in band_keys(sig)}
+
+    buckets: Dict[str, Set[int]] = {}
+    for key, signature_id in SimilarityBand.objects.filter(band_key__in=keys).values_list('band_key', 'signature_id'):
+        buckets.setdefault(key, set()).add(signature_id)
+    candidates = SimilaritySignature.objects.in_bulk(
+        {signature_id for ids in buckets.values() for signature_id in ids}
+    )
+
+    matches = []
+    for position, sig in enumerate(sigs):
+        best = None
+        if sig is not None:
+            ids = set()
+            for key in band_keys(sig):
+                ids |= buckets.get(key, set())
+            for signature_id in ids:
+                candidate = candidates.get(signature_id)
+                if candidate is None:
+                    continue
+                score = similarity(sig, unpack(candidate.signature))
+                if score >= threshold and (best is None or score > best['similarity']):
+                    best = {'title': candidate.title, 'source': sources[candidate.doc_type], 'similarity': score}
+            for earlier in range(position):
+                if sigs[earlier] is None:
+                    continue
+                score = similarity(sig, sigs[earlier])
+                if score >= threshold and (best is None or score > best['similarity']):
+                    best = {'title': ideas[earlier].get('title', ''), 'source': 'batch', 'similarity': score}
+        matches.append(best)
+    return matches
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+
+from .cassettes import ResponseStream
+from .prompts import estimate_tokens
+
+
+def words(seed: str, count: int) -> List[str]:
+    """Deterministic pseudo-words, so repeated runs produce the same data."""
+    rng = random.Random(seed)
+    syllables = ('ka', 'lo', 'mi', 'ren', 'ta', 'vo', 'sel', 'dar', 'qui', 'pon', 'ex', 'lu', 'ber', 'nis')
+    return [''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def sentence(seed: str, count: int) -> str:
+    return ' '.join(words(seed, count)).capitalize()
+
+
+# Paragraphs that bodies are assembled from, so that building a payload
+# costs little next to the code under test
+PARAGRAPHS = [f'<p>{sentence(f"paragraph:{n}", 60)}.</p>' for n in range(64)]
+
+
+def body(seed: int, size: int) -> str:
+    """HTML of about size bytes, picked from PARAGRAPHS by seed."""
+    parts, length = [], 0
+    while length < size:
+        paragraph = PARAGRAPHS[(seed * 31 + len(parts)) % len(PARAGRAPHS)]
+        parts.append(paragraph)
+        length += len(paragraph) + 1
+    return '\n'.join(parts)
+
+
+class FakeGeminiModel:
+    """
+    Stands in for genai.GenerativeModel.
+
+    Every call waits `latency` seconds and answers with about
+    `response_bytes` of text: a JSON array of topic ideas when structured
+    output is requested, otherwise an HTML article. Streams are split
+    into `chunks` parts sent `latency / chunks` apart.
+    """
+
+    def __init__(self, latency: float = 0.05, response_bytes: int = 4000, chunks: int = 8):
+        self.latency = latency
+        self.response_bytes = response_bytes
+        self.chunks = max(1, chunks)
+        self.calls = 0
+
+    def _text(self, prompt: str, generation_config=None) -> str:
+        seed = hashlib.md5(prompt.encode()).hexdigest()
+        if generation_config and generation_config.get('response_mime_type') == 'application/json':
+            ideas = []
+            while len(json.dumps(ideas)) < self.response_bytes:
+                index = len(ideas)
+                ideas.append({
+                    'title': sentence(f'{seed}:{index}', 6),
+                    'description': sentence(f'{seed}:{index}:d', 20),
+                })
+            return json.dumps(ideas)
+        return f'<h1>{sentence(seed, 6)}</h1>\n' + body(int(seed, 16), self.response_bytes)
+
+    def _response(self, prompt: str, text: str):
+        prompt_tokens, response_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=response_tokens,
+            total_token_count=prompt_tokens + response_tokens,
+        ))
+
+    def _parts(self, text: str) -> List[str]:
+        size = -(-len(text) // self.chunks)
+        return [text[start:start + size] for start in range(0, len(text), size)]
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False):
+        self.calls += 1
+        text = self._text(prompt, generation_config)
+        response = self._response(prompt, text)
+        if not stream:
+            time.sleep(self.latency)
+            return response
+
+        def chunks():
+            for part in self._parts(text):
+                time.sleep(self.latency / self.chunks)
+                yield SimpleNamespace(text=part)
+        return ResponseStream(chunks(), response)
+
+    async def generate_content_async(self, prompt: str, generation_config=None, stream: bool = False):
+        self.calls += 1
+        text = self._text(prompt, generation_config)
+        response = self._response(prompt, text)
+        if not stream:
+            await asyncio.sleep(self.latency)
+            return response
+
+        async def chunks():
+            for part in self._parts(text):
+                await asyncio.sleep(self.latency / self.chunks)
+                yield SimpleNamespace(text=part)
+        return ResponseStream(chunks(), response)
+
+
+class FakeWordPress:
+    """
+    A WordPress site with `total_posts` synthetic published posts.
+
+    Posts are generated on request from their id, so even a million-post
+    site takes no memory. Serve it to WordPressService through session()
+    and to AsyncWordPressService through async_client().
+    """
+
+    def __init__(self, total_posts: int = 1000, latency: float = 0.02, post_bytes: int = 3000):
+        self.total_posts = total_posts
+        self.latency = latency
+        self.post_bytes = post_bytes
+        self.requests = 0
+        self.epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def post(self, wp_id: int) -> Dict:
+        seed = f'post:{wp_id}'
+        date = self.epoch + timedelta(minutes=wp_id)
+        return {
+            'id': wp_id,
+            'title': {'rendered': sentence(seed, 7)},
+            'excerpt': {'rendered': f'<p>{sentence(seed + ":e", 30)}</p>'},
+            'content': {'rendered': body(wp_id, self.post_bytes)},
+            'link': f'https://wordpress.example/?p={wp_id}',
+            'date': date.strftime('%Y-%m-%dT%H:%M:%S'),
+            'modified_gmt': date.strftime('%Y-%m-%dT%H:%M:%S'),
+            'categories': [1 + wp_id % 10],
+        }
+
+    def respond(self, url: str):
+        """Return (status, headers, body) for a GET of url."""
+        self.requests += 1
+        parts = urlsplit(url)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        path = parts.path.split('/wp-json/wp/v2', 1)[-1].rstrip('/')
+
+        if path == '/posts':
+            per_page = int(query.get('per_page', 10))
+            page = int(query.get('page', 1))
+            total = self.total_posts
+            if 'modified_after' in query:
+                # Every post was modified at its creation time, so nothing changed since
+                total = 0
+            first = (page - 1) * per_page + 1
+            ids = range(first, min(first + per_page, total + 1))
+            pages = max(1, -(-total // per_page))
+            headers = {'X-WP-Total': str(total), 'X-WP-TotalPages': str(pages)}
+            return 200, headers, json.dumps([self.post(wp_id) for wp_id in ids]).encode()
+        if path.startswith('/posts/') and path[len('/posts/'):].isdigit():
+            wp_id = int(path[len('/posts/'):])
+            if not 1 <= wp_id <= self.total_posts:
+                return 404, {}, b'{"code": "rest_post_invalid_id"}'
+            return 200, {}, json.dumps(self.post(wp_id)).encode()
+        if path == '/categories':
+            categories = [{'id': n, 'name': sentence(f'category:{n}', 2), 'description': ''} for n in range(1, 11)]
+            return 200, {}, json.dumps(categories).encode()
+        return 404, {}, b'{"code": "rest_no_route"}'
+
+    def session(self) -> requests.Session:
+        """A requests session whose every request is answered by this site."""
+        adapter = _FakeAdapter(self)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def async_client(self) -> httpx.AsyncClient:
+        """An httpx client whose every request is answered by this site."""
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(self.latency)
+            status, headers, body = self.respond(str(request.url))
+            return httpx.Response(status, headers={'Content-Type': 'application/json', **headers}, content=body)
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class _FakeAdapter(BaseAdapter):
+    def __init__(self, site: FakeWordPress):
+        super().__init__()
+        self.site = site
+
+    def send(self, request, **kwargs):
+        time.sleep(self.site.latency)
+        status, headers, body = self.site.respond(request.url)
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update({'Content-Type': 'application/json', **headers})
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,135 @@
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Article, GenerationJob, Topic
+
+
+def enqueue_article_generation(topic: Topic, parameters: Dict, use_cache: bool = True) -> GenerationJob:
+    """
+    Queue an article generation job for a topic.
+
+    Args:
+        topic: The Topic object to write about
+        parameters (Dict): Generation parameters (purpose, target_audience,
+            tone_of_voice, word_count)
+        use_cache (bool): Set to False to write a fresh draft instead of
+            reusing an earlier answer to the same prompt
+
+    Returns:
+        GenerationJob: The queued job
+    """
+    with transaction.atomic():
+        job = GenerationJob.objects.create(topic=topic, parameters=dict(parameters, refresh=not use_cache))
+        topic.status = 'in_progress'
+        topic.save()
+    return job
+
+
+def claim_next_job() -> Optional[GenerationJob]:
+    """
+    Atomically move the oldest queued job to 'running'.
+
+    The conditional UPDATE makes claiming safe when several workers (threads
+    or processes) poll the same table: only one of them can flip a given row
+    from 'queued' to 'running'.
+
+    Returns:
+        Optional[GenerationJob]: The claimed job, or None if the queue is empty
+    """
+    while True:
+        job_id = (
+            GenerationJob.objects.filter(status='queued')
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        claimed = GenerationJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return GenerationJob.objects.select_related('topic__category').get(id=job_id)
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Put jobs left in 'running' by a crashed worker back on the queue.
+
+    Returns:
+        int: Number of jobs requeued
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.GENERATION_JOB_TIMEOUT)
+    return GenerationJob.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='queued',
+        started_at=None,
+    )
+
+
+def touch_running_jobs(job_ids: Iterable[int]) -> int:
+    """
+    Restart the timeout of jobs a live worker is still running.
+
+    Workers call this periodically for their own jobs, so that
+    requeue_stale_jobs only picks up jobs of workers that are gone, however
+    long a generation takes.
+
+    Returns:
+        int: Number of jobs touched
+    """
+    return GenerationJob.objects.filter(id__in=list(job_ids), status='running').update(
+        started_at=timezone.now()
+    )
+
+
+def run_job(job: GenerationJob, ai_service) -> GenerationJob:
+    """
+    Generate the article for a claimed job and record the outcome.
+
+    On success the article is created and the topic is marked published; on
+    failure the error is stored and the topic goes back to draft so it can
+    be retried.
+
+    Args:
+        job (GenerationJob): A job previously returned by claim_next_job
+        ai_service: The AIService used to generate the content
+
+    Returns:
+        GenerationJob: The finished job
+    """
+    topic = job.topic
+    try:
+        content = ai_service.generate_article(
+            topic, job.parameters, use_cache=not job.parameters.get('refresh', False)
+        )
+        with transaction.atomic():
+            article = Article.objects.create(
+                topic=topic,
+                title=topic.title,
+                content=content
+            )
+            job.article = article
+            job.status = 'succeeded'
+            job.error = ''
+            job.finished_at = timezone.now()
+            job.save()
+            topic.status = 'published'
+            topic.save()
+    except Exception as e:
+        with transaction.atomic():
+            job.article = None
+            job.status = 'failed'
+            job.error = str(e)
+            job.finished_at = timezone.now()
+            job.save()
+            topic.status = 'draft'
+            topic.save()
+    return job
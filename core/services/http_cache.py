@@ -0,0 +1,155 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+from requests.structures import CaseInsensitiveDict
+
+from .. import metrics
+
+
+class CachedResponse(NamedTuple):
+    url: str
+    content: bytes
+    headers: Dict[str, str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    def to_response(self) -> requests.Response:
+        """Rebuild a 200 requests.Response from the cached body and headers."""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = self.url
+        response._content = self.content
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = 'utf-8'
+        return response
+
+
+class ConditionalResponseCache:
+    """
+    In-process cache of GET responses that carry ETag or Last-Modified.
+
+    Stored validators are replayed as If-None-Match/If-Modified-Since, and
+    a 304 answer is served from the stored body. Entries are evicted least
+    recently used first once the stored bodies exceed max_bytes.
+    """
+
+    # Response headers worth keeping alongside the body
+    KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'X-WP-Total', 'X-WP-TotalPages')
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.WORDPRESS_HTTP_CACHE_MAX_BYTES
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(url: str, params: Dict = None) -> str:
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def validators(self, key: str) -> Dict[str, str]:
+        """Return the conditional request headers for a cached URL."""
+        entry = self.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def resolve(self, key: str, response: requests.Response) -> requests.Response:
+        """
+        Turn an upstream response into the one handed to the caller.
+
+        A 304 is answered from the cache; a 200 carrying validators is
+        stored for next time. Anything else is passed through unchanged.
+        """
+        if response.status_code == 304:
+            entry = self.get(key)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                return entry.to_response()
+            return response
+
+        with self._lock:
+            self.misses += 1
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code == 200 and (etag or last_modified):
+            self.set(key, CachedResponse(
+                url=str(response.url),
+                content=response.content,
+                headers={
+                    name: response.headers[name]
+                    for name in self.KEPT_HEADERS if name in response.headers
+                },
+                etag=etag,
+                last_modified=last_modified,
+            ))
+        return response
+
+    def set(self, key: str, entry: CachedResponse):
+        size = len(entry.content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.content)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.content)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
+
+
+# Shared by every WordPressService instance in the process
+http_response_cache = ConditionalResponseCache()
+
+
+def _lookups() -> Dict[str, int]:
+    stats = http_response_cache.stats()
+    return {'hit': stats['hits'], 'miss': stats['misses']}
+
+
+metrics.Collected(
+    'wordpress_cache_lookups_total', 'Revalidations of cached WordPress responses, by result', _lookups,
+    ['result'], 'counter'
+)
+metrics.Collected(
+    'wordpress_cache_bytes', 'Size of the WordPress responses held in memory',
+    lambda: http_response_cache.stats()['bytes'],
+)
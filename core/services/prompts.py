@@ -0,0 +1,172 @@
+from typing import Dict, Iterable, List
+
+from .search_service import html_to_text
+
+# Instruction templates are formatted with str.format; literal JSON braces
+# are doubled. Keeping them as constants means only the variable parts are
+# built per call.
+
+TOPIC_IDEAS_PROMPT = """Generate {count} blog topic ideas for the category '{category}'.
+For each topic, provide:
+1. An engaging title
+2. A brief description (2-3 sentences)
+
+Format the response as a JSON array with 'title' and 'description' fields."""
+
+TOPICS_FROM_POSTS_PROMPT = """Based on these existing blog posts:
+
+{posts}
+
+Generate {count} new blog topic ideas that would complement the existing content.
+Each topic must have:
+1. A clear, engaging title
+2. A 2-3 sentence description explaining the topic
+
+Return the response in this exact JSON format:
+[
+    {{
+        "title": "Topic Title",
+        "description": "Topic description here"
+    }},
+    ...
+]
+
+Make sure:
+1. The topics are related but not duplicates of existing content
+2. Fill gaps in the current content
+3. Provide fresh perspectives or deeper dives
+4. The response is valid JSON with exactly {count} topics
+5. Each topic has both title and description fields"""
+
+ARTICLE_PROMPT = """Write a comprehensive article about: {title}
+
+Context and Requirements:
+1. Topic Information:
+   - Title: {title}
+   - Description: {description}
+   - Category: {category}
+
+2. Article Parameters:
+   - Purpose: {purpose}
+   - Target Audience: {target_audience}
+   - Tone of Voice: {tone_of_voice}
+   - Target Length: {word_count} words
+
+3. Structure:
+   - Start with an engaging introduction that hooks the {target_audience}
+   - Include 3-4 main sections with clear subheadings
+   - End with a strong conclusion that reinforces the {purpose}
+
+4. Content Guidelines:
+   - Write in a {tone_of_voice} tone
+   - Include specific examples and explanations suitable for the target audience
+   - Make it engaging and informative
+   - Focus on achieving the stated purpose
+
+5. Format:
+   - Use <h2> tags for main section headings
+   - Use <p> tags for paragraphs
+   - Keep formatting minimal and clean
+   - No complex HTML or styling
+
+Write the complete article now, using only basic HTML tags (<h2> and <p>)."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token count; Gemini averages about 4 characters per token."""
+    return len(text) // 4 + 1
+
+
+def compact(value) -> str:
+    """Reduce HTML or plain text to single-spaced plain text."""
+    return html_to_text(value if isinstance(value, str) else str(value or ''))
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """
+    Shorten text to roughly max_tokens, cutting at a word boundary.
+
+    Args:
+        text (str): Plain text
+        max_tokens (int): Estimated token budget
+
+    Returns:
+        str: The text, or its start followed by an ellipsis
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, max_tokens * 4 - 1)
+    cut = text[:limit].rsplit(' ', 1)[0] if ' ' in text[:limit] else text[:limit]
+    return f"{cut.rstrip()}…"
+
+
+def post_summary(title: str, excerpt: str) -> str:
+    """Format one post as a line of prompt context."""
+    return f"- {title}: {excerpt}" if excerpt else f"- {title}"
+
+
+def rendered(value) -> str:
+    """Read a field that is either plain text or a REST API {'rendered': ...} dict."""
+    return value.get('rendered', '') if isinstance(value, dict) else value
+
+
+def fit_lines(lines: Iterable[str], max_tokens: int) -> List[str]:
+    """Keep lines in order until the next one would exceed the token budget."""
+    kept = []
+    spent = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if kept and spent + cost > max_tokens:
+            break
+        kept.append(line)
+        spent += cost
+    return kept
+
+
+def topic_ideas_prompt(category_name: str, count: int) -> str:
+    return TOPIC_IDEAS_PROMPT.format(count=count, category=compact(category_name))
+
+
+def topics_from_posts_prompt(posts: List[Dict], count: int, max_context_tokens: int,
+                             excerpt_tokens: int = 80) -> str:
+    """
+    Build the topics-from-posts prompt within a context token budget.
+
+    Titles and excerpts are reduced to plain text, each excerpt is capped
+    at excerpt_tokens, and posts beyond max_context_tokens are dropped, so
+    callers should pass the most useful posts first.
+
+    Args:
+        posts (List[Dict]): Posts with 'title' and 'excerpt', as plain
+            strings or REST API rendered dicts
+        count (int): Number of topics to ask for
+        max_context_tokens (int): Budget for the post summaries
+        excerpt_tokens (int): Budget for a single excerpt
+
+    Returns:
+        str: The final prompt
+    """
+    lines = (
+        post_summary(
+            compact(rendered(post['title'])),
+            truncate(compact(rendered(post.get('excerpt', ''))), excerpt_tokens),
+        )
+        for post in posts
+    )
+    return TOPICS_FROM_POSTS_PROMPT.format(
+        posts='\n'.join(fit_lines(lines, max_context_tokens)),
+        count=count,
+    )
+
+
+def article_prompt(topic, parameters: Dict, max_context_tokens: int) -> str:
+    """Build the article prompt, capping the topic description at the context budget."""
+    return ARTICLE_PROMPT.format(
+        title=compact(topic.title),
+        description=truncate(compact(topic.description), max_context_tokens),
+        category=compact(topic.category.name),
+        purpose=compact(parameters['purpose']),
+        target_audience=compact(parameters['target_audience']),
+        tone_of_voice=compact(parameters['tone_of_voice']),
+        word_count=parameters['word_count'],
+    )
@@ -0,0 +1,313 @@
+import asyncio
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, List, Optional
+
+from django.conf import settings
+
+from .. import metrics
+
+
+class RateLimitExceeded(Exception):
+    """Raised when an upstream call is still throttled after every retry."""
+
+
+class MemoryBucketStore:
+    """Token bucket state for one process."""
+
+    # Whether calls may block, so async callers must run them in a thread
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._blocked_until = 0.0
+
+    def take(self, name: str, amount: float, per_minute: float, now: float) -> float:
+        """
+        Take amount tokens from a bucket holding at most one minute's worth.
+
+        The balance may go negative: the caller then owes the shortfall and
+        gets the time until it is refilled, so waiters are served in order.
+
+        Returns:
+            float: Seconds to wait before using the tokens
+        """
+        with self._lock:
+            tokens, updated = self._buckets.get(name, (per_minute, now))
+            tokens = min(per_minute, tokens + (now - updated) * per_minute / 60) - amount
+            self._buckets[name] = (tokens, now)
+        return max(0.0, -tokens * 60 / per_minute)
+
+    def give_back(self, name: str, amount: float):
+        with self._lock:
+            if name in self._buckets:
+                tokens, updated = self._buckets[name]
+                self._buckets[name] = (tokens + amount, updated)
+
+    def block(self, until: float):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, until)
+
+    def blocked_until(self) -> float:
+        return self._blocked_until
+
+
+class SQLiteBucketStore(MemoryBucketStore):
+    """
+    Token bucket state shared by every process using the same SQLite file.
+
+    Each update runs in a BEGIN IMMEDIATE transaction, so processes see
+    one another's reservations and cool-downs.
+    """
+
+    # BEGIN IMMEDIATE waits up to 30 seconds for other processes
+    blocking = True
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL)'
+            )
+
+    @contextmanager
+    def _transaction(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def take(self, name: str, amount: float, per_minute: float, now: float) -> float:
+        with self._transaction() as db:
+            row = db.execute('SELECT tokens, updated FROM buckets WHERE name = ?', (name,)).fetchone()
+            tokens, updated = row if row else (per_minute, now)
+            tokens = min(per_minute, tokens + (now - updated) * per_minute / 60) - amount
+            db.execute('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)', (name, tokens, now))
+        return max(0.0, -tokens * 60 / per_minute)
+
+    def give_back(self, name: str, amount: float):
+        with self._transaction() as db:
+            db.execute('UPDATE buckets SET tokens = tokens + ? WHERE name = ?', (amount, name))
+
+    def block(self, until: float):
+        # Stored as a bucket row whose 'updated' is the end of the cool-down
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO buckets VALUES ('blocked', 0, ?) "
+                "ON CONFLICT(name) DO UPDATE SET updated = MAX(updated, excluded.updated)",
+                (until,)
+            )
+
+    def blocked_until(self) -> float:
+        with self._transaction() as db:
+            row = db.execute("SELECT updated FROM buckets WHERE name = 'blocked'").fetchone()
+        return row[0] if row else 0.0
+
+
+class Slot:
+    """
+    One admitted call; report how it went with done(), failed() or throttled().
+
+    Slots of aslot() keep the store updates these imply in `deferred`, so
+    that they run in a worker thread when the slot is released instead of
+    blocking the event loop.
+    """
+
+    def __init__(self, limiter: 'RateLimiter', reserved_tokens: int, deferred: List = None):
+        self.limiter = limiter
+        self.reserved_tokens = reserved_tokens
+        self.started = time.monotonic()
+        self.outcome = None
+        self.deferred = deferred
+
+    def _update_store(self, fn: Callable, *args):
+        if self.deferred is None:
+            fn(*args)
+        else:
+            self.deferred.append((fn, args))
+
+    def done(self, tokens: Optional[int] = None):
+        self.outcome = 'done'
+        if tokens is not None and tokens < self.reserved_tokens:
+            # Return what the estimate over-reserved
+            self._update_store(self.limiter.store.give_back, 'tokens', self.reserved_tokens - tokens)
+
+    def failed(self):
+        """An error that says nothing about load; the limit stays as it is."""
+        self.outcome = 'failed'
+
+    def throttled(self, retry_after: Optional[float] = None):
+        self.outcome = 'throttled'
+        if retry_after:
+            self._update_store(self.limiter.store.block, time.time() + retry_after)
+
+
+class RateLimiter:
+    """
+    Admission control for calls to a rate-limited API.
+
+    Two token buckets cap requests per minute and tokens per minute. On top
+    of them the number of calls in flight follows AIMD (additive increase,
+    multiplicative decrease): each success raises the limit by 1/limit, and
+    a throttled call halves it, at most once per round of calls, and makes
+    every caller wait for Retry-After. The limit settles just below the
+    throughput the API sustains instead of oscillating between bursts of
+    429s.
+
+    Buckets and cool-downs live in process memory, or in a SQLite file
+    shared between processes when AI_RATE_LIMIT_DB is set. The concurrency
+    limit is always per process.
+    """
+
+    # Poll interval (seconds) of async callers waiting for a free slot
+    ASYNC_POLL = 0.05
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_concurrency: int = None, store=None):
+        self.requests_per_minute = requests_per_minute or settings.AI_REQUESTS_PER_MINUTE
+        self.tokens_per_minute = tokens_per_minute or settings.AI_TOKENS_PER_MINUTE
+        self.max_concurrency = max_concurrency or settings.AI_MAX_CONCURRENCY
+        if store is None:
+            store = SQLiteBucketStore(settings.AI_RATE_LIMIT_DB) if settings.AI_RATE_LIMIT_DB else MemoryBucketStore()
+        self.store = store
+        self.limit = min(2.0, float(self.max_concurrency))
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.throttled_count = 0
+        self._condition = threading.Condition()
+
+    def _admit(self) -> bool:
+        with self._condition:
+            if self.in_flight >= max(1, int(self.limit)):
+                return False
+            self.in_flight += 1
+            return True
+
+    def _reserve(self, tokens: int) -> float:
+        """Take from both buckets; returns how long to wait before calling."""
+        now = time.time()
+        wait = max(
+            self.store.take('requests', 1, self.requests_per_minute, now),
+            self.store.take('tokens', tokens, self.tokens_per_minute, now),
+        )
+        return max(wait, self.store.blocked_until() - now)
+
+    def _release(self, slot: Slot):
+        with self._condition:
+            self.in_flight -= 1
+            if slot.outcome == 'done':
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            elif slot.outcome == 'throttled':
+                self.throttled_count += 1
+                # Calls that started before the last decrease saw the old limit
+                if slot.started > self.last_decrease:
+                    self.limit = max(1.0, self.limit / 2)
+                    self.last_decrease = time.monotonic()
+            # The limit may have grown by more than the slot just freed
+            self._condition.notify(max(1, int(self.limit) - self.in_flight))
+
+    @contextmanager
+    def slot(self, tokens: int):
+        """
+        Wait until a call estimated at `tokens` tokens may be sent.
+
+        Args:
+            tokens (int): Estimated prompt plus response tokens
+        """
+        with self._condition:
+            while self.in_flight >= max(1, int(self.limit)):
+                self._condition.wait()
+            self.in_flight += 1
+        slot = Slot(self, tokens)
+        try:
+            time.sleep(self._reserve(tokens))
+            slot.started = time.monotonic()
+            yield slot
+        finally:
+            self._release(slot)
+
+    async def _in_thread(self, fn: Callable, *args):
+        """Call a store method without blocking the event loop on a shared store."""
+        if self.store.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int):
+        """slot() for coroutines; the store is only used from worker threads."""
+        while not self._admit():
+            await asyncio.sleep(self.ASYNC_POLL)
+        slot = Slot(self, tokens, deferred=[])
+        try:
+            await asyncio.sleep(await self._in_thread(self._reserve, tokens))
+            slot.started = time.monotonic()
+            yield slot
+        finally:
+            try:
+                # Before _release, so a cool-down is stored before anyone retries
+                for fn, args in slot.deferred:
+                    await self._in_thread(fn, *args)
+            finally:
+                self._release(slot)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'throttled': self.throttled_count,
+            }
+
+
+def backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds the API asked us to wait, from a Retry-After header, a RetryInfo
+    detail or a "retry in 12.3s" message; None when it did not say.
+    """
+    response = getattr(error, 'response', None)
+    header = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    for detail in getattr(error, 'details', None) or ():
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    match = re.search(r'retry in (\d+(?:\.\d+)?)\s*s', str(error), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+# Shared by every AIService instance in the process
+ai_rate_limiter = RateLimiter()
+
+metrics.Collected(
+    'gemini_concurrency_limit', 'Gemini calls allowed in flight (adapts to throttling)',
+    lambda: ai_rate_limiter.stats()['limit'],
+)
+metrics.Collected('gemini_in_flight', 'Gemini calls in flight', lambda: ai_rate_limiter.stats()['in_flight'])
+metrics.Collected(
+    'gemini_throttled_total', 'Gemini calls answered with a throttling error',
+    lambda: ai_rate_limiter.stats()['throttled'], metric_type='counter',
+)
@@ -0,0 +1,166 @@
+import asyncio
+import importlib
+import inspect
+import logging
+import threading
+import weakref
+from typing import Callable, Dict, List, Tuple
+
+from django.conf import settings
+
+from . import cassettes
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_shared: Dict[str, object] = {}
+# Clients bound to an event loop, keyed by (id(loop), name)
+_per_loop: Dict[Tuple[int, str], Tuple[weakref.ref, object]] = {}
+# Per loop: (loop, close callbacks, the async generator that runs them)
+_closers: Dict[int, Tuple[weakref.ref, List[Callable], object]] = {}
+
+
+def _get(name: str, factory: Callable):
+    """Return the process-wide object called name, building it on first use."""
+    value = _shared.get(name)
+    if value is None:
+        with _lock:
+            value = _shared.get(name)
+            if value is None:
+                value = _shared[name] = factory()
+    return value
+
+
+def _get_for_loop(name: str, factory: Callable):
+    """
+    Return the object called name for the running event loop.
+
+    gRPC and httpx async clients only work on the loop they were first
+    used on. Under an ASGI server there is one loop per process, so the
+    client lives as long as the process; async views run under WSGI get a
+    new loop per request. Factories register how to close what they build
+    with _close_with_loop(), and entries of closed loops are dropped.
+    """
+    loop = asyncio.get_running_loop()
+    key = (id(loop), name)
+    with _lock:
+        for stale in [k for k, (ref, _) in _per_loop.items() if _is_gone(ref)]:
+            del _per_loop[stale]
+        for stale in [k for k, (ref, _, _) in _closers.items() if _is_gone(ref)]:
+            del _closers[stale]
+        entry = _per_loop.get(key)
+        if entry is None or entry[0]() is not loop:
+            entry = _per_loop[key] = (weakref.ref(loop), factory())
+    return entry[1]
+
+
+def _is_gone(ref: weakref.ref) -> bool:
+    loop = ref()
+    return loop is None or loop.is_closed()
+
+
+def _close_with_loop(close: Callable):
+    """
+    Call close() (and await its result) when the running loop shuts down.
+
+    asyncio.run(), which asgiref's async_to_sync uses for every async view
+    under WSGI, closes the async generators of a loop before closing it;
+    one generator per loop is kept waiting so that its finally block
+    closes that loop's clients while they can still be awaited.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _closers.get(id(loop))
+        if entry is None or entry[0]() is not loop:
+            callbacks: List[Callable] = []
+            keeper = _closing(callbacks)
+            # Calling __anext__ registers the generator with the running loop
+            asyncio.ensure_future(keeper.__anext__())
+            entry = _closers[id(loop)] = (weakref.ref(loop), callbacks, keeper)
+        entry[1].append(close)
+
+
+async def _closing(callbacks: List[Callable]):
+    try:
+        yield
+    finally:
+        for close in callbacks:
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning("Error closing a client at event loop shutdown: %s", e)
+
+
+def genai():
+    """
+    The google.generativeai module, imported and configured on first use.
+
+    Importing the SDK takes about half a second, so it is kept out of
+    module imports; configure() is called only once because it also throws
+    away the SDK's cached gRPC clients.
+    """
+    def load():
+        module = importlib.import_module('google.generativeai')
+        module.configure(api_key=settings.GEMINI_API_KEY)
+        return module
+    return _get('genai', load)
+
+
+def gemini_model(model_name: str):
+    """A GenerativeModel shared by every thread; its gRPC channel is reused."""
+    return _get(
+        f'gemini:{model_name}',
+        lambda: cassettes.gemini_model(model_name, lambda: genai().GenerativeModel(model_name)),
+    )
+
+
+def async_gemini_model(model_name: str):
+    """A GenerativeModel for the running event loop, with its own async client."""
+    def build():
+        model = genai().GenerativeModel(model_name)
+        # The SDK's default async client is process-global and would be
+        # reused on other loops; give each loop its own
+        client = importlib.import_module('google.generativeai.client')
+        model._async_client = client._client_manager.make_client('generative_async')
+        _close_with_loop(model._async_client.transport.close)
+        return model
+    return _get_for_loop(f'gemini:{model_name}', lambda: cassettes.gemini_model(model_name, build))
+
+
+def wordpress_session():
+    """The keep-alive requests session shared by every WordPressService."""
+    from .wordpress_service import build_session
+    return _get('wordpress_session', build_session)
+
+
+def async_wordpress_client():
+    """The httpx client shared by AsyncWordPressServices on the running loop."""
+    from .wordpress_service import build_async_client
+
+    def build():
+        client = build_async_client()
+        _close_with_loop(client.aclose)
+        return client
+    return _get_for_loop('wordpress_client', build)
+
+
+def warm_up():
+    """
+    Import the SDKs and build the shared clients ahead of the first request.
+
+    Connections are still opened lazily, so this makes no network calls.
+    Call it after forking worker processes, not before.
+    """
+    from .ai_service import AIService
+    gemini_model(AIService.model_name)
+    wordpress_session()
+
+
+def clear():
+    """Forget every shared client, e.g. in a child process after fork."""
+    with _lock:
+        _shared.clear()
+        _closers.clear()
+        _per_loop.clear()
@@ -0,0 +1,366 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError
+
+from .content_store import load_bodies
+from .dedup_service import stem
+from .prompts import estimate_tokens, post_summary
+from .search_service import STOPWORDS, html_to_text
+
+logger = logging.getLogger(__name__)
+
+
+class PostContext(NamedTuple):
+    wp_id: int
+    title: str
+    excerpt: str
+    published: float
+    tokens: int
+
+
+def terms(text: str) -> List[str]:
+    """Split plain text into stemmed, non-stopword terms, keeping repeats."""
+    return [stem(word) for word in re.findall(r'\w+', text.lower()) if word not in STOPWORDS]
+
+
+class PostIndex:
+    """
+    In-memory BM25 index over synced WordPressPost rows.
+
+    Postings are kept in term-major (CSC) NumPy arrays of term frequencies,
+    so scoring a query is one vectorized pass per query term. Document
+    frequencies and lengths are maintained as posts come and go, and BM25
+    weights are computed from them at query time, so a changed post never
+    forces the arrays to be rebuilt: its old row is masked out and the new
+    version is scored from a small side table. The arrays are rebuilt (and
+    the vocabulary compacted) only when the side table and masked rows
+    outgrow merge_fraction of the index.
+
+    refresh() is incremental: only rows whose updated_at is at or after
+    the last refresh are re-read, and rows already indexed at that
+    updated_at are skipped.
+    """
+
+    k1 = 1.2
+    b = 0.75
+    # Title terms are counted this many times, a cheap stand-in for BM25F
+    title_boost = 3
+    # Only the start of long posts is indexed; it carries the subject and
+    # keeps memory proportional to the number of posts
+    max_words = 400
+    # Excerpts are trimmed to this many words in the prompt context
+    excerpt_words = 60
+    # Relevance-ranked posts considered for the diversity pass
+    candidates = 50
+    # MMR trade-off between relevance (1.0) and novelty (0.0)
+    diversity_lambda = 0.7
+    # Seconds between checks for deleted posts when nothing else changed
+    deletion_check_interval = 30
+    # Changed and deleted posts tolerated outside the postings arrays,
+    # as a share of all posts (but at least merge_min) before a rebuild
+    merge_fraction = 0.1
+    merge_min = 100
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._vocab: Dict[str, int] = {}
+        self._docs: Dict[int, tuple] = {}
+        self._posts: Dict[int, PostContext] = {}
+        # updated_at of every indexed post, to skip rows re-read unchanged
+        self._versions: Dict[int, object] = {}
+        self._watermark = None
+        self._checked_deletions = 0.0
+        # Posts containing each term id, and the summed length of all posts
+        self._doc_freq = np.zeros(0, dtype=np.int64)
+        self._total_length = 0.0
+        # Term counts of posts added or changed since the last _build
+        self._pending: Dict[int, Dict[int, float]] = {}
+        self._build()
+
+    def refresh(self):
+        """Read posts changed since the last refresh and drop deleted ones."""
+        from ..models import WordPressPost
+
+        with self._lock:
+            queryset = WordPressPost.objects.only(
+                'wp_id', 'title', 'excerpt', 'published_date', 'updated_at'
+            ).order_by()
+            if self._watermark is not None:
+                # Inclusive bound: rows written in the same instant as the
+                # previous refresh are re-read rather than missed
+                queryset = queryset.filter(updated_at__gte=self._watermark)
+            changed = [
+                post for post in queryset.iterator(chunk_size=500)
+                if self._versions.get(post.wp_id) != post.updated_at
+            ]
+            for start in range(0, len(changed), 500):
+                self.add(load_bodies(changed[start:start + 500]))
+                # Drop the bodies again; only term counts are kept
+                for post in changed[start:start + 500]:
+                    post.__dict__.pop('_body', None)
+            if changed:
+                self._watermark = max(post.updated_at for post in changed)
+
+            now = time.monotonic()
+            if changed or now - self._checked_deletions >= self.deletion_check_interval:
+                self._checked_deletions = now
+                if WordPressPost.objects.count() != len(self._docs):
+                    live = set(WordPressPost.objects.values_list('wp_id', flat=True))
+                    self.remove([wp_id for wp_id in self._docs if wp_id not in live])
+
+            if self._needs_build():
+                self._build()
+
+    def add(self, posts: Iterable):
+        """Add or replace WordPressPost instances."""
+        with self._lock:
+            for post in posts:
+                if post.wp_id in self._docs:
+                    self._forget(post.wp_id)
+                title = html_to_text(post.title)
+                excerpt = html_to_text(post.excerpt)
+                body = ' '.join(html_to_text(post.content).split()[:self.max_words])
+                counts = Counter(terms(title) * self.title_boost + terms(excerpt) + terms(body))
+                term_ids = np.fromiter(
+                    (self._vocab.setdefault(term, len(self._vocab)) for term in counts),
+                    dtype=np.int32, count=len(counts)
+                )
+                frequencies = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+                if len(self._vocab) > len(self._doc_freq):
+                    grown = np.zeros(max(len(self._vocab), 2 * len(self._doc_freq)), dtype=np.int64)
+                    grown[:len(self._doc_freq)] = self._doc_freq
+                    self._doc_freq = grown
+                self._doc_freq[term_ids] += 1
+                self._total_length += float(frequencies.sum())
+                self._docs[post.wp_id] = (term_ids, frequencies)
+                self._pending[post.wp_id] = dict(zip(term_ids.tolist(), frequencies.tolist()))
+                self._versions[post.wp_id] = post.updated_at
+                excerpt = ' '.join(excerpt.split()[:self.excerpt_words])
+                self._posts[post.wp_id] = PostContext(
+                    post.wp_id, title, excerpt,
+                    post.published_date.timestamp() if post.published_date else 0.0,
+                    estimate_tokens(post_summary(title, excerpt)),
+                )
+
+    def remove(self, wp_ids: Iterable[int]):
+        with self._lock:
+            for wp_id in wp_ids:
+                if wp_id in self._docs:
+                    self._forget(wp_id)
+                self._posts.pop(wp_id, None)
+                self._versions.pop(wp_id, None)
+
+    def _forget(self, wp_id: int):
+        """Take an indexed post out of the statistics and mask its postings."""
+        term_ids, frequencies = self._docs.pop(wp_id)
+        self._doc_freq[term_ids] -= 1
+        self._total_length -= float(frequencies.sum())
+        self._pending.pop(wp_id, None)
+        row = self._positions.pop(wp_id, None)
+        if row is not None:
+            self._live[row] = False
+            self._stale += 1
+
+    def _needs_build(self) -> bool:
+        changes = len(self._pending) + self._stale
+        return changes > max(self.merge_min, self.merge_fraction * len(self._docs))
+
+    def _build(self):
+        """Rebuild the postings arrays from the per-post term counts."""
+        # Compact the vocabulary to the terms of indexed posts
+        used = np.flatnonzero(self._doc_freq[:len(self._vocab)] > 0)
+        remap = np.full(len(self._vocab), -1, dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        self._vocab = {term: int(remap[term_id]) for term, term_id in self._vocab.items() if remap[term_id] >= 0}
+        self._doc_freq = self._doc_freq[used]
+        self._docs = {wp_id: (remap[ids], freqs) for wp_id, (ids, freqs) in self._docs.items()}
+
+        wp_ids = np.fromiter(self._docs, dtype=np.int64, count=len(self._docs))
+        vectors = [self._docs[wp_id] for wp_id in wp_ids.tolist()]
+        if vectors:
+            term_ids = np.concatenate([ids for ids, _ in vectors])
+            frequencies = np.concatenate([freqs for _, freqs in vectors])
+            rows = np.repeat(np.arange(len(vectors), dtype=np.int32), [len(ids) for ids, _ in vectors])
+            lengths = np.bincount(rows, weights=frequencies, minlength=len(vectors)).astype(np.float32)
+        else:
+            term_ids = np.zeros(0, dtype=np.int32)
+            frequencies = np.zeros(0, dtype=np.float32)
+            rows = np.zeros(0, dtype=np.int32)
+            lengths = np.zeros(0, dtype=np.float32)
+
+        # Order within a term's postings does not matter, so skip the slower stable sort
+        order = np.argsort(term_ids, kind='quicksort')
+        indptr = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(self._vocab)), out=indptr[1:])
+
+        self._wp_ids = wp_ids
+        self._positions = {wp_id: row for row, wp_id in enumerate(wp_ids.tolist())}
+        self._live = np.ones(len(wp_ids), dtype=bool)
+        self._stale = 0
+        self._indptr = indptr
+        self._rows = rows[order]
+        self._frequencies = frequencies[order]
+        self._lengths = lengths
+        self._pending = {}
+
+    def _idf(self, term_ids) -> np.ndarray:
+        count = len(self._docs)
+        doc_freq = self._doc_freq[term_ids]
+        return np.log1p((count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def _candidate_ids(self) -> np.ndarray:
+        """wp_ids of the postings rows (including masked ones) followed by the pending posts."""
+        return np.concatenate([
+            self._wp_ids, np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+        ])
+
+    def score(self, query: str) -> np.ndarray:
+        """
+        BM25 score of every post in _candidate_ids() for a free-text query.
+
+        Masked rows (changed or deleted posts) score 0.
+        """
+        built = len(self._wp_ids)
+        pending = list(self._pending.values())
+        scores = np.zeros(built + len(pending), dtype=np.float32)
+        average = self._total_length / len(self._docs) if self._docs else 1.0
+        for term in set(terms(query)):
+            term_id = self._vocab.get(term)
+            if term_id is None:
+                continue
+            idf = float(self._idf(term_id))
+            if term_id + 1 < len(self._indptr):
+                start, stop = self._indptr[term_id], self._indptr[term_id + 1]
+                rows, frequencies = self._rows[start:stop], self._frequencies[start:stop]
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[rows] / average)
+                # A post appears at most once per term, so plain fancy-index add is safe
+                scores[rows] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+            for offset, counts in enumerate(pending):
+                frequency = counts.get(term_id)
+                if frequency:
+                    norm = self.k1 * (1 - self.b + self.b * sum(counts.values()) / average)
+                    scores[built + offset] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        scores[:built][~self._live] = 0
+        return scores
+
+    def _similarities(self, wp_ids: List[int]) -> np.ndarray:
+        """Cosine similarity of the TF-IDF vectors of the given posts."""
+        vectors = [self._docs[wp_id] for wp_id in wp_ids]
+        columns, inverse = np.unique(np.concatenate([ids for ids, _ in vectors]), return_inverse=True)
+        idf = self._idf(columns)
+        matrix = np.zeros((len(vectors), len(columns)), dtype=np.float32)
+        offset = 0
+        for row, (ids, frequencies) in enumerate(vectors):
+            columns_of_row = inverse[offset:offset + len(ids)]
+            matrix[row, columns_of_row] = frequencies * idf[columns_of_row]
+            offset += len(ids)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-9)
+        return matrix @ matrix.T
+
+    def select(self, query: str = '', token_budget: int = None,
+               max_posts: int = None) -> List[PostContext]:
+        """
+        Pick relevant, mutually diverse posts to use as prompt context.
+
+        Posts are ranked by BM25 against the query, or by recency when the
+        query is empty, then chosen greedily by maximal marginal relevance
+        so near-identical posts do not crowd out the rest. A post whose
+        summary would exceed the remaining token budget is skipped, and
+        shorter posts after it may still be chosen.
+
+        Args:
+            query (str): Seed text, e.g. a category name or a focus phrase
+            token_budget (int): Maximum estimated tokens of post summaries
+            max_posts (int): Maximum number of posts to return
+
+        Returns:
+            List[PostContext]: The selected posts, most useful first
+        """
+        token_budget = token_budget or settings.WORDPRESS_CONTEXT_TOKEN_BUDGET
+        max_posts = max_posts or settings.WORDPRESS_CONTEXT_MAX_POSTS
+
+        with self._lock:
+            if self._needs_build():
+                self._build()
+            if not self._docs:
+                return []
+
+            wp_ids = self._candidate_ids()
+            live = np.concatenate([self._live, np.ones(len(self._pending), dtype=bool)])
+            relevance = self.score(query) if query.strip() else None
+            if relevance is None or not relevance.any():
+                relevance = np.array([
+                    self._posts[int(wp_id)].published if alive else np.nan
+                    for wp_id, alive in zip(wp_ids, live)
+                ], dtype=np.float64)
+                relevance -= np.nanmin(relevance)
+            else:
+                relevance = relevance.astype(np.float64)
+                # Posts not matching any query term are never picked
+                relevance[relevance <= 0] = np.nan
+
+            ranked = np.argsort(np.nan_to_num(relevance, nan=-np.inf))[::-1]
+            ranked = ranked[~np.isnan(relevance[ranked])][:self.candidates]
+            if not len(ranked):
+                return []
+            gains = relevance[ranked] / (relevance[ranked].max() or 1.0)
+            candidates = [int(wp_id) for wp_id in wp_ids[ranked]]
+            similarity = self._similarities(candidates)
+
+            selected: List[int] = []
+            redundancy = np.zeros(len(ranked))
+            available = np.ones(len(ranked), dtype=bool)
+            spent = 0
+            while available.any() and len(selected) < max_posts:
+                mmr = self.diversity_lambda * gains - (1 - self.diversity_lambda) * redundancy
+                mmr[~available] = -np.inf
+                best = int(np.argmax(mmr))
+                available[best] = False
+                post = self._posts[candidates[best]]
+                if spent + post.tokens > token_budget:
+                    continue
+                spent += post.tokens
+                selected.append(best)
+                redundancy = np.maximum(redundancy, similarity[best])
+            return [self._posts[candidates[index]] for index in selected]
+
+
+# Shared by every request in the process; refreshed from the database on
+# use, after a sync in this process and by warm_up()
+post_index = PostIndex()
+
+
+def warm_up():
+    """Index the synced posts before the first request that needs them."""
+    try:
+        post_index.refresh()
+    except DatabaseError as e:
+        # E.g. before the first migrate; requests index lazily instead
+        logger.warning("Could not build the WordPress post index: %s", e)
+
+
+def select_context_posts(query: str = '', token_budget: int = None,
+                         max_posts: int = None) -> List[Dict]:
+    """
+    Return synced posts to give the model as context for topic generation.
+
+    Args:
+        query (str): Seed category name and/or focus phrase
+        token_budget (int): Maximum estimated tokens of post summaries
+        max_posts (int): Maximum number of posts to return
+
+    Returns:
+        List[Dict]: Posts with plain-text 'title' and 'excerpt' keys
+    """
+    post_index.refresh()
+    return [
+        {'title': post.title, 'excerpt': post.excerpt}
+        for post in post_index.select(query, token_budget, max_posts)
+    ]
@@ -0,0 +1,298 @@
+import html
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import strip_tags
+from django.utils.module_loading import import_string
+
+from .content_store import has_body, load_bodies
+
+# Stable numeric codes; they are part of the FTS rowid, so never renumber them
+DOC_TYPES = {
+    'article': 1,
+    'topic': 2,
+    'wordpress_post': 3,
+}
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from how in is it of on or that the this to was what '
+    'when where which who why with you your'.split()
+)
+
+# Markers wrapped around matched terms in snippets; escaped before display
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+
+class SearchDocument(NamedTuple):
+    doc_type: str
+    object_id: int
+    title: str
+    body: str
+
+
+class SearchHit(NamedTuple):
+    doc_type: str
+    object_id: int
+    title: str
+    snippet: str
+    score: float
+
+
+def html_to_text(value: str) -> str:
+    """Strip tags and entities from rendered HTML, keeping words apart."""
+    text = strip_tags(re.sub(r'<', ' <', value or ''))
+    return ' '.join(html.unescape(text).split())
+
+
+def document_key(instance) -> Tuple[str, int]:
+    """The (doc_type, object_id) an instance is indexed under, without reading its content."""
+    from ..models import Article, Topic, WordPressPost
+
+    if isinstance(instance, Article):
+        return 'article', instance.pk
+    if isinstance(instance, Topic):
+        return 'topic', instance.pk
+    if isinstance(instance, WordPressPost):
+        return 'wordpress_post', instance.wp_id
+    raise TypeError(f"{type(instance).__name__} is not searchable")
+
+
+def document_for(instance) -> SearchDocument:
+    """
+    Build the search document for an Article, Topic or WordPressPost.
+
+    WordPress posts are keyed by wp_id rather than pk so that rows written
+    by the bulk sync path can be indexed without reading their pks back.
+    """
+    from ..models import Article, Topic, WordPressPost
+
+    if isinstance(instance, Article):
+        return SearchDocument('article', instance.pk, instance.title, html_to_text(instance.content))
+    if isinstance(instance, Topic):
+        return SearchDocument('topic', instance.pk, instance.title, instance.description)
+    if isinstance(instance, WordPressPost):
+        return SearchDocument(
+            'wordpress_post',
+            instance.wp_id,
+            html_to_text(instance.title),
+            f"{html_to_text(instance.excerpt)}\n{html_to_text(instance.content)}",
+        )
+    raise TypeError(f"{type(instance).__name__} is not searchable")
+
+
+class SearchBackend:
+    """Interface for full-text search backends."""
+
+    def index(self, documents: Iterable[SearchDocument]):
+        """Add or replace documents in the index."""
+        raise NotImplementedError
+
+    def remove(self, doc_type: str, object_ids: Iterable[int]):
+        """Drop documents from the index."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every document from the index."""
+        raise NotImplementedError
+
+    def search(self, query: str, doc_types: List[str] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[List[SearchHit], int]:
+        """
+        Run a ranked search.
+
+        Args:
+            query (str): Free text entered by the user
+            doc_types (List[str]): Restrict results to these document types
+            limit (int): Page size
+            offset (int): Number of hits to skip
+
+        Returns:
+            Tuple[List[SearchHit], int]: The page of hits and the total hit count
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    SQLite FTS5 index stored in the core_search_index virtual table.
+
+    Each document's rowid encodes its type and id, so updates and deletes
+    are rowid lookups rather than scans. Hits are ranked with BM25,
+    weighting title matches above body matches.
+    """
+
+    table = 'core_search_index'
+    title_weight = 5.0
+    body_weight = 1.0
+
+    @staticmethod
+    def rowid(doc_type: str, object_id: int) -> int:
+        return object_id * 8 + DOC_TYPES[doc_type]
+
+    @staticmethod
+    def match_expression(query: str) -> Optional[str]:
+        """
+        Turn free text into an FTS5 MATCH expression.
+
+        Every word must match (the porter tokenizer folds word forms).
+        Stopwords are dropped unless the query has nothing else, since a
+        term present in almost every document makes ranking scan the
+        whole index.
+        """
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            return None
+        terms = [term for term in terms if term not in STOPWORDS] or terms
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def index(self, documents: Iterable[SearchDocument]):
+        rows = [
+            (self.rowid(doc.doc_type, doc.object_id), doc.title, doc.body, doc.doc_type, doc.object_id)
+            for doc in documents
+        ]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(row[0],) for row in rows]
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, body, doc_type, object_id) "
+                f"VALUES (%s, %s, %s, %s, %s)",
+                rows
+            )
+
+    def remove(self, doc_type: str, object_ids: Iterable[int]):
+        rowids = [(self.rowid(doc_type, object_id),) for object_id in object_ids]
+        if not rowids:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", rowids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def search(self, query: str, doc_types: List[str] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[List[SearchHit], int]:
+        expression = self.match_expression(query)
+        if expression is None:
+            return [], 0
+
+        where = f"{self.table} MATCH %s"
+        params = [expression]
+        if doc_types:
+            where += f" AND doc_type IN ({', '.join(['%s'] * len(doc_types))})"
+            params.extend(doc_types)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {self.table} WHERE {where}", params)
+            total = cursor.fetchone()[0]
+            if not total:
+                return [], 0
+
+            cursor.execute(
+                f"SELECT doc_type, object_id, title, "
+                f"snippet({self.table}, 1, %s, %s, '…', 24), "
+                f"bm25({self.table}, %s, %s) AS score "
+                f"FROM {self.table} WHERE {where} "
+                f"ORDER BY score LIMIT %s OFFSET %s",
+                [HIGHLIGHT_START, HIGHLIGHT_END, self.title_weight, self.body_weight,
+                 *params, limit, offset]
+            )
+            hits = [
+                SearchHit(doc_type, int(object_id), title, snippet, -score)
+                for doc_type, object_id, title, snippet, score in cursor.fetchall()
+            ]
+        return hits, total
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Fallback for databases without FTS5: unranked icontains queries.
+
+    Keeps search working on other engines, but scans the tables on every
+    query, so it is only suitable for small installations. Bodies are
+    stored compressed, so only titles, excerpts and descriptions match.
+    """
+
+    def index(self, documents: Iterable[SearchDocument]):
+        pass
+
+    def remove(self, doc_type: str, object_ids: Iterable[int]):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query: str, doc_types: List[str] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[List[SearchHit], int]:
+        from ..models import Article, Topic, WordPressPost
+
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return [], 0
+
+        sources = [
+            ('article', Article.objects.order_by('-pk'), ['title', 'excerpt']),
+            ('topic', Topic.objects.order_by('-pk'), ['title', 'description']),
+            ('wordpress_post', WordPressPost.objects.all(), ['title', 'excerpt']),
+        ]
+        hits = []
+        total = 0
+        for doc_type, queryset, fields in sources:
+            if doc_types and doc_type not in doc_types:
+                continue
+            for term in terms:
+                match = Q()
+                for field in fields:
+                    match |= Q(**{f'{field}__icontains': term})
+                queryset = queryset.filter(match)
+
+            # Page across the sources as if their results were concatenated
+            count = queryset.count()
+            start = max(0, offset - total)
+            stop = min(count, offset + limit - total)
+            if stop > start:
+                page = list(queryset[start:stop])
+                if doc_type != 'topic':
+                    load_bodies(page)
+                for instance in page:
+                    document = document_for(instance)
+                    hits.append(SearchHit(doc_type, document.object_id, document.title,
+                                          document.body[:200], 0.0))
+            total += count
+        return hits, total
+
+
+_backend = None
+
+
+def get_search_backend() -> SearchBackend:
+    """Return the process-wide backend configured by SEARCH_BACKEND."""
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.SEARCH_BACKEND)()
+    return _backend
+
+
+def index_instances(instances: Iterable):
+    instances = list(instances)
+    if instances and has_body(type(instances[0])):
+        # One query for the whole batch instead of one per body
+        load_bodies(instances)
+    get_search_backend().index(document_for(instance) for instance in instances)
+
+
+def remove_documents(keys: Iterable[Tuple[str, int]]):
+    """Drop the documents stored under document_key()s, one call per document type."""
+    object_ids = {}
+    for doc_type, object_id in keys:
+        object_ids.setdefault(doc_type, []).append(object_id)
+    for doc_type, ids in object_ids.items():
+        get_search_backend().remove(doc_type, ids)
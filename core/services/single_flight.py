@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process coalescing only
+    fcntl = None
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running block until it finishes and receive the same result
+    (or exception). Once the call completes the key is forgotten, so later
+    calls run again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable):
+        """
+        Run fn for key, or wait for the run already in flight.
+
+        Args:
+            key (str): Identifies calls that can share a result
+            fn (Callable): Zero-argument function producing the result
+
+        Returns:
+            The result of fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines: concurrent awaits of a key share one run.
+
+    The run is a task of its own that every caller awaits through
+    asyncio.shield, so a caller that is cancelled (e.g. its client went
+    away) neither cancels the run nor the other callers waiting on it; the
+    run finishes even if every caller is gone. Calls are only shared
+    within one event loop, since their tasks cannot be awaited from another.
+    """
+
+    def __init__(self):
+        self._calls: Dict[tuple, asyncio.Task] = {}
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable):
+        """
+        Await fn() for key, or the run of it already in flight.
+
+        Args:
+            key (str): Identifies calls that can share a result
+            fn (Callable): Zero-argument coroutine function producing the result
+
+        Returns:
+            The result of fn
+        """
+        slot = (id(asyncio.get_running_loop()), key)
+        call = self._calls.get(slot)
+        if call is None:
+            call = self._calls[slot] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda task: self._finished(slot, task))
+        else:
+            self.shared += 1
+        return await asyncio.shield(call)
+
+    def _finished(self, slot: tuple, task: asyncio.Task):
+        if self._calls.get(slot) is task:
+            del self._calls[slot]
+        if not task.cancelled():
+            # Mark the exception retrieved when every caller was cancelled
+            task.exception()
+
+
+# Keys are hashed onto this many lock files, so lock_dir never grows past
+# it; two keys that share a file only wait for each other
+LOCK_FILES = 1024
+
+
+def _lock_file(key: str, lock_dir) -> int:
+    lock_dir = Path(lock_dir)
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    slot = int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'big') % LOCK_FILES
+    return os.open(lock_dir / f"{slot:04d}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+
+
+@contextmanager
+def process_lock(key: str, lock_dir):
+    """
+    Hold an exclusive lock on key that is visible to other processes.
+
+    Uses one of LOCK_FILES flock()ed files under lock_dir, picked by a
+    hash of key. On platforms without fcntl this is a no-op and only
+    in-process coalescing applies.
+
+    Args:
+        key (str): Lock name
+        lock_dir: Directory holding the lock files
+    """
+    if fcntl is None:
+        yield
+        return
+
+    fd = _lock_file(key, lock_dir)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+@asynccontextmanager
+async def async_process_lock(key: str, lock_dir):
+    """process_lock for coroutines; waiting for the lock happens in a worker thread."""
+    if fcntl is None:
+        yield
+        return
+
+    fd = _lock_file(key, lock_dir)
+    try:
+        await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+# Shared by every AIService instance in the process
+ai_single_flight = SingleFlight()
+async_ai_single_flight = AsyncSingleFlight()
@@ -0,0 +1,76 @@
+import re
+from functools import reduce
+from operator import or_
+from typing import Dict, List
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Range lookups OR'ed into one query; SQLite caps expression depth at 1000
+_MAX_RANGES_PER_QUERY = 200
+
+
+def allocate_slugs(model, values: List[str], field: str = 'slug', fallback: str = 'item') -> List[str]:
+    """
+    Derive unique slugs for a batch of new rows.
+
+    Each value is slugified; slugs already taken in the table or earlier in
+    the batch get the next free numeric suffix (title, title-2, title-3...).
+    Taken slugs are looked up with one query for the whole batch, plus one
+    range query per 200 colliding slugs, instead of one query per row.
+
+    Args:
+        model: The model class owning the slug field
+        values (List[str]): Titles or names to slugify
+        field (str): Name of the unique slug field
+        fallback (str): Slug used for values that slugify to nothing
+
+    Returns:
+        List[str]: One unique slug per value, in order
+    """
+    max_length = model._meta.get_field(field).max_length
+    bases = [slugify(value)[:max_length].strip('-') or fallback for value in values]
+    if not bases:
+        return []
+
+    existing = set(
+        model.objects.filter(**{f'{field}__in': set(bases)}).values_list(field, flat=True)
+    )
+    slugs = []
+    used = set()
+    colliding = []
+    for index, base in enumerate(bases):
+        if base in existing or base in used:
+            colliding.append(index)
+            slugs.append(None)
+        else:
+            used.add(base)
+            slugs.append(base)
+    if not colliding:
+        return slugs
+
+    # Highest numeric suffix already in the table for each colliding slug.
+    # Siblings are found with index range scans between 'root-' and 'root.'
+    # ('.' sorts right after '-'); roots leave room for the suffix.
+    roots = {index: bases[index][:max_length - 8].rstrip('-') for index in colliding}
+    highest: Dict[str, int] = {root: 1 for root in roots.values()}
+    root_list = sorted(highest)
+    for start in range(0, len(root_list), _MAX_RANGES_PER_QUERY):
+        ranges = [
+            Q(**{f'{field}__gt': f'{root}-', f'{field}__lt': f'{root}.'})
+            for root in root_list[start:start + _MAX_RANGES_PER_QUERY]
+        ]
+        for slug in model.objects.filter(reduce(or_, ranges)).values_list(field, flat=True):
+            match = re.fullmatch(r'(.+)-(\d+)', slug)
+            if match and match.group(1) in highest:
+                highest[match.group(1)] = max(highest[match.group(1)], int(match.group(2)))
+
+    for index in colliding:
+        root = roots[index]
+        slug = None
+        while slug is None or slug in used:
+            highest[root] += 1
+            slug = f'{root}-{highest[root]}'
+        used.add(slug)
+        slugs[index] = slug
+    return slugs
@@ -0,0 +1,219 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from ..models import SyncCursor, WordPressPost
+from ..signals import post_bulk_save
+from .content_store import save_bodies
+from .wordpress_service import AsyncWordPressService, WordPressService
+
+
+class WordPressSyncService:
+    """
+    Mirror published WordPress posts into WordPressPost rows.
+
+    By default only posts modified since the last sync are requested, using
+    a persisted SyncCursor watermark. Rows whose content hash has not changed
+    are left untouched.
+    """
+
+    cursor_name = 'wordpress_posts'
+    update_fields = [
+        'title', 'excerpt', 'wp_url', 'published_date',
+        'modified_date', 'content_hash', 'last_synced', 'updated_at',
+    ]
+
+    def __init__(self, wp_service: WordPressService = None, batch_size: int = None):
+        self.wp_service = wp_service if wp_service is not None else WordPressService()
+        self.batch_size = batch_size or settings.WORDPRESS_SYNC_BATCH_SIZE
+
+    def sync(self, full: bool = False) -> Dict[str, int]:
+        """
+        Fetch posts from WordPress and store the ones that changed.
+
+        Args:
+            full (bool): Ignore the watermark and re-read every post
+
+        Returns:
+            Dict[str, int]: Counts of fetched, created, updated and unchanged posts
+
+        Raises:
+            requests.RequestException: If WordPress could not be read; the
+                watermark is only advanced after a successful sync
+        """
+        modified_after = self.get_modified_after(full)
+        counts = {'fetched': 0, 'created': 0, 'updated': 0, 'unchanged': 0}
+        latest = None
+        pending = []
+
+        def flush():
+            for name, value in self.store_posts(pending).items():
+                counts[name] += value
+            pending.clear()
+
+        for page in self.wp_service.iter_post_pages(modified_after=modified_after):
+            pending.extend(page)
+            latest = max(filter(None, [latest, self.latest_modified(page)]), default=None)
+            if len(pending) >= self.batch_size:
+                flush()
+        if pending:
+            flush()
+
+        self.advance_cursor(latest, full)
+        return counts
+
+    def get_modified_after(self, full: bool = False) -> Optional[datetime]:
+        """
+        Return the lower bound for a delta sync, or None for a full sync.
+
+        The watermark is moved back by WORDPRESS_SYNC_OVERLAP because the
+        REST API compares modified_after against the site's local time;
+        posts re-read because of the overlap are skipped by their hash.
+        """
+        if full:
+            return None
+        cursor = SyncCursor.objects.filter(name=self.cursor_name).first()
+        if cursor is None or cursor.modified_gmt is None:
+            return None
+        return cursor.modified_gmt - timedelta(seconds=settings.WORDPRESS_SYNC_OVERLAP)
+
+    def advance_cursor(self, latest: Optional[datetime], full: bool = False):
+        """Persist the newest modification time seen by a successful sync."""
+        cursor, _ = SyncCursor.objects.get_or_create(name=self.cursor_name)
+        if latest is None:
+            return
+        if full or cursor.modified_gmt is None or latest > cursor.modified_gmt:
+            cursor.modified_gmt = latest
+            cursor.save()
+
+    def store_posts(self, posts: List[Dict]) -> Dict[str, int]:
+        """
+        Upsert REST API posts in batches, skipping rows whose hash is unchanged.
+
+        Existing hashes are read with one query per batch, and changed rows are written
+        with INSERT ... ON CONFLICT (wp_id) DO UPDATE in batches of
+        batch_size, all inside a single transaction.
+
+        Args:
+            posts (List[Dict]): Posts as returned by the REST API
+
+        Returns:
+            Dict[str, int]: Counts of fetched, created, updated and unchanged posts
+        """
+        rows = {post['id']: self.post_fields(post) for post in posts}
+        existing = {}
+        wp_ids = list(rows)
+        for start in range(0, len(wp_ids), self.batch_size):
+            existing.update(
+                WordPressPost.objects.filter(wp_id__in=wp_ids[start:start + self.batch_size])
+                .values_list('wp_id', 'content_hash')
+            )
+
+        counts = {'fetched': len(posts), 'created': 0, 'updated': 0, 'unchanged': 0}
+        changed = []
+        for wp_id, fields in rows.items():
+            if wp_id not in existing:
+                counts['created'] += 1
+            elif existing[wp_id] == fields['content_hash']:
+                counts['unchanged'] += 1
+                continue
+            else:
+                counts['updated'] += 1
+            changed.append(WordPressPost(wp_id=wp_id, **fields))
+
+        if changed:
+            with transaction.atomic():
+                WordPressPost.objects.bulk_create(
+                    changed,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['wp_id'],
+                    update_fields=self.update_fields,
+                )
+                # Bodies live in ContentBody, keyed by wp_id
+                save_bodies(changed, batch_size=self.batch_size)
+                post_bulk_save.send(sender=WordPressPost, instances=changed, created=counts['created'])
+        return counts
+
+    @staticmethod
+    def post_fields(post: Dict) -> Dict:
+        """Map a REST API post to WordPressPost field values, including its hash."""
+        fields = {
+            'title': post['title']['rendered'],
+            'excerpt': post['excerpt']['rendered'],
+            'content': post.get('content', {}).get('rendered', ''),
+            'wp_url': post['link'],
+            'published_date': post['date'],
+        }
+        fields['content_hash'] = hashlib.sha256(
+            json.dumps(fields, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        fields['modified_date'] = WordPressSyncService.parse_gmt(post.get('modified_gmt'))
+        return fields
+
+    @staticmethod
+    def parse_gmt(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is not None and parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=dt_timezone.utc)
+        return parsed
+
+    @classmethod
+    def latest_modified(cls, posts: List[Dict]) -> Optional[datetime]:
+        return max(
+            filter(None, (cls.parse_gmt(post.get('modified_gmt')) for post in posts)),
+            default=None
+        )
+
+
+
+class AsyncWordPressSyncService(WordPressSyncService):
+    """
+    WordPressSyncService for async views.
+
+    Pages are fetched with AsyncWordPressService; the database work is the
+    same as in a synchronous sync and runs in Django's sync thread.
+    """
+
+    def __init__(self, wp_service: AsyncWordPressService = None, batch_size: int = None):
+        super().__init__(
+            wp_service if wp_service is not None else AsyncWordPressService(),
+            batch_size,
+        )
+
+    async def sync(self, full: bool = False) -> Dict[str, int]:
+        """
+        See WordPressSyncService.sync; closes the HTTP client when done.
+
+        Raises:
+            httpx.HTTPError: If WordPress could not be read
+        """
+        modified_after = await sync_to_async(self.get_modified_after)(full)
+        counts = {'fetched': 0, 'created': 0, 'updated': 0, 'unchanged': 0}
+        latest = None
+        pending = []
+
+        async def flush():
+            for name, value in (await sync_to_async(self.store_posts)(pending)).items():
+                counts[name] += value
+            pending.clear()
+
+        async with self.wp_service:
+            async for page in self.wp_service.iter_post_pages(modified_after=modified_after):
+                pending.extend(page)
+                latest = max(filter(None, [latest, self.latest_modified(page)]), default=None)
+                if len(pending) >= self.batch_size:
+                    await flush()
+        if pending:
+            await flush()
+
+        await sync_to_async(self.advance_cursor)(latest, full)
+        return counts
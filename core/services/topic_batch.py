@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+
+from .ai_service import AsyncAIService
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryIdeas(NamedTuple):
+    category: object
+    ideas: List[Dict]
+    error: Optional[str]
+
+
+async def generate_for_categories(categories: List, count: int = 3, use_cache: bool = True,
+                                  concurrency: int = None) -> List[CategoryIdeas]:
+    """
+    Generate topic ideas for many categories concurrently.
+
+    At most `concurrency` Gemini requests are in flight at a time. A failed
+    category is reported with its error instead of failing the batch.
+
+    Args:
+        categories (List): Category objects
+        count (int): Ideas per category
+        use_cache (bool): Set to False to always call Gemini
+        concurrency (int): Parallel requests; defaults to AI_BATCH_CONCURRENCY
+
+    Returns:
+        List[CategoryIdeas]: One result per category, in the order given
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.AI_BATCH_CONCURRENCY)
+
+    async def generate(category) -> CategoryIdeas:
+        async with semaphore:
+            try:
+                ideas = await AsyncAIService().generate_topic_ideas(category.name, count, use_cache=use_cache)
+            except Exception as e:
+                logger.error("Error generating topics for %s: %s", category.name, e)
+                return CategoryIdeas(category, [], str(e))
+        return CategoryIdeas(category, ideas, None)
+
+    return await asyncio.gather(*(generate(category) for category in categories))
+
+
+def combined_ideas(results: List[CategoryIdeas]) -> List[Dict]:
+    """Flatten batch results into one list of ideas that carry their category_id."""
+    return [
+        {
+            'title': idea.get('title', ''),
+            'description': idea.get('description', ''),
+            'category_id': result.category.id,
+        }
+        for result in results
+        for idea in result.ideas
+        if isinstance(idea, dict)
+    ]
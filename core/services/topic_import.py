@@ -0,0 +1,295 @@
+import json
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import Category, Topic
+from ..signals import post_bulk_save
+from . import counters
+from .slugs import allocate_slugs
+
+
+class TopicImportError(ValueError):
+    """Raised for malformed input or references to unknown categories."""
+
+
+class _JSONReader:
+    """
+    Read a JSON document incrementally from a text stream.
+
+    Only the container structure is walked by hand; each array element
+    (or skipped value) is decoded with json.JSONDecoder.raw_decode, so
+    memory is bounded by the read chunk plus the largest single element.
+    """
+
+    chunk_size = 1 << 16
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer stays small
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise TopicImportError(f"Invalid JSON: expected '{char}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise TopicImportError(f"Invalid JSON: {e}")
+            # A number cut by the buffer edge (e.g. '12' of '125', or '12' of
+            # '12.5' with '.' still in the buffer) may continue in the next chunk
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and not self.buffer[end:].strip('0123456789.eE+-') and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator:
+        """Yield the elements of the array starting at the current position."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+    def members(self) -> Iterator[str]:
+        """Yield the keys of the object at the current position; the caller reads each value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+
+def iter_records(stream: IO[str], jsonl: bool = False) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream ('category', data) and ('topic', data) records from a file.
+
+    Accepted layouts:
+        - {"categories": [...], "topics": [...]}, as in topics.json
+        - a JSON array of topics
+        - JSON Lines: one object per line; objects with a 'name' and no
+          'title' are categories, everything else is a topic
+
+    Args:
+        stream: Text stream to read
+        jsonl (bool): Treat the input as JSON Lines
+
+    Yields:
+        Tuple[str, Dict]: Record kind and its fields
+    """
+    if jsonl:
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise TopicImportError(f"Line {number}: {e}")
+            if not isinstance(data, dict):
+                raise TopicImportError(f"Line {number}: expected a JSON object")
+            yield ('category' if 'name' in data and 'title' not in data else 'topic'), data
+        return
+
+    reader = _JSONReader(stream)
+    if reader.peek() == '[':
+        for data in reader.items():
+            yield 'topic', data
+        return
+
+    for key in reader.members():
+        if key in ('categories', 'topics'):
+            kind = 'topic' if key == 'topics' else 'category'
+            for data in reader.items():
+                yield kind, data
+        else:
+            reader.value()
+
+
+class TopicImportService:
+    """
+    Create categories and topics in bulk.
+
+    Topics are written with bulk_create in batches of batch_size inside a
+    single transaction, so an import either lands completely or not at all.
+    Slugs for each batch are allocated together (see allocate_slugs), and
+    post_bulk_save is sent per batch so the search and duplicate indexes
+    follow along.
+    """
+
+    def __init__(self, batch_size: int = None, send_signals: bool = True):
+        self.batch_size = batch_size or settings.TOPIC_IMPORT_BATCH_SIZE
+        self.send_signals = send_signals
+
+    def import_file(self, path: str, jsonl: bool = None, default_category: Category = None) -> Dict[str, int]:
+        """
+        Import a topics file without loading it into memory.
+
+        Args:
+            path (str): File to read; .jsonl and .ndjson files are read as JSON Lines
+            jsonl (bool): Override the format detected from the file name
+            default_category (Category): Category for topics that name none
+
+        Returns:
+            Dict[str, int]: Counts of categories and topics created
+        """
+        if jsonl is None:
+            jsonl = str(path).endswith(('.jsonl', '.ndjson'))
+        with open(path, encoding='utf-8') as stream:
+            return self.import_records(iter_records(stream, jsonl=jsonl), default_category)
+
+    def import_topics(self, topics: Iterable[Dict], category: Category) -> int:
+        """Create topics from dicts with 'title' and 'description' in one category."""
+        return self.import_records((('topic', data) for data in topics), category)['topics']
+
+    def import_records(self, records: Iterable[Tuple[str, Dict]],
+                       default_category: Category = None) -> Dict[str, int]:
+        """
+        Create the categories and topics described by a record stream.
+
+        Categories are matched to existing ones by slug. Topics refer to a
+        category by 'category' (slug or name), or by 'category_id': the
+        1-based position among the categories read so far, or a primary
+        key when the input has no categories.
+
+        Returns:
+            Dict[str, int]: Counts of categories and topics created
+
+        Raises:
+            TopicImportError: On malformed records; nothing is saved
+        """
+        counts = {'categories': 0, 'topics': 0}
+        positions: Dict[int, int] = {}
+        lookups: Dict[str, int] = {}
+        pending: List[Topic] = []
+
+        with transaction.atomic(), counters.deferred():
+            for number, (kind, data) in enumerate(records, 1):
+                if kind == 'category':
+                    category, created = self._get_category(data, number)
+                    positions[len(positions) + 1] = category.pk
+                    counts['categories'] += created
+                    continue
+
+                try:
+                    title = data['title']
+                except (KeyError, TypeError):
+                    raise TopicImportError(f"Record {number}: topic has no title")
+                pending.append(Topic(
+                    title=title[:200],
+                    description=data.get('description', ''),
+                    category_id=self._category_id(data, default_category, positions, lookups, number),
+                ))
+                if len(pending) >= self.batch_size:
+                    counts['topics'] += self.save_batch(pending)
+                    pending = []
+            if pending:
+                counts['topics'] += self.save_batch(pending)
+        return counts
+
+    def save_batch(self, topics: List[Topic]) -> int:
+        """Allocate slugs for a batch of unsaved topics and insert them."""
+        for topic, slug in zip(topics, allocate_slugs(Topic, [t.title for t in topics], fallback='topic')):
+            topic.slug = slug
+        created = Topic.objects.bulk_create(topics)
+        if self.send_signals:
+            post_bulk_save.send(sender=Topic, instances=created, created=len(created))
+        return len(created)
+
+    @staticmethod
+    def _get_category(data: Dict, number: int) -> Tuple[Category, bool]:
+        try:
+            name = data['name']
+        except (KeyError, TypeError):
+            raise TopicImportError(f"Record {number}: category has no name")
+        slug = data.get('slug')
+        if slug:
+            return Category.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'description': data.get('description', '')}
+            )
+        category = Category.objects.filter(name=name).first()
+        if category is not None:
+            return category, False
+        return Category.objects.create(name=name, description=data.get('description', '')), True
+
+    @staticmethod
+    def _category_id(data: Dict, default_category: Optional[Category], positions: Dict[int, int],
+                     lookups: Dict[str, int], number: int) -> int:
+        if data.get('category') is not None:
+            reference = str(data['category'])
+            if reference not in lookups:
+                category = (
+                    Category.objects.filter(slug=reference).first()
+                    or Category.objects.filter(name=reference).first()
+                )
+                if category is None:
+                    raise TopicImportError(f"Record {number}: unknown category '{reference}'")
+                lookups[reference] = category.pk
+            return lookups[reference]
+
+        if data.get('category_id') is not None:
+            try:
+                reference = int(data['category_id'])
+            except (TypeError, ValueError):
+                raise TopicImportError(f"Record {number}: invalid category_id {data['category_id']!r}")
+            if positions:
+                if reference not in positions:
+                    raise TopicImportError(f"Record {number}: unknown category_id {reference}")
+                return positions[reference]
+            key = f'#{reference}'
+            if key not in lookups:
+                if not Category.objects.filter(pk=reference).exists():
+                    raise TopicImportError(f"Record {number}: unknown category_id {reference}")
+                lookups[key] = reference
+            return lookups[key]
+
+        if default_category is None:
+            raise TopicImportError(f"Record {number}: topic has no category")
+        return default_category.pk
@@ -1,11 +1,127 @@
+import asyncio
+import logging
+import random
+import re
+import time
 import requests
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, List
+import httpx
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .. import metrics
+from . import cassettes, registry
+from .http_cache import http_response_cache
+
+logger = logging.getLogger(__name__)
+
+POST_FIELDS = "id,title,excerpt,link,date,modified_gmt,content,categories"
+
+# Statuses retried by both clients
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+wordpress_request_duration = metrics.Histogram(
+    'wordpress_request_duration_seconds', 'WordPress API requests including retries, by endpoint and final status',
+    ['endpoint', 'status'],
+)
+wordpress_response_bytes = metrics.Counter(
+    'wordpress_response_bytes_total', 'Bytes of WordPress API responses received', ['endpoint']
+)
+wordpress_errors = metrics.Counter(
+    'wordpress_errors_total', 'Failed WordPress API requests, by exception', ['endpoint', 'error']
+)
+
+def observe_request(path: str, started: float, response=None, error: Exception = None):
+    """Record a WordPress API request that started at time.perf_counter() `started`."""
+    # One series per endpoint, not per post
+    endpoint = re.sub(r'/\d+', '/{id}', path)
+    status = response.status_code if response is not None else 'none'
+    wordpress_request_duration.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
+    if response is not None:
+        wordpress_response_bytes.inc(len(response.content), endpoint=endpoint)
+    if error is not None:
+        wordpress_errors.inc(endpoint=endpoint, error=error.__class__.__name__)
+
+def posts_page_params(per_page: int, page: int, modified_after: datetime = None) -> Dict:
+    params = {
+        "per_page": per_page,
+        "page": page,
+        "status": "publish",
+        "_fields": POST_FIELDS
+    }
+    if modified_after is not None:
+        params["modified_after"] = modified_after.isoformat()
+        params["orderby"] = "modified"
+    return params
+
+def build_session() -> requests.Session:
+    """
+    Build a keep-alive session that retries transient failures.
+    
+    Connection errors, 429s and 5xx responses are retried with
+    exponential backoff, honouring Retry-After. The connection pool is
+    sized for the page-fetching thread pool.
+    """
+    retry = Retry(
+        total=settings.WORDPRESS_MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = cassettes.wrap_adapter(HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.WORDPRESS_MAX_WORKERS,
+        max_retries=retry,
+    ))
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip, deflate',
+    })
+    return session
+
 
 class WordPressService:
-    def __init__(self):
+    def __init__(self, session: requests.Session = None, http_cache=None):
         self.wp_url = settings.WORDPRESS_API_URL
         self.base_api_url = f"{self.wp_url}/wp-json/wp/v2"
+        self.timeout = settings.WORDPRESS_TIMEOUT
+        self.max_workers = settings.WORDPRESS_MAX_WORKERS
+        self.session = session if session is not None else registry.wordpress_session()
+        self.http_cache = http_cache if http_cache is not None else http_response_cache
+
+    def _get(self, path: str, params: Dict = None, conditional: bool = False) -> requests.Response:
+        """
+        GET an API path through the pooled session, raising on HTTP errors.
+        
+        With conditional=True the request carries the validators of the
+        cached copy, and a 304 Not Modified is answered from the cache.
+        """
+        url = f"{self.base_api_url}{path}"
+        headers = None
+        if conditional:
+            cache_key = self.http_cache.make_key(url, params)
+            headers = self.http_cache.validators(cache_key)
+        
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            observe_request(path, started, e.response, e)
+            raise
+        observe_request(path, started, response)
+        if conditional:
+            response = self.http_cache.resolve(cache_key, response)
+        return response
 
     def get_posts(self, per_page: int = 10, page: int = 1) -> List[Dict]:
         """
@@ -19,21 +135,70 @@ class WordPressService:
             List[Dict]: List of posts with their data
         """
         try:
-            response = requests.get(
-                f"{self.base_api_url}/posts",
-                params={
-                    "per_page": per_page,
-                    "page": page,
-                    "status": "publish",
-                    "_fields": "id,title,excerpt,link,date,content,categories"
-                }
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._get_posts_page(per_page, page).json()
         except requests.RequestException as e:
-            print(f"Error fetching WordPress posts: {e}")
+            logger.error("Error fetching WordPress posts: %s", e)
             return []
 
+    def _get_posts_page(self, per_page: int, page: int, modified_after: datetime = None) -> requests.Response:
+        return self._get("/posts", posts_page_params(per_page, page, modified_after))
+
+    def iter_post_pages(self, per_page: int = 100, max_workers: int = None,
+                        modified_after: datetime = None) -> Iterator[List[Dict]]:
+        """
+        Fetch every published post, one page at a time
+        
+        The first page is fetched to learn the page count from the
+        X-WP-TotalPages header; the remaining pages are fetched concurrently
+        by a bounded thread pool sharing this service's session. Pages are
+        yielded in order as soon as they are available.
+        
+        Args:
+            per_page (int): Posts per page (the REST API allows up to 100)
+            max_workers (int): Upper bound on concurrent page requests
+            modified_after (datetime): Only fetch posts modified after this time
+            
+        Yields:
+            List[Dict]: The posts of one page
+            
+        Raises:
+            requests.RequestException: If a page still fails after retries,
+                so that a sync is never silently truncated
+        """
+        first = self._get_posts_page(per_page, 1, modified_after)
+        yield first.json()
+        
+        total_pages = int(first.headers.get('X-WP-TotalPages', 1))
+        if total_pages < 2:
+            return
+        
+        workers = min(max_workers or self.max_workers, total_pages - 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pages = pool.map(
+                lambda page: self._get_posts_page(per_page, page, modified_after).json(),
+                range(2, total_pages + 1)
+            )
+            yield from pages
+
+    def get_all_posts(self, per_page: int = 100, max_workers: int = None) -> List[Dict]:
+        """
+        Fetch every published post across all pages
+        
+        Args:
+            per_page (int): Posts per page (the REST API allows up to 100)
+            max_workers (int): Upper bound on concurrent page requests
+            
+        Returns:
+            List[Dict]: All posts, newest first
+            
+        Raises:
+            requests.RequestException: If a page still fails after retries
+        """
+        posts = []
+        for page in self.iter_post_pages(per_page, max_workers):
+            posts.extend(page)
+        return posts
+
     def get_post_content(self, post_id: int) -> Dict:
         """
         Fetch full content of a specific post
@@ -45,14 +210,14 @@ class WordPressService:
             Dict: Post data including full content
         """
         try:
-            response = requests.get(
-                f"{self.base_api_url}/posts/{post_id}",
-                params={"_fields": "id,title,content,excerpt,link,date,categories"}
+            response = self._get(
+                f"/posts/{post_id}",
+                {"_fields": "id,title,content,excerpt,link,date,categories"},
+                conditional=True
             )
-            response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
-            print(f"Error fetching WordPress post content: {e}")
+            logger.error("Error fetching WordPress post content: %s", e)
             return {}
 
     def get_categories(self) -> List[Dict]:
@@ -63,14 +228,14 @@ class WordPressService:
             List[Dict]: List of categories with their data
         """
         try:
-            response = requests.get(
-                f"{self.base_api_url}/categories",
-                params={"per_page": 100, "_fields": "id,name,description"}
+            response = self._get(
+                "/categories",
+                {"per_page": 100, "_fields": "id,name,description"},
+                conditional=True
             )
-            response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
-            print(f"Error fetching WordPress categories: {e}")
+            logger.error("Error fetching WordPress categories: %s", e)
             return []
 
     def get_posts_by_category(self, category_id: int, per_page: int = 10) -> List[Dict]:
@@ -85,17 +250,177 @@ class WordPressService:
             List[Dict]: List of posts in the category
         """
         try:
-            response = requests.get(
-                f"{self.base_api_url}/posts",
-                params={
-                    "categories": category_id,
-                    "per_page": per_page,
-                    "status": "publish",
-                    "_fields": "id,title,content,excerpt,link,date"
-                }
-            )
-            response.raise_for_status()
+            response = self._get("/posts", {
+                "categories": category_id,
+                "per_page": per_page,
+                "status": "publish",
+                "_fields": "id,title,content,excerpt,link,date"
+            }, conditional=True)
             return response.json()
         except requests.RequestException as e:
-            print(f"Error fetching posts by category: {e}")
-            return [] 
\ No newline at end of file
+            logger.error("Error fetching posts by category: %s", e)
+            return [] 
+
+
+def build_async_client() -> httpx.AsyncClient:
+    limit = settings.WORDPRESS_MAX_CONNECTIONS
+    return httpx.AsyncClient(
+        timeout=settings.WORDPRESS_TIMEOUT,
+        limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+        # Retries connection failures; status retries are done in _get
+        transport=cassettes.wrap_transport(httpx.AsyncHTTPTransport(retries=settings.WORDPRESS_MAX_RETRIES)),
+        headers={
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        },
+    )
+
+
+class AsyncWordPressService:
+    """
+    Async counterpart of WordPressService for async views, built on httpx.
+
+    Services on the same event loop share one client (see registry) whose
+    connection pool is capped at WORDPRESS_MAX_CONNECTIONS; requests
+    beyond that wait for a free connection instead of opening more, and
+    later requests reuse the open connections. A client passed in is
+    closed when the service is used as an async context manager or
+    aclose() is called. Errors are reported as httpx.HTTPError.
+    """
+
+    def __init__(self, client: httpx.AsyncClient = None, http_cache=None):
+        self.wp_url = settings.WORDPRESS_API_URL
+        self.base_api_url = f"{self.wp_url}/wp-json/wp/v2"
+        self.max_retries = settings.WORDPRESS_MAX_RETRIES
+        # The shared client stays open for later requests on this loop
+        self._owns_client = client is not None
+        self.client = client if client is not None else registry.async_wordpress_client()
+        self.http_cache = http_cache if http_cache is not None else http_response_cache
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def _get(self, path: str, params: Dict = None, conditional: bool = False) -> httpx.Response:
+        """
+        GET an API path, retrying 429 and 5xx responses with backoff.
+
+        Like WordPressService._get, conditional=True revalidates a cached
+        copy and answers a 304 from it.
+        """
+        url = f"{self.base_api_url}{path}"
+        headers = None
+        if conditional:
+            cache_key = self.http_cache.make_key(url, params)
+            headers = self.http_cache.validators(cache_key)
+
+        started = time.perf_counter()
+        response = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                response = await self.client.get(url, params=params, headers=headers)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    break
+                await asyncio.sleep(self._retry_delay(response, attempt))
+
+            if response.status_code != 304:
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            observe_request(path, started, response, e)
+            raise
+        observe_request(path, started, response)
+        if conditional:
+            response = self.http_cache.resolve(cache_key, response)
+        return response
+
+    @staticmethod
+    def _retry_delay(response: httpx.Response, attempt: int) -> float:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return float(retry_after)
+        return 0.5 * (2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def get_posts(self, per_page: int = 10, page: int = 1) -> List[Dict]:
+        """See WordPressService.get_posts."""
+        try:
+            response = await self._get("/posts", posts_page_params(per_page, page))
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error("Error fetching WordPress posts: %s", e)
+            return []
+
+    async def iter_post_pages(self, per_page: int = 100, max_workers: int = None,
+                              modified_after: datetime = None) -> AsyncIterator[List[Dict]]:
+        """
+        Fetch every published post, one page at a time
+        
+        After the first page, the remaining pages are requested through a
+        sliding window of at most max_workers (default
+        WORDPRESS_MAX_CONNECTIONS) requests, so pages never queue for a
+        pooled connection long enough to hit the pool timeout; pages are
+        yielded in order.
+        
+        Raises:
+            httpx.HTTPError: If a page still fails after retries
+        """
+        first = await self._get("/posts", posts_page_params(per_page, 1, modified_after))
+        yield first.json()
+
+        total_pages = int(first.headers.get('X-WP-TotalPages', 1))
+        pages = iter(range(2, total_pages + 1))
+        tasks = deque()
+
+        def request_next_page():
+            page = next(pages, None)
+            if page is not None:
+                tasks.append(asyncio.ensure_future(
+                    self._get("/posts", posts_page_params(per_page, page, modified_after))
+                ))
+
+        for _ in range(max_workers or settings.WORDPRESS_MAX_CONNECTIONS):
+            request_next_page()
+        try:
+            while tasks:
+                response = await tasks[0]
+                tasks.popleft()
+                request_next_page()
+                yield response.json()
+        finally:
+            # Stop the remaining requests when a page fails or the caller stops early
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+
+    async def get_post_content(self, post_id: int) -> Dict:
+        """See WordPressService.get_post_content."""
+        try:
+            response = await self._get(
+                f"/posts/{post_id}",
+                {"_fields": "id,title,content,excerpt,link,date,categories"},
+                conditional=True
+            )
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error("Error fetching WordPress post content: %s", e)
+            return {}
+
+    async def get_categories(self) -> List[Dict]:
+        """See WordPressService.get_categories."""
+        try:
+            response = await self._get(
+                "/categories",
+                {"per_page": 100, "_fields": "id,name,description"},
+                conditional=True
+            )
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error("Error fetching WordPress categories: %s", e)
+            return []
@@ -0,0 +1,211 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import metrics, page_cache
+from .models import Article, Category, Topic, WordPressPost
+from .services import content_store, counters, dedup_service, search_service
+
+# Sent after rows are written with bulk_create, which bypasses post_save.
+# Arguments: sender (the model), instances (the written objects) and
+# created (how many of them were new rows).
+post_bulk_save = Signal()
+
+COUNTER_NAMES = {
+    Article: 'articles',
+    WordPressPost: 'wordpress_posts',
+}
+
+_state = threading.local()
+
+
+@contextmanager
+def deferred():
+    """
+    Collect the per-row work of the receivers below and do it once, when the block exits.
+
+    Deleting N rows (directly or through a Category cascade) sends N
+    post_delete signals. Inside this block they only collect the keys of
+    the deleted rows, which are then dropped from the search and duplicate
+    indexes and the body table in a few bulk queries; each affected page
+    cache namespace is bumped once, and counters are deferred as with
+    counters.deferred(). Use it inside the transaction of the delete.
+    Nothing is done if the block raises. Nested blocks join the outermost one.
+    """
+    if getattr(_state, 'deleted', None) is not None:
+        yield
+        return
+    _state.deleted, _state.namespaces = defaultdict(list), set()
+    try:
+        with counters.deferred():
+            yield
+        deleted, namespaces = _state.deleted, _state.namespaces
+    finally:
+        _state.deleted = _state.namespaces = None
+    for remove, keys in deleted.items():
+        remove(keys)
+    if namespaces:
+        page_cache.invalidate(*namespaces)
+
+
+def _removed(remove: Callable, key):
+    # Keys, not instances: Django clears the pk of deleted instances
+    deleted = getattr(_state, 'deleted', None)
+    if deleted is None:
+        remove([key])
+    else:
+        deleted[remove].append(key)
+
+
+def _invalidate(*namespaces: str):
+    pending = getattr(_state, 'namespaces', None)
+    if pending is None:
+        page_cache.invalidate(*namespaces)
+    else:
+        pending.update(namespaces)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Topic)
+@receiver(post_save, sender=WordPressPost)
+def index_searchable(sender, instance, **kwargs):
+    search_service.index_instances([instance])
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Topic)
+@receiver(post_delete, sender=WordPressPost)
+def unindex_searchable(sender, instance, **kwargs):
+    _removed(search_service.remove_documents, search_service.document_key(instance))
+
+
+@receiver(post_bulk_save, sender=Topic)
+@receiver(post_bulk_save, sender=WordPressPost)
+def index_bulk_saved(sender, instances, **kwargs):
+    search_service.index_instances(instances)
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_save, sender=WordPressPost)
+def index_duplicates(sender, instance, created, update_fields=None, **kwargs):
+    # Only titles are indexed: saves that keep the loaded title (e.g.
+    # status changes) leave the signature and its bands alone
+    if update_fields is not None and 'title' not in update_fields:
+        return
+    title = instance.__dict__.get('title')
+    if not created and title is not None and title == getattr(instance, '_indexed_title', None):
+        return
+    dedup_service.index_instances([instance])
+    instance._indexed_title = instance.title
+
+
+@receiver(post_delete, sender=Topic)
+@receiver(post_delete, sender=WordPressPost)
+def unindex_duplicates(sender, instance, **kwargs):
+    _removed(dedup_service.remove_signatures, dedup_service.signature_key(instance))
+
+
+@receiver(post_bulk_save, sender=Topic)
+@receiver(post_bulk_save, sender=WordPressPost)
+def index_bulk_duplicates(sender, instances, **kwargs):
+    dedup_service.index_instances(instances)
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=WordPressPost)
+def delete_body(sender, instance, **kwargs):
+    _removed(content_store.delete_bodies, content_store.body_key(instance))
+
+
+# Cached pages and fragments (see page_cache.cached_view) are keyed by the
+# versions of the namespaces below; bumping one drops the pages built on it
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def invalidate_topic_pages(sender, instance, **kwargs):
+    _invalidate('topics', f'topic:{instance.slug}')
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article_pages(sender, instance, **kwargs):
+    _invalidate('articles', f'article:{instance.slug}')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    _invalidate('categories')
+
+
+@receiver(post_save, sender=WordPressPost)
+@receiver(post_delete, sender=WordPressPost)
+def invalidate_wordpress_pages(sender, instance, **kwargs):
+    _invalidate('wordpress_posts')
+
+
+@receiver(post_bulk_save, sender=Topic)
+def invalidate_bulk_topic_pages(sender, instances, **kwargs):
+    _invalidate('topics')
+
+
+@receiver(post_bulk_save, sender=WordPressPost)
+def invalidate_bulk_wordpress_pages(sender, instances, **kwargs):
+    _invalidate('wordpress_posts')
+
+
+# Row counters for the dashboard. Topic and Article saves run in a
+# transaction, and deletes always do, so counters change with the rows.
+@receiver(pre_save, sender=Topic)
+def remember_topic_count(sender, instance, **kwargs):
+    counters.topic_saving(instance)
+
+
+@receiver(post_save, sender=Topic)
+def count_topic(sender, instance, created, **kwargs):
+    counters.topic_saved(instance, created)
+
+
+@receiver(post_delete, sender=Topic)
+def uncount_topic(sender, instance, **kwargs):
+    counters.topic_deleted(instance)
+
+
+@receiver(post_bulk_save, sender=Topic)
+def count_bulk_topics(sender, instances, **kwargs):
+    # Topics are only bulk-written by imports, so every instance is new
+    counters.topics_created(instances)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=WordPressPost)
+def count_row(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust({COUNTER_NAMES[sender]: 1})
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=WordPressPost)
+def uncount_row(sender, instance, **kwargs):
+    counters.adjust({COUNTER_NAMES[sender]: -1})
+
+
+@receiver(post_bulk_save, sender=WordPressPost)
+def count_bulk_rows(sender, created, **kwargs):
+    counters.adjust({COUNTER_NAMES[sender]: created})
+
+
+@receiver(post_delete, sender=Category)
+def forget_category_count(sender, instance, **kwargs):
+    counters.forget(f'topics.category.{instance.pk}')
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    # First in the list: connection.execute_wrapper() blocks pop the last one
+    if metrics.query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, metrics.query_timer)
@@ -0,0 +1,67 @@
+import pytest
+from django.test.utils import override_settings
+
+pytest.importorskip('pytest_benchmark')
+
+from core.models import Article, GenerationJob, Topic, WordPressPost  # noqa: E402
+from core.services.benchmark import LIST_URLS, Benchmark  # noqa: E402
+
+# Small enough to run with the rest of the suite; use `manage.py benchmark`
+# for the 1k/100k/1M datasets
+SIZE = 50
+REQUESTS = 5
+
+
+@pytest.fixture
+def bench(tmp_path, transactional_db):
+    """A Benchmark on an empty database, with fake upstreams that barely wait."""
+    with override_settings(AI_LOCK_DIR=str(tmp_path)):
+        yield Benchmark(SIZE, requests=REQUESTS, ai_latency=0.001, wp_latency=0)
+
+
+@pytest.fixture
+def seeded(bench):
+    """The same Benchmark after its dataset has been built."""
+    bench.seed()
+    bench.sync()
+    return bench
+
+
+# Every scenario writes to the database, so each one runs a single round
+# and the test checks what that round wrote
+
+def test_seed(benchmark, bench):
+    results = benchmark.pedantic(bench.seed, rounds=1)
+    assert results[0]['ops'] == SIZE
+    assert Topic.objects.count() == SIZE
+
+
+def test_sync(benchmark, bench):
+    bench.seed()
+    results = benchmark.pedantic(bench.sync, rounds=1)
+    assert results[0]['ops'] == SIZE
+    assert WordPressPost.objects.count() == SIZE
+
+
+def test_topic_save(benchmark, seeded):
+    results = benchmark.pedantic(seeded.topic_save, rounds=1)
+    assert results[0]['samples'] == REQUESTS
+    # Ten distinct ideas per request
+    assert Topic.objects.count() == SIZE + 10 * REQUESTS
+
+
+def test_article_generation(benchmark, seeded):
+    results = benchmark.pedantic(seeded.article_generation, rounds=1)
+    assert results[0]['samples'] == REQUESTS
+    assert Article.objects.count() == REQUESTS
+    assert GenerationJob.objects.filter(status='succeeded').count() == REQUESTS
+    # Fresh drafts: every article was generated, none served from the cache
+    assert seeded.gemini.calls == REQUESTS
+
+
+def test_list_views(benchmark, seeded):
+    results = benchmark.pedantic(seeded.list_views, rounds=1)
+    # One result per page, uncached and cached; a page that does not
+    # answer 200 makes list_views raise
+    assert len(results) == 2 * len(LIST_URLS)
+    assert all(result['samples'] == REQUESTS for result in results)
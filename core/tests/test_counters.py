@@ -0,0 +1,75 @@
+import pytest
+
+from core.models import Category, Counter, Topic
+from core.services import counters
+
+
+@pytest.fixture
+def categories(db):
+    return [Category.objects.create(name=name, slug=name.lower()) for name in ('Baking', 'Coffee')]
+
+
+def topic(category, number, status='draft'):
+    return Topic.objects.create(
+        title=f'Topic {number}', slug=f'topic-{number}', description='', category=category, status=status,
+    )
+
+
+def test_saves_and_deletes_keep_the_counters_exact(categories):
+    baking, coffee = categories
+    topics = [topic(baking, number) for number in range(3)]
+    topic(coffee, 3, status='published')
+
+    topics[0].status = 'published'
+    topics[0].save()
+    topics[1].category = coffee
+    topics[1].save()
+    topics[2].delete()
+
+    values = counters.snapshot()
+    assert values['topics'] == 3
+    assert values['topics.status.draft'] == 1
+    assert values['topics.status.published'] == 2
+    assert values[f'topics.category.{baking.pk}'] == 1
+    assert values[f'topics.category.{coffee.pk}'] == 2
+    assert counters.reconcile() == {}
+
+
+def test_a_status_save_of_a_partly_loaded_topic_is_counted(categories):
+    topic(categories[0], 1)
+    loaded = Topic.objects.only('id', 'status').get()
+    loaded.status = 'published'
+    loaded.save(update_fields=['status'])
+    assert counters.reconcile() == {}
+
+
+def test_deferred_writes_the_summed_deltas_once(categories):
+    before = counters.snapshot()
+    with counters.deferred():
+        for number in range(20):
+            counters.adjust(counters.topic_deltas('draft', categories[0].pk))
+        counters.adjust(counters.topic_deltas('draft', categories[0].pk, sign=-1))
+        # Nothing is written until the block exits
+        assert counters.snapshot() == before
+    assert counters.snapshot() == dict(before, **{
+        'topics': 19, 'topics.status.draft': 19, f'topics.category.{categories[0].pk}': 19,
+    })
+
+
+def test_deferred_writes_nothing_when_the_block_raises(categories):
+    before = counters.snapshot()
+    with pytest.raises(RuntimeError):
+        with counters.deferred():
+            counters.adjust({'topics': 5})
+            raise RuntimeError
+    assert counters.snapshot() == before
+
+
+def test_reconcile_repairs_drifted_counters(categories):
+    topic(categories[0], 1)
+    Counter.objects.filter(name='topics').update(value=40)
+    Counter.objects.create(name='topics.category.999', value=3)
+
+    assert counters.reconcile() == {'topics': (40, 1), 'topics.category.999': (3, 0)}
+    assert counters.reconcile() == {}
+    assert counters.dashboard_stats()['topics_count'] == 1
@@ -0,0 +1,78 @@
+import pytest
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from core import page_cache
+
+
+def test_fresh_versions_strictly_increase():
+    versions = [page_cache._fresh_version() for _ in range(1000)]
+    assert all(earlier < later for earlier, later in zip(versions, versions[1:]))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidate_bumps_on_commit():
+    before = page_cache.versions(['topics'])
+    with transaction.atomic():
+        page_cache.invalidate('topics')
+        # Not yet: a concurrent request would cache the old rows under the new version
+        assert page_cache.versions(['topics']) == before
+    assert page_cache.versions(['topics']) != before
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidate_does_nothing_on_rollback():
+    before = page_cache.versions(['topics'])
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            page_cache.invalidate('topics')
+            raise RuntimeError
+    assert page_cache.versions(['topics']) == before
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidate_only_bumps_its_namespaces():
+    before = page_cache.versions(['topics', 'articles'])
+    page_cache.invalidate('topic:baking')
+    assert page_cache.versions(['topics', 'articles']) == before
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cached_view_serves_pages_until_invalidated():
+    calls = []
+
+    @page_cache.cached_view('topics', 'topic:{slug}')
+    def view(request, slug):
+        calls.append(slug)
+        return HttpResponse(f'{slug} {len(calls)}')
+
+    factory = RequestFactory()
+    first = view(factory.get('/topics/baking/'), slug='baking')
+    second = view(factory.get('/topics/baking/'), slug='baking')
+    assert second.content == first.content == b'baking 1'
+
+    # Other paths and query strings are cached separately
+    view(factory.get('/topics/baking/?page=2'), slug='baking')
+    assert len(calls) == 2
+
+    page_cache.invalidate('topic:baking')
+    assert view(factory.get('/topics/baking/'), slug='baking').content == b'baking 3'
+    # Writes are never cached
+    view(factory.post('/topics/baking/'), slug='baking')
+    assert len(calls) == 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cached_view_does_not_store_errors():
+    calls = []
+
+    @page_cache.cached_view('topics')
+    def view(request):
+        calls.append(1)
+        return HttpResponse(status=500)
+
+    request = RequestFactory().get('/topics/')
+    view(request)
+    view(request)
+    assert len(calls) == 2
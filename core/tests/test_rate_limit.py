@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from core.services.rate_limit import MemoryBucketStore, RateLimiter, SQLiteBucketStore, retry_after
+
+
+def limiter(store=None, max_concurrency=8):
+    return RateLimiter(6000, 10 ** 9, max_concurrency, store or MemoryBucketStore())
+
+
+def test_successes_raise_the_limit_additively():
+    rate_limiter = limiter()
+    assert rate_limiter.limit == 2.0
+    with rate_limiter.slot(100) as slot:
+        slot.done(50)
+    assert rate_limiter.limit == 2.5
+    for _ in range(100):
+        with rate_limiter.slot(100) as slot:
+            slot.done()
+    assert rate_limiter.limit == 8.0
+
+
+def test_failures_leave_the_limit_alone():
+    rate_limiter = limiter()
+    with rate_limiter.slot(100) as slot:
+        slot.failed()
+    assert rate_limiter.limit == 2.0
+
+
+def test_throttling_halves_the_limit_once_per_round():
+    rate_limiter = limiter()
+    for _ in range(20):
+        with rate_limiter.slot(100) as slot:
+            slot.done()
+    before = rate_limiter.limit
+
+    # Both calls were sent before the first 429 came back
+    with rate_limiter.slot(100) as first, rate_limiter.slot(100) as second:
+        second.throttled()
+        first.throttled()
+    assert rate_limiter.limit == before / 2
+    assert rate_limiter.stats()['throttled'] == 2
+
+    with rate_limiter.slot(100) as slot:
+        slot.throttled()
+    assert rate_limiter.limit == max(1.0, before / 4)
+
+
+def test_retry_after_blocks_every_caller():
+    rate_limiter = limiter()
+    with rate_limiter.slot(100) as slot:
+        slot.throttled(retry_after=30)
+    assert rate_limiter.store.blocked_until() > time.time() + 25
+
+
+def test_unused_tokens_are_given_back():
+    store = MemoryBucketStore()
+    rate_limiter = RateLimiter(6000, 1000, 8, store)
+    with rate_limiter.slot(900) as slot:
+        slot.done(100)
+    # 800 of the 900 reserved tokens are back, so this does not wait a minute
+    assert rate_limiter._reserve(800) == 0
+
+
+class RecordingStore(SQLiteBucketStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def take(self, *args):
+        self.threads.add(threading.get_ident())
+        return super().take(*args)
+
+    def block(self, until):
+        self.threads.add(threading.get_ident())
+        super().block(until)
+
+    def blocked_until(self):
+        self.threads.add(threading.get_ident())
+        return super().blocked_until()
+
+
+def test_async_slots_use_a_shared_store_off_the_loop(tmp_path):
+    store = RecordingStore(str(tmp_path / 'rate-limit.sqlite3'))
+    rate_limiter = limiter(store)
+
+    async def call(throttle):
+        async with rate_limiter.aslot(100) as slot:
+            if throttle:
+                slot.throttled(retry_after=0.01)
+            else:
+                slot.done()
+
+    async def main():
+        await asyncio.gather(*(call(number == 0) for number in range(4)))
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert store.threads and loop_thread not in store.threads
+    assert rate_limiter.in_flight == 0
+
+
+def test_retry_after_reads_headers_and_messages():
+    response = SimpleNamespace(headers={'Retry-After': '12'})
+    assert retry_after(SimpleNamespace(response=response)) == 12.0
+    assert retry_after(Exception('429 Quota exceeded, please retry in 3.5s')) == 3.5
+    assert retry_after(Exception('500 Internal error')) is None
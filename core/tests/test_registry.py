@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from core.services import registry
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+class Client:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def build():
+    client = Client()
+    registry._close_with_loop(client.aclose)
+    return client
+
+
+def test_clients_are_shared_within_a_loop_and_closed_with_it():
+    async def main():
+        return registry._get_for_loop('client', build), registry._get_for_loop('client', build)
+
+    first, second = asyncio.run(main())
+    assert first is second
+    assert first.closed
+
+
+def test_each_loop_gets_its_own_client():
+    async def main():
+        client = registry._get_for_loop('client', build)
+        assert not client.closed
+        return client
+
+    first = asyncio.run(main())
+    second = asyncio.run(main())
+    assert first is not second
+    assert first.closed and second.closed
+
+
+def test_errors_while_closing_do_not_stop_the_others():
+    closed = []
+
+    def fail():
+        raise RuntimeError('already closed')
+
+    async def main():
+        registry._close_with_loop(fail)
+        registry._close_with_loop(lambda: closed.append(True))
+
+    asyncio.run(main())
+    assert closed == [True]
+
+
+def test_wordpress_client_is_closed_at_loop_shutdown():
+    async def main():
+        client = registry.async_wordpress_client()
+        assert registry.async_wordpress_client() is client
+        return client
+
+    assert asyncio.run(main()).is_closed
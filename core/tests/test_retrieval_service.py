@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from django.utils.text import slugify
+
+from core.models import WordPressPost
+from core.services.retrieval_service import PostIndex
+
+POSTS = {
+    1: ('Sourdough starter basics', 'Feeding a sourdough starter with flour and water every day.'),
+    2: ('Baking sourdough bread', 'Shaping and baking a sourdough loaf in a dutch oven.'),
+    3: ('Cold brew coffee', 'Steeping coarse coffee grounds overnight in cold water.'),
+    4: ('Espresso at home', 'Dialing in an espresso grinder and coffee machine.'),
+    5: ('Growing tomatoes', 'Staking and watering tomato plants through the summer.'),
+}
+
+
+def post(wp_id, title, text, version=0):
+    return SimpleNamespace(
+        wp_id=wp_id, title=title, excerpt=text, content=f'<p>{text}</p>', slug=slugify(title),
+        published_date=datetime(2024, 1, wp_id, tzinfo=timezone.utc), updated_at=version,
+    )
+
+
+def build(posts):
+    index = PostIndex()
+    index.add(post(wp_id, *fields) for wp_id, fields in posts.items())
+    return index
+
+
+def selected(index, query):
+    return [context.wp_id for context in index.select(query, token_budget=10_000, max_posts=5)]
+
+
+@pytest.fixture
+def changed():
+    """An index that was built, then had posts changed, added and removed."""
+    index = build(POSTS)
+    index._build()
+    index.add([post(3, 'Sourdough pizza', 'Stretching sourdough pizza dough on a hot stone.', version=1)])
+    index.add([post(6, 'Pour over coffee', 'Brewing coffee with a paper filter and a kettle.')])
+    index.remove([5])
+    return index
+
+
+def test_select_ranks_matching_posts(changed):
+    assert set(selected(changed, 'sourdough')) == {1, 2, 3}
+    assert set(selected(changed, 'coffee')) == {4, 6}
+
+
+def test_unmatched_queries_fall_back_to_recency(changed):
+    # Only the removed post mentioned tomatoes
+    assert selected(changed, 'tomatoes') == [6, 4, 3, 2, 1]
+
+
+def test_changes_are_scored_without_a_rebuild(changed):
+    # The changed post is masked in the postings arrays and scored from the side table
+    assert set(changed._pending) == {3, 6}
+    assert changed._stale == 2
+    assert not changed._needs_build()
+
+
+def test_incremental_index_matches_a_fresh_one(changed):
+    fresh = build({
+        **{wp_id: fields for wp_id, fields in POSTS.items() if wp_id != 5},
+        3: ('Sourdough pizza', 'Stretching sourdough pizza dough on a hot stone.'),
+        6: ('Pour over coffee', 'Brewing coffee with a paper filter and a kettle.'),
+    })
+    for query in ('sourdough', 'coffee water', 'baking bread', ''):
+        assert selected(changed, query) == selected(fresh, query)
+    changed._build()
+    for query in ('sourdough', 'coffee water', 'baking bread', ''):
+        assert selected(changed, query) == selected(fresh, query)
+
+
+def test_build_drops_terms_of_removed_posts(changed):
+    assert 'tomato' in changed._vocab
+    changed._build()
+    assert 'tomato' not in changed._vocab
+    assert len(changed._doc_freq) == len(changed._vocab)
+    assert (changed._doc_freq > 0).all()
+    assert not changed._pending and changed._stale == 0
+
+
+def test_select_skips_posts_over_the_budget():
+    index = build(POSTS)
+    budget = index._posts[1].tokens
+    picked = index.select('sourdough', token_budget=budget, max_posts=5)
+    assert sum(context.tokens for context in picked) <= budget
+    assert len(picked) == 1
+
+
+@pytest.mark.django_db
+def test_refresh_reads_only_changed_posts(monkeypatch):
+    rows = [
+        WordPressPost.objects.create(
+            wp_id=wp_id, title=title, excerpt=text, content=f'<p>{text}</p>',
+            wp_url=f'https://wordpress.example/?p={wp_id}',
+            published_date=datetime(2024, 1, wp_id, tzinfo=timezone.utc),
+        )
+        for wp_id, (title, text) in POSTS.items()
+    ]
+    index = PostIndex()
+    index.refresh()
+    assert set(index._docs) == set(POSTS)
+
+    added = []
+    add = index.add
+
+    def record(posts):
+        posts = list(posts)
+        added.extend(posts)
+        add(posts)
+
+    monkeypatch.setattr(index, 'add', record)
+    rows[2].title = 'Sourdough pizza'
+    rows[2].save()
+    WordPressPost.objects.filter(wp_id=5).delete()
+    index.refresh()
+
+    assert [post.wp_id for post in added] == [3]
+    assert set(index._docs) == {1, 2, 3, 4}
+    assert set(selected(index, 'pizza')) == {3}
@@ -0,0 +1,99 @@
+import pytest
+from django.db import transaction
+
+from core import page_cache, signals
+from core.models import Article, Category, ContentBody, SimilaritySignature, Topic
+from core.services import counters, search_service
+
+
+@pytest.fixture
+def category():
+    category = Category.objects.create(name='Baking', slug='baking')
+    for number in range(3):
+        topic = Topic.objects.create(
+            title=f'Sourdough loaf {number}', slug=f'sourdough-loaf-{number}',
+            description='Shaping and baking', category=category,
+        )
+        Article.objects.create(topic=topic, title=f'Baking loaf {number}', content='<p>Flour and water</p>')
+    return category
+
+
+def matches(query):
+    return search_service.get_search_backend().search(query)[1]
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    calls = []
+    invalidate = page_cache.invalidate
+
+    def record(*namespaces):
+        calls.append(set(namespaces))
+        invalidate(*namespaces)
+
+    monkeypatch.setattr(page_cache, 'invalidate', record)
+    return calls
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deferred_delete_cleans_up_in_bulk(category, invalidated, monkeypatch):
+    removals = []
+    remove_documents = search_service.remove_documents
+
+    def record(keys):
+        removals.append(list(keys))
+        remove_documents(keys)
+
+    monkeypatch.setattr(search_service, 'remove_documents', record)
+    assert matches('sourdough') == 3
+
+    with transaction.atomic(), signals.deferred():
+        category.delete()
+
+    # One call for the 3 topics and 3 articles of the cascade, not six
+    assert len(removals) == 1 and len(removals[0]) == 6
+    assert not matches('sourdough')
+    assert not SimilaritySignature.objects.exists()
+    assert not ContentBody.objects.exists()
+    # One bump for every namespace the cascade touched
+    assert len(invalidated) == 1
+    assert {'topics', 'articles', 'categories', 'topic:sourdough-loaf-0'} <= invalidated[0]
+    assert counters.reconcile() == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deferred_does_nothing_when_the_block_raises(category, invalidated):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic(), signals.deferred():
+            category.delete()
+            raise RuntimeError
+
+    assert Topic.objects.count() == 3
+    assert matches('sourdough') == 3
+    assert ContentBody.objects.count() == 3
+    assert invalidated == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delete_outside_deferred_cleans_up_per_row(category, invalidated):
+    Topic.objects.get(slug='sourdough-loaf-0').delete()
+
+    assert Topic.objects.count() == 2
+    assert ContentBody.objects.count() == 2
+    assert len(invalidated) > 1
+    assert counters.reconcile() == {}
+
+
+@pytest.mark.django_db
+def test_status_changes_keep_the_duplicate_index(category, monkeypatch):
+    topic = Topic.objects.get(slug='sourdough-loaf-0')
+    indexed = []
+    monkeypatch.setattr('core.services.dedup_service.index_instances', indexed.extend)
+
+    topic.status = 'published'
+    topic.save()
+    assert indexed == []
+
+    topic.title = 'Rye loaf'
+    topic.save()
+    assert indexed == [topic]
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.services.single_flight import LOCK_FILES, AsyncSingleFlight, SingleFlight, process_lock
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    runs = []
+
+    def fn():
+        runs.append(1)
+        time.sleep(0.1)
+        return 'answer'
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: flight.do('key', fn), range(8)))
+
+    assert results == ['answer'] * 8
+    assert len(runs) == 1 and flight.shared == 7
+    # The key is forgotten once the run finished
+    assert flight.do('key', lambda: 'again') == 'again'
+
+
+def test_followers_get_the_error_of_the_run():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fn():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError('upstream failed')
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, 'key', fn)
+        started.wait()
+        follower = pool.submit(flight.do, 'key', fn)
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+
+def test_cancelled_caller_does_not_cancel_the_run():
+    flight = AsyncSingleFlight()
+    runs = []
+
+    async def fn():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return 'answer'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do('key', fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do('key', fn))
+        await asyncio.sleep(0)
+        # The client of the first caller went away
+        leader.cancel()
+        result = await follower
+        return leader.cancelled(), result
+
+    assert asyncio.run(main()) == (True, 'answer')
+    assert len(runs) == 1 and flight.shared == 1
+    assert not flight._calls
+
+
+def test_lock_files_are_a_fixed_pool(tmp_path):
+    for number in range(3 * LOCK_FILES):
+        with process_lock(f'gemini:{number}', tmp_path):
+            pass
+    assert len(list(tmp_path.iterdir())) <= LOCK_FILES
+
+
+def test_lock_excludes_other_holders(tmp_path):
+    order = []
+
+    def hold(name):
+        with process_lock('key', tmp_path):
+            order.append(f'{name} in')
+            time.sleep(0.05)
+            order.append(f'{name} out')
+
+    threads = [threading.Thread(target=hold, args=(name,)) for name in 'ab']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert order[0][0] == order[1][0] and order[2][0] == order[3][0]
@@ -0,0 +1,40 @@
+import pytest
+
+from core.models import Category, Topic
+from core.services.slugs import allocate_slugs
+
+
+@pytest.fixture
+def category(db):
+    return Category.objects.create(name='Baking', slug='baking')
+
+
+def test_new_slugs_are_plain(category):
+    assert allocate_slugs(Topic, ['Sourdough Starter', 'Rye bread']) == ['sourdough-starter', 'rye-bread']
+
+
+def test_collisions_get_the_next_free_suffix(category):
+    for slug in ('sourdough', 'sourdough-2', 'sourdough-7', 'sourdough-starter'):
+        Topic.objects.create(title=slug, slug=slug, description='', category=category)
+
+    slugs = allocate_slugs(Topic, ['Sourdough', 'sourdough', 'Rye', 'Rye', 'Sourdough Starter'])
+    assert slugs == ['sourdough-8', 'sourdough-9', 'rye', 'rye-2', 'sourdough-starter-2']
+
+
+def test_empty_and_long_values(category):
+    long_title = 'word ' * 100
+    Topic.objects.create(title='x', slug=allocate_slugs(Topic, [long_title])[0], description='', category=category)
+
+    slugs = allocate_slugs(Topic, ['!!!', '', long_title], fallback='topic')
+    assert slugs[:2] == ['topic', 'topic-2']
+    assert slugs[2].endswith('-2') and len(slugs[2]) <= Topic._meta.get_field('slug').max_length
+
+
+def test_collisions_take_few_queries(category, django_assert_max_num_queries):
+    Topic.objects.bulk_create([
+        Topic(title=f'Title {number}', slug=f'title-{number}', description='', category=category)
+        for number in range(300)
+    ])
+    with django_assert_max_num_queries(3):
+        slugs = allocate_slugs(Topic, [f'Title {number}' for number in range(300)])
+    assert len(set(slugs)) == 300 and 'title-0-2' in slugs
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from core.models import SyncCursor, WordPressPost
+from core.services.fakes import FakeWordPress
+from core.services.sync_service import WordPressSyncService
+from core.services.wordpress_service import WordPressService
+
+
+@pytest.fixture
+def site():
+    return FakeWordPress(total_posts=25, latency=0, post_bytes=200)
+
+
+def sync(site, full=False):
+    return WordPressSyncService(WordPressService(session=site.session()), batch_size=10).sync(full)
+
+
+@pytest.mark.django_db
+def test_first_sync_creates_every_post_and_sets_the_watermark(site):
+    assert sync(site) == {'fetched': 25, 'created': 25, 'updated': 0, 'unchanged': 0}
+    assert WordPressPost.objects.count() == 25
+    assert WordPressPost.objects.get(wp_id=7).content == site.post(7)['content']['rendered']
+    cursor = SyncCursor.objects.get(name=WordPressSyncService.cursor_name)
+    assert cursor.modified_gmt == site.epoch.replace(minute=25)
+
+
+@pytest.mark.django_db
+def test_delta_sync_asks_only_for_changed_posts(site):
+    sync(site)
+    requests = site.requests
+    assert sync(site) == {'fetched': 0, 'created': 0, 'updated': 0, 'unchanged': 0}
+    # One page: FakeWordPress reports nothing modified after the watermark
+    assert site.requests == requests + 1
+
+
+@pytest.mark.django_db
+def test_full_sync_only_writes_changed_posts(site, monkeypatch):
+    sync(site)
+    post = site.post
+
+    def edited(wp_id):
+        data = post(wp_id)
+        if wp_id == 3:
+            data['title'] = {'rendered': 'Edited title'}
+        return data
+
+    monkeypatch.setattr(site, 'post', edited)
+    assert sync(site, full=True) == {'fetched': 25, 'created': 0, 'updated': 1, 'unchanged': 24}
+    assert WordPressPost.objects.get(wp_id=3).title == 'Edited title'
+
+
+@pytest.mark.django_db
+def test_watermark_never_moves_back(site):
+    later = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    SyncCursor.objects.create(name=WordPressSyncService.cursor_name, modified_gmt=later)
+    service = WordPressSyncService(WordPressService(session=site.session()))
+    service.advance_cursor(site.epoch)
+    assert SyncCursor.objects.get().modified_gmt == later
+    service.advance_cursor(site.epoch, full=True)
+    assert SyncCursor.objects.get().modified_gmt == site.epoch
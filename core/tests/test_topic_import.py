@@ -0,0 +1,63 @@
+import io
+import json
+
+import pytest
+
+from core.models import Category, Topic
+from core.services import topic_import
+from core.services.topic_import import TopicImportError, TopicImportService, iter_records
+
+DOCUMENT = {
+    'version': 2.5,
+    'categories': [{'name': 'Baking', 'slug': 'baking', 'description': 'Bread, "cakes" and pies'}],
+    'topics': [
+        {'title': f'Sourdough loaf {number}', 'description': 'Flour, water and salt ' * number, 'category': 'baking'}
+        for number in range(1, 20)
+    ],
+    'ratio': 12345.678,
+}
+
+
+@pytest.fixture(params=[1, 3, 7, 1 << 16])
+def chunk_size(request, monkeypatch):
+    """Read the input in chunks that end inside strings, numbers and keys."""
+    monkeypatch.setattr(topic_import._JSONReader, 'chunk_size', request.param)
+    return request.param
+
+
+def test_records_do_not_depend_on_chunk_boundaries(chunk_size):
+    for text in (json.dumps(DOCUMENT), json.dumps(DOCUMENT, indent=2)):
+        records = list(iter_records(io.StringIO(text)))
+        assert records == (
+            [('category', category) for category in DOCUMENT['categories']]
+            + [('topic', topic) for topic in DOCUMENT['topics']]
+        )
+
+
+def test_a_top_level_array_holds_topics(chunk_size):
+    text = json.dumps(DOCUMENT['topics'])
+    assert list(iter_records(io.StringIO(text))) == [('topic', topic) for topic in DOCUMENT['topics']]
+    assert list(iter_records(io.StringIO('[ ]'))) == []
+
+
+@pytest.mark.parametrize('text', ['{"topics": [{"title": "a"}', '{"topics": [1 2]}', '[{"title": }]'])
+def test_malformed_json_is_reported(chunk_size, text):
+    with pytest.raises(TopicImportError):
+        list(iter_records(io.StringIO(text)))
+
+
+def test_json_lines():
+    text = '{"name": "Baking", "slug": "baking"}\n\n{"title": "Rye", "category": "baking"}\n'
+    assert [kind for kind, _ in iter_records(io.StringIO(text), jsonl=True)] == ['category', 'topic']
+    with pytest.raises(TopicImportError, match='Line 2'):
+        list(iter_records(io.StringIO('{}\n[1]\n'), jsonl=True))
+
+
+@pytest.mark.django_db
+def test_import_gives_colliding_titles_unique_slugs():
+    category = Category.objects.create(name='Baking', slug='baking')
+    Topic.objects.create(title='Sourdough', slug='sourdough', description='', category=category)
+
+    topics = [{'title': 'Sourdough', 'description': 'Starter'}, {'title': 'Sourdough!', 'description': 'Loaf'}]
+    assert TopicImportService().import_topics(topics, category) == 2
+    assert sorted(Topic.objects.values_list('slug', flat=True)) == ['sourdough', 'sourdough-2', 'sourdough-3']
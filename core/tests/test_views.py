@@ -0,0 +1,55 @@
+import json
+
+import pytest
+from django.contrib.messages import get_messages
+
+from core.models import Category, Topic
+
+IDEAS = json.dumps([{'title': 'Sourdough starter', 'description': 'Flour and water'}])
+
+
+@pytest.fixture
+def category(db):
+    return Category.objects.create(name='Baking', slug='baking')
+
+
+def errors(response):
+    return [message.message for message in get_messages(response.wsgi_request) if message.level_tag == 'error']
+
+
+@pytest.mark.parametrize('data', [
+    {'count': 'abc', 'category_id': '1'},
+    {'count': '3', 'category_id': 'x'},
+    {'count': '3'},
+])
+def test_topic_generate_rejects_malformed_input(client, category, data):
+    response = client.post('/topics/generate/', data)
+    assert response.status_code == 302 and response.url == '/topics/generate/'
+    assert errors(response) == ['Invalid topic count or category selection.']
+
+
+@pytest.mark.parametrize('data', [{'count': 'abc'}, {'category_id': 'x'}])
+def test_generate_topics_from_wp_rejects_malformed_input(client, category, data):
+    response = client.post('/topics/generate-from-wp/', data)
+    assert response.status_code == 302 and response.url == '/topics/generate-from-wp/'
+    assert errors(response) == ['Invalid topic count or category selection.']
+
+
+@pytest.mark.parametrize('data', [
+    {'topics_data': 'not json', 'selected_topics': '0', 'category_id': '1'},
+    {'topics_data': IDEAS, 'selected_topics': '5', 'category_id': '1'},
+    {'topics_data': IDEAS, 'selected_topics': '0', 'category_id': 'x'},
+])
+def test_topic_save_rejects_malformed_input(client, category, data):
+    response = client.post('/topics/save/', data)
+    assert response.status_code == 302 and response.url == '/topics/generate/'
+    assert errors(response)[0].startswith('Error saving topics')
+    assert not Topic.objects.exists()
+
+
+def test_topic_save_saves_the_selected_ideas(client, category):
+    response = client.post('/topics/save/', {
+        'topics_data': IDEAS, 'selected_topics': '0', 'category_id': category.pk,
+    })
+    assert response.status_code == 302 and response.url == '/topics/'
+    assert list(Topic.objects.values_list('title', 'category')) == [('Sourdough starter', category.pk)]
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+import pytest
+
+from core.services.fakes import FakeWordPress
+from core.services.wordpress_service import AsyncWordPressService, WordPressService
+
+
+class Site(FakeWordPress):
+    """A FakeWordPress that counts the requests it is answering at once."""
+
+    def __init__(self, total_posts, fail_page=None):
+        super().__init__(total_posts, latency=0.005, post_bytes=100)
+        self.fail_page = fail_page
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    def async_client(self):
+        async def handler(request):
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(self.latency)
+                if request.url.params.get('page') == str(self.fail_page):
+                    return httpx.Response(404)
+                status, headers, body = self.respond(str(request.url))
+                return httpx.Response(status, headers=headers, content=body)
+            finally:
+                self.in_flight -= 1
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def fetch(site, max_workers, stop_after=None):
+    async def main():
+        pages = []
+        async with AsyncWordPressService(client=site.async_client()) as service:
+            async for page in service.iter_post_pages(per_page=2, max_workers=max_workers):
+                pages.append([post['id'] for post in page])
+                if len(pages) == stop_after:
+                    break
+        return pages
+    return asyncio.run(main())
+
+
+def test_async_pages_are_fetched_through_a_bounded_window():
+    site = Site(total_posts=60)
+    pages = fetch(site, max_workers=4)
+
+    assert pages == [[page * 2 + 1, page * 2 + 2] for page in range(30)]
+    assert site.most_in_flight == 4
+
+
+def test_async_pages_stop_when_the_caller_does():
+    site = Site(total_posts=60)
+    assert len(fetch(site, max_workers=4, stop_after=3)) == 3
+    # The first page, the 3 consumed and at most a window's worth more
+    assert site.requests <= 1 + 3 + 4
+
+
+def test_async_pages_raise_instead_of_truncating():
+    site = Site(total_posts=60, fail_page=7)
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(site, max_workers=4)
+
+
+def test_sync_pages_are_fetched_in_order():
+    site = FakeWordPress(total_posts=25, latency=0)
+    service = WordPressService(session=site.session())
+    pages = list(service.iter_post_pages(per_page=10, max_workers=2))
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [post['id'] for page in pages for post in page] == list(range(1, 26))
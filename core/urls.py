@@ -10,6 +10,7 @@ urlpatterns = [
     path('topics/', views.topic_list, name='topic_list'),
     path('topics/create/', views.topic_create, name='topic_create'),
     path('topics/generate/', views.topic_generate, name='topic_generate'),
+    path('topics/generate/batch/', views.topic_generate_batch, name='topic_generate_batch'),
     path('topics/generate-from-wp/', views.generate_topics_from_wp, name='generate_topics_from_wp'),
     path('topics/save/', views.topic_save, name='topic_save'),
     path('topics/<slug:slug>/', views.topic_detail, name='topic_detail'),
@@ -17,11 +18,20 @@ urlpatterns = [
     # Articles URLs
     path('articles/', views.article_list, name='article_list'),
     path('articles/generate/<int:topic_id>/', views.article_generate, name='article_generate'),
+    path('articles/generate/<int:topic_id>/stream/', views.article_generate_stream, name='article_generate_stream'),
+    path('articles/jobs/<int:job_id>/', views.article_job_status, name='article_job_status'),
     path('articles/<slug:slug>/', views.article_detail, name='article_detail'),
     
+    # Search
+    path('search/', views.search, name='search'),
+    path('api/search/', views.search_api, name='search_api'),
+    
     # Database management
     path('db/reset/', views.reset_database, name='reset_database'),
     path('db/seed/', views.seed_database, name='seed_database'),
     path('wordpress/posts/', views.WordPressPostListView.as_view(), name='wordpress_posts'),
     path('wordpress/sync/', views.sync_wordpress_posts, name='sync_wordpress_posts'),
+
+    # Monitoring
+    path('metrics', views.metrics_view, name='metrics'),
 ] 
\ No newline at end of file
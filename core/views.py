@@ -1,29 +1,104 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.db import transaction
 import json
+import logging
+import httpx
+from asgiref.sync import sync_to_async
 from pathlib import Path
+from typing import Dict, List
 from django.core.serializers.json import DjangoJSONEncoder
 from django.views.generic import ListView
 from django.template.loader import render_to_string
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
+from django.utils.html import escape
 
-from .models import Category, Topic, Article, WordPressPost, ArticleParameters
-from .services.ai_service import AIService
-from .services.wordpress_service import WordPressService
+from . import metrics, signals
+from .models import Category, Topic, Article, WordPressPost, ArticleParameters, GenerationJob
+from .services.ai_service import AIService, AsyncAIService
+from .services.wordpress_service import AsyncWordPressService
+from .services.sync_service import AsyncWordPressSyncService
+from .services.topic_import import TopicImportError, TopicImportService
+from .services import counters, dedup_service, retrieval_service, search_service, topic_batch
+from .services.generation_queue import enqueue_article_generation
+from .services.ai_output import AIResponseError
+from .services.rate_limit import RateLimitExceeded
 from .forms import TopicForm, ArticleGenerationForm
+from .page_cache import cached_view, versions
+from .pagination import page_links, paginate_keyset
 
+logger = logging.getLogger(__name__)
+
+@cached_view('topics', 'articles', 'categories', 'wordpress_posts')
 def home(request):
-    topics_count = Topic.objects.count()
-    articles_count = Article.objects.count()
-    return render(request, 'core/home.html', {
-        'topics_count': topics_count,
-        'articles_count': articles_count,
+    # Maintained counters instead of COUNT(*) scans
+    return render(request, 'core/home.html', counters.dashboard_stats())
+
+LIST_PAGE_SIZE = 20
+
+def _keyset_response(request, queryset, ordering, serialize, template, context_name,
+                     extra_context=None, per_page=LIST_PAGE_SIZE):
+    """Render one keyset page as HTML, or as JSON when ?format=json is given."""
+    # Fetched on first use, so a template fragment served from the cache
+    # never runs the page query
+    page = SimpleLazyObject(lambda: paginate_keyset(
+        queryset,
+        ordering,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=per_page,
+    ))
+    links = SimpleLazyObject(lambda: page_links(request, page))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'results': [serialize(obj) for obj in page.object_list],
+            'next': links[0],
+            'previous': links[1],
+        })
+    return render(request, template, {
+        context_name: SimpleLazyObject(lambda: page.object_list),
+        'page': page,
+        'next_link': SimpleLazyObject(lambda: links[0]),
+        'previous_link': SimpleLazyObject(lambda: links[1]),
+        **(extra_context or {}),
     })
 
+@cached_view('topics', 'categories')
 def topic_list(request):
-    topics = Topic.objects.select_related('category').all()
-    return render(request, 'core/topics/list.html', {'topics': topics})
+    topics = Topic.objects.select_related('category')
+    status = request.GET.get('status')
+    if status:
+        topics = topics.filter(status=status)
+    category = request.GET.get('category')
+    if category:
+        topics = topics.filter(category__slug=category)
+    
+    return _keyset_response(
+        request, topics, ('-created_at', '-id'),
+        lambda topic: {
+            'id': topic.id,
+            'title': topic.title,
+            'slug': topic.slug,
+            'description': topic.description,
+            'status': topic.status,
+            'category': topic.category.slug,
+            'created_at': topic.created_at,
+        },
+        'core/topics/list.html', 'topics',
+        {
+            'categories': Category.objects.order_by('name'),
+            'statuses': Topic.STATUS_CHOICES,
+            'current_status': status or '',
+            'current_category': category or '',
+            'fragment_version': versions(['topics', 'categories']),
+            'fragment_timeout': settings.PAGE_CACHE_TIMEOUT,
+        },
+    )
 
 def topic_create(request):
     if request.method == 'POST':
@@ -37,33 +112,120 @@ def topic_create(request):
     
     return render(request, 'core/topics/create.html', {'form': form})
 
-def topic_generate(request):
+def _flag_duplicates(topic_ideas):
+    """Attach the closest existing topic or post (if any) to each generated idea."""
+    matches = dedup_service.find_duplicates(topic_ideas)
+    return [dict(idea, duplicate=match) for idea, match in zip(topic_ideas, matches)]
+
+# Async views hold no thread while waiting on Gemini or WordPress; ORM work
+# and template rendering (which may query lazily) run in the sync thread
+_arender = sync_to_async(render)
+
+async def topic_generate(request):
     if request.method == 'POST':
-        category_id = request.POST.get('category_id')
-        count = int(request.POST.get('count', 3))
+        use_cache = request.POST.get('refresh') != 'on'
+        try:
+            count = int(request.POST.get('count', 3))
+            category_id = int(request.POST.get('category_id', ''))
+        except ValueError:
+            messages.error(request, 'Invalid topic count or category selection.')
+            return redirect('core:topic_generate')
         
-        category = get_object_or_404(Category, id=category_id)
-        ai_service = AIService()
+        category = await aget_object_or_404(Category, id=category_id)
+        ai_service = AsyncAIService()
         
-        topic_ideas = ai_service.generate_topic_ideas(category.name, count)
+        try:
+            topic_ideas = await ai_service.generate_topic_ideas(category.name, count, use_cache=use_cache)
+        except (RateLimitExceeded, AIResponseError) as e:
+            messages.error(request, f'Topic generation failed, please try again: {e}')
+            return redirect('core:topic_generate')
         
         # Prepare topics data for the template
         topics_json = json.dumps(topic_ideas)
         
-        return render(request, 'core/topics/review.html', {
+        return await _arender(request, 'core/topics/review.html', {
             'category': category,
-            'topics': topic_ideas,
+            'topics': await sync_to_async(_flag_duplicates)(topic_ideas),
             'topics_json': topics_json
         })
     
     categories = Category.objects.all()
-    return render(request, 'core/topics/generate.html', {'categories': categories})
+    return await _arender(request, 'core/topics/generate.html', {'categories': categories})
+
+async def topic_generate_batch(request):
+    if request.method == 'POST':
+        use_cache = request.POST.get('refresh') != 'on'
+        try:
+            count = int(request.POST.get('count', 3))
+            category_ids = [int(category_id) for category_id in request.POST.getlist('category_ids')]
+        except ValueError:
+            messages.error(request, 'Invalid topic count or category selection.')
+            return redirect('core:topic_generate_batch')
+        if not category_ids:
+            messages.error(request, 'Select at least one category.')
+            return redirect('core:topic_generate_batch')
+        categories = await sync_to_async(list)(Category.objects.filter(id__in=category_ids).order_by('name'))
+        
+        # All categories are generated concurrently, AI_BATCH_CONCURRENCY at a time
+        results = await topic_batch.generate_for_categories(categories, count, use_cache=use_cache)
+        topic_ideas = topic_batch.combined_ideas(results)
+        names = {category.id: category.name for category in categories}
+        topics = await sync_to_async(_flag_duplicates)(topic_ideas)
+        
+        return await _arender(request, 'core/topics/review.html', {
+            'topics': [dict(topic, category_name=names[topic['category_id']]) for topic in topics],
+            'topics_json': json.dumps(topic_ideas),
+            'batch': True,
+            'failed': [(result.category.name, result.error) for result in results if result.error],
+        })
+    
+    categories = Category.objects.order_by('name')
+    return await _arender(request, 'core/topics/generate_batch.html', {'categories': categories})
+
+def _selected_ideas(request) -> List[Dict]:
+    """
+    Return the ideas ticked on the review page, in the order submitted.
+    
+    Raises:
+        ValueError: If topics_data is not a JSON list of ideas or a
+            selected index does not point into it
+    """
+    try:
+        ideas = json.loads(request.POST.get('topics_data') or '')
+    except json.JSONDecodeError:
+        raise ValueError('the submitted topics are not valid JSON')
+    if not isinstance(ideas, list) or not all(isinstance(idea, dict) for idea in ideas):
+        raise ValueError('the submitted topics are not a list of ideas')
+    selected = []
+    for index in request.POST.getlist('selected_topics'):
+        if not index.isdigit() or int(index) >= len(ideas):
+            raise ValueError(f'unknown topic selection {index!r}')
+        selected.append(ideas[int(index)])
+    return selected
 
 def topic_save(request):
     if request.method == 'POST':
-        selected_indices = request.POST.getlist('selected_topics')
-        topics_data = json.loads(request.POST.get('topics_data'))
         from_wordpress = request.POST.get('from_wordpress') == 'true'
+        batch = request.POST.get('batch') == 'true'
+        try:
+            selected = _selected_ideas(request)
+        except ValueError as e:
+            messages.error(request, f'Error saving topics: {e}')
+            return redirect('core:topic_generate_batch' if batch else 'core:topic_generate')
+        
+        if batch:
+            # Batch ideas each carry the category they were generated for
+            records = (
+                ('topic', {key: idea[key] for key in ('title', 'description', 'category_id') if key in idea})
+                for idea in selected
+            )
+            try:
+                saved_count = TopicImportService().import_records(records)['topics']
+            except TopicImportError as e:
+                messages.error(request, f'Error saving topics: {e}')
+                return redirect('core:topic_generate_batch')
+            messages.success(request, f'Saved {saved_count} topics successfully!')
+            return redirect('core:topic_list')
         
         # Get or create a default category for WordPress-generated topics
         if from_wordpress:
@@ -72,99 +234,179 @@ def topic_save(request):
                 defaults={'description': 'Topics generated from WordPress posts'}
             )
         else:
-            category_id = request.POST.get('category_id')
+            category_id = request.POST.get('category_id', '')
+            if not category_id.isdigit():
+                messages.error(request, 'Error saving topics: invalid category selection')
+                return redirect('core:topic_generate')
             category = get_object_or_404(Category, id=category_id)
         
-        # Save only selected topics
-        saved_count = 0
-        for index in selected_indices:
-            topic_data = topics_data[int(index)]
-            Topic.objects.create(
-                category=category,
-                title=topic_data['title'],
-                description=topic_data['description']
-            )
-            saved_count += 1
+        # Save only selected topics, in one transaction
+        try:
+            saved_count = TopicImportService().import_topics(selected, category)
+        except TopicImportError as e:
+            messages.error(request, f'Error saving topics: {e}')
+            return redirect('core:topic_generate')
         
         messages.success(request, f'Saved {saved_count} topics successfully!')
         return redirect('core:topic_list')
     
     return redirect('core:topic_generate')
 
+@cached_view('topic:{slug}', 'categories')
 def topic_detail(request, slug):
     topic = get_object_or_404(Topic.objects.select_related('category'), slug=slug)
     return render(request, 'core/topics/detail.html', {'topic': topic})
 
+@cached_view('articles', 'categories')
 def article_list(request):
-    articles = Article.objects.select_related('topic').all()
-    return render(request, 'core/articles/list.html', {'articles': articles})
+    # Bodies live in ContentBody; cards show the stored plain-text excerpt
+    articles = Article.objects.select_related('topic__category').defer('topic__description')
+    category = request.GET.get('category')
+    if category:
+        articles = articles.filter(topic__category__slug=category)
+    
+    return _keyset_response(
+        request, articles, ('-created_at', '-id'),
+        lambda article: {
+            'id': article.id,
+            'title': article.title,
+            'slug': article.slug,
+            'excerpt': article.excerpt,
+            'category': article.topic.category.slug,
+            'created_at': article.created_at,
+        },
+        'core/articles/list.html', 'articles',
+        {
+            'categories': Category.objects.order_by('name'),
+            'current_category': category or '',
+        },
+    )
+
+def _article_parameters_from_form(form):
+    """Build the generation parameters dict, saving it as the default set if requested."""
+    # The form resolves saved parameter sets into the custom fields
+    parameters = {
+        'purpose': form.cleaned_data['purpose'],
+        'target_audience': form.cleaned_data['target_audience'],
+        'tone_of_voice': form.cleaned_data['tone_of_voice'],
+        'word_count': form.cleaned_data['word_count']
+    }
+    
+    # Save parameters if requested
+    if form.cleaned_data['save_as_default']:
+        ArticleParameters.objects.create(
+            name=form.cleaned_data['parameter_name'],
+            is_default=True,
+            **parameters
+        )
+    return parameters
 
-def article_generate(request, topic_id):
-    topic = get_object_or_404(Topic, id=topic_id)
+async def article_generate(request, topic_id):
+    topic = await aget_object_or_404(Topic, id=topic_id)
     
+    # The form reads the saved parameter sets when built and validated
     if request.method == 'POST':
-        form = ArticleGenerationForm(request.POST)
-        if form.is_valid():
-            ai_service = AIService()
-            
-            # Get parameters from form
-            if form.cleaned_data['parameters']:
-                # Use selected saved parameters
-                parameters = form.cleaned_data['parameters']
-            else:
-                # Use custom parameters
-                parameters = {
-                    'purpose': form.cleaned_data['purpose'],
-                    'target_audience': form.cleaned_data['target_audience'],
-                    'tone_of_voice': form.cleaned_data['tone_of_voice'],
-                    'word_count': form.cleaned_data['word_count']
-                }
+        form = await sync_to_async(ArticleGenerationForm)(request.POST)
+        if await sync_to_async(form.is_valid)():
+            parameters = await sync_to_async(_article_parameters_from_form)(form)
             
-            # Save parameters if requested
-            if form.cleaned_data['save_as_default']:
-                ArticleParameters.objects.create(
-                    name=form.cleaned_data['parameter_name'],
-                    purpose=parameters['purpose'] if isinstance(parameters, dict) else parameters.purpose,
-                    target_audience=parameters['target_audience'] if isinstance(parameters, dict) else parameters.target_audience,
-                    tone_of_voice=parameters['tone_of_voice'] if isinstance(parameters, dict) else parameters.tone_of_voice,
-                    word_count=parameters['word_count'] if isinstance(parameters, dict) else parameters.word_count,
-                    is_default=True
-                )
+            # Queue the generation; a worker picks it up outside the request
+            job = await sync_to_async(enqueue_article_generation)(
+                topic, parameters, use_cache=not form.cleaned_data['refresh']
+            )
             
-            # Generate article
-            content = ai_service.generate_article(topic, parameters)
+            messages.info(request, 'Article generation has been queued.')
+            return redirect('core:article_job_status', job_id=job.id)
+    else:
+        form = await sync_to_async(ArticleGenerationForm)()
+    
+    return await _arender(request, 'core/articles/generate.html', {
+        'topic': topic,
+        'form': form
+    })
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@require_POST
+def article_generate_stream(request, topic_id):
+    topic = get_object_or_404(Topic.objects.select_related('category'), id=topic_id)
+    form = ArticleGenerationForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    
+    parameters = _article_parameters_from_form(form)
+    use_cache = not form.cleaned_data['refresh']
+    ai_service = AIService()
+    
+    def event_stream():
+        topic.status = 'in_progress'
+        topic.save()
+        finished = False
+        chunks = []
+        try:
+            for chunk in ai_service.generate_article_stream(topic, parameters, use_cache=use_cache):
+                chunks.append(chunk)
+                yield _sse_event('chunk', {'html': chunk})
             
-            # Create article
+            # Only a completed stream becomes an article; a cancelled one is discarded
             article = Article.objects.create(
                 topic=topic,
                 title=topic.title,
-                content=content
+                content=''.join(chunks)
             )
-            
-            # Update topic status
             topic.status = 'published'
             topic.save()
-            
-            messages.success(request, 'Article generated successfully!')
-            return redirect('core:article_detail', slug=article.slug)
-    else:
-        form = ArticleGenerationForm()
+            finished = True
+            yield _sse_event('done', {
+                'redirect_url': reverse('core:article_detail', kwargs={'slug': article.slug})
+            })
+        except Exception as e:
+            yield _sse_event('error', {'message': str(e)})
+        finally:
+            # Runs on errors and when the client disconnects mid-stream
+            if not finished:
+                topic.status = 'draft'
+                topic.save()
     
-    return render(request, 'core/articles/generate.html', {
-        'topic': topic,
-        'form': form
-    })
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
+def article_job_status(request, job_id):
+    job = get_object_or_404(GenerationJob.objects.select_related('topic', 'article'), id=job_id)
+    redirect_url = None
+    if job.status == 'succeeded' and job.article:
+        redirect_url = reverse('core:article_detail', kwargs={'slug': job.article.slug})
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.id,
+            'status': job.status,
+            'error': job.error,
+            'redirect_url': redirect_url,
+        })
+
+    if redirect_url:
+        messages.success(request, 'Article generated successfully!')
+        return redirect(redirect_url)
+
+    return render(request, 'core/articles/job_status.html', {'job': job})
+
+@cached_view('article:{slug}', 'categories')
 def article_detail(request, slug):
     article = get_object_or_404(Article.objects.select_related('topic'), slug=slug)
     return render(request, 'core/articles/detail.html', {'article': article})
 
 def reset_database(request):
     if request.method == 'POST':
-        # Delete all data
-        Article.objects.all().delete()
-        Topic.objects.all().delete()
-        Category.objects.all().delete()
+        # Delete all data; indexes, bodies, page cache and counters are
+        # updated in bulk at the end instead of once per row
+        with transaction.atomic(), signals.deferred():
+            Article.objects.all().delete()
+            Topic.objects.all().delete()
+            Category.objects.all().delete()
         messages.success(request, 'Database reset successfully!')
         return redirect('core:home')
     return render(request, 'core/db/reset.html')
@@ -172,33 +414,10 @@ def reset_database(request):
 def seed_database(request):
     if request.method == 'POST':
         try:
-            # Load seed data from JSON
+            # Stream the seed file; categories are matched by slug and
+            # topics refer to them by their position in the file
             seed_path = Path(settings.BASE_DIR) / 'topics.json'
-            with open(seed_path) as f:
-                seed_data = json.load(f)
-            
-            # Create a dictionary to map old category IDs to new ones
-            category_id_map = {}
-            
-            # Seed categories first and build the mapping
-            for index, cat_data in enumerate(seed_data['categories'], 1):
-                category = Category.objects.create(
-                    name=cat_data['name'],
-                    slug=cat_data['slug'],
-                    description=cat_data['description']
-                )
-                # Map the position in the list (1-based) to the new category ID
-                category_id_map[index] = category.id
-            
-            # Seed topics using the mapped category IDs
-            for topic_data in seed_data['topics']:
-                # Map the old category_id to the new one
-                new_category_id = category_id_map[topic_data['category_id']]
-                Topic.objects.create(
-                    title=topic_data['title'],
-                    description=topic_data['description'],
-                    category_id=new_category_id
-                )
+            TopicImportService().import_file(seed_path)
             
             messages.success(request, 'Database seeded successfully!')
             return redirect('core:home')
@@ -209,58 +428,165 @@ def seed_database(request):
             
     return render(request, 'core/db/seed.html')
 
+SEARCH_PAGE_SIZE = 20
+SEARCH_TYPE_LABELS = {
+    'article': 'Article',
+    'topic': 'Topic',
+    'wordpress_post': 'WordPress Post',
+}
+
+def _run_search(request):
+    query = request.GET.get('q', '').strip()
+    doc_type = request.GET.get('type', '')
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    
+    hits, total = search_service.get_search_backend().search(
+        query,
+        doc_types=[doc_type] if doc_type in SEARCH_TYPE_LABELS else None,
+        limit=SEARCH_PAGE_SIZE,
+        offset=(page - 1) * SEARCH_PAGE_SIZE
+    )
+    
+    # Resolve links with one query per document type on the page
+    ids = {name: [hit.object_id for hit in hits if hit.doc_type == name] for name in SEARCH_TYPE_LABELS}
+    article_slugs = dict(Article.objects.filter(pk__in=ids['article']).values_list('pk', 'slug'))
+    topic_slugs = dict(Topic.objects.filter(pk__in=ids['topic']).values_list('pk', 'slug'))
+    post_urls = dict(WordPressPost.objects.filter(wp_id__in=ids['wordpress_post']).values_list('wp_id', 'wp_url'))
+    
+    results = []
+    for hit in hits:
+        if hit.doc_type == 'article':
+            slug = article_slugs.get(hit.object_id)
+            url = reverse('core:article_detail', kwargs={'slug': slug}) if slug else None
+        elif hit.doc_type == 'topic':
+            slug = topic_slugs.get(hit.object_id)
+            url = reverse('core:topic_detail', kwargs={'slug': slug}) if slug else None
+        else:
+            url = post_urls.get(hit.object_id)
+        snippet = escape(hit.snippet).replace(
+            search_service.HIGHLIGHT_START, '<mark>'
+        ).replace(search_service.HIGHLIGHT_END, '</mark>')
+        results.append({
+            'type': hit.doc_type,
+            'type_label': SEARCH_TYPE_LABELS[hit.doc_type],
+            'id': hit.object_id,
+            'title': hit.title,
+            'snippet': snippet,
+            'url': url,
+            'score': hit.score,
+        })
+    
+    return {
+        'query': query,
+        'type': doc_type,
+        'page': page,
+        'total': total,
+        'results': results,
+        'has_previous': page > 1,
+        'has_next': page * SEARCH_PAGE_SIZE < total,
+    }
+
+def search(request):
+    context = _run_search(request)
+    context['type_choices'] = SEARCH_TYPE_LABELS.items()
+    return render(request, 'core/search.html', context)
+
+def search_api(request):
+    return JsonResponse(_run_search(request))
+
+def metrics_view(request):
+    """Metrics of this process in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        return HttpResponse(status=404)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@method_decorator(cached_view('wordpress_posts'), name='get')
 class WordPressPostListView(ListView):
     model = WordPressPost
     template_name = 'core/wordpress_posts.html'
     context_object_name = 'posts'
     paginate_by = 10
+    ordering = ('-published_date', '-id')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['title'] = 'WordPress Posts'
-        return context
+    def get_queryset(self):
+        # Bodies live in ContentBody, so this never reads them
+        return WordPressPost.objects.all()
 
-def sync_wordpress_posts(request):
-    wp_service = WordPressService()
-    posts = wp_service.get_posts(per_page=100)  # Fetch up to 100 posts
-    
-    for post_data in posts:
-        WordPressPost.objects.update_or_create(
-            wp_id=post_data['id'],
-            defaults={
-                'title': post_data['title']['rendered'],
-                'excerpt': post_data['excerpt']['rendered'],
-                'wp_url': post_data['link'],
-                'published_date': post_data['date'],
-            }
+    def get(self, request, *args, **kwargs):
+        return _keyset_response(
+            request, self.get_queryset(), self.ordering,
+            lambda post: {
+                'wp_id': post.wp_id,
+                'title': post.title,
+                'excerpt': post.excerpt,
+                'wp_url': post.wp_url,
+                'published_date': post.published_date,
+            },
+            self.template_name, self.context_object_name,
+            {'title': 'WordPress Posts'},
+            per_page=self.paginate_by,
         )
+
+async def sync_wordpress_posts(request):
+    full = request.GET.get('full') == '1'
+    try:
+        result = await AsyncWordPressSyncService().sync(full=full)
+    except httpx.HTTPError as e:
+        messages.error(request, f'Error syncing WordPress posts: {e}')
+        return redirect('core:wordpress_posts')
+    # Index the new posts now rather than in the next topic generation request
+    await sync_to_async(retrieval_service.post_index.refresh)()
     
-    return render(request, 'core/wordpress_sync_complete.html', {
-        'post_count': len(posts)
+    return await _arender(request, 'core/wordpress_sync_complete.html', {
+        'post_count': result['fetched'],
+        'result': result,
+        'full': full
     })
 
-def generate_topics_from_wp(request):
+async def generate_topics_from_wp(request):
     if request.method == 'POST':
-        wp_service = WordPressService()
-        ai_service = AIService()
-        count = int(request.POST.get('count', 3))
+        ai_service = AsyncAIService()
+        use_cache = request.POST.get('refresh') != 'on'
+        focus = request.POST.get('focus', '').strip()
+        try:
+            count = int(request.POST.get('count', 3))
+            # The category is optional
+            category_id = int(request.POST['category_id']) if request.POST.get('category_id') else None
+        except ValueError:
+            messages.error(request, 'Invalid topic count or category selection.')
+            return redirect('core:generate_topics_from_wp')
+        category = await Category.objects.filter(id=category_id).afirst() if category_id else None
         
-        # Fetch recent WordPress posts
-        posts = wp_service.get_posts(per_page=5)  # Get 5 most recent posts
-        print(f"Fetched {len(posts)} WordPress posts")
+        # Pick relevant, varied posts from the synced copy of the blog
+        query = ' '.join(filter(None, [focus, category and category.name, category and category.description]))
+        posts = await sync_to_async(retrieval_service.select_context_posts)(query)
+        if not posts:
+            # Nothing synced yet: fall back to the most recent posts
+            async with AsyncWordPressService() as wp_service:
+                posts = await wp_service.get_posts(per_page=5)
+        logger.info("Using %d WordPress posts as context", len(posts))
         
         # Generate topics based on posts
-        topic_ideas = ai_service.generate_topics_from_posts(posts, count)
-        print(f"Generated {len(topic_ideas)} topic ideas")
-        print(f"Topic ideas: {json.dumps(topic_ideas, indent=2)}")
+        try:
+            topic_ideas = await ai_service.generate_topics_from_posts(posts, count, use_cache=use_cache)
+        except (RateLimitExceeded, AIResponseError) as e:
+            messages.error(request, f'Topic generation failed, please try again: {e}')
+            return redirect('core:generate_topics_from_wp')
+        logger.info("Generated %d topic ideas", len(topic_ideas))
+        logger.debug("Topic ideas: %s", json.dumps(topic_ideas, indent=2))
         
         # Prepare topics data for the template
         topics_json = json.dumps(topic_ideas)
         
-        return render(request, 'core/topics/review.html', {
-            'topics': topic_ideas,
+        return await _arender(request, 'core/topics/review.html', {
+            'topics': await sync_to_async(_flag_duplicates)(topic_ideas),
             'topics_json': topics_json,
             'from_wordpress': True
         })
     
-    return render(request, 'core/topics/generate_from_wp.html') 
\ No newline at end of file
+    return await _arender(request, 'core/topics/generate_from_wp.html', {
+        'categories': Category.objects.all()
+    }) 
\ No newline at end of file